@@ -1,7 +1,7 @@
 {
     'name': 'Cabal Contract Management',
     'author': 'Redes Litorales SA de CV',
-        "version": "17.0.8.4.0",
+        "version": "17.0.8.5.0",
     'category': 'Sales Management',
     'sequence': -100,
     'summary': 'Contract Management',
@@ -16,6 +16,15 @@
         'data/contract_auto_renew_cron.xml',
         'data/email_domain_fix_cron.xml',
         'data/cm_renewals_pipeline.xml',
+        'data/docusign_token_cron.xml',
+        'data/docusign_status_sync_cron.xml',
+        'data/docusign_webhook_cron.xml',
+        'data/docusign_send_queue_cron.xml',
+        'data/docusign_download_cron.xml',
+        'data/docusign_reaper_cron.xml',
+        'data/contract_prerender_cron.xml',
+        'data/attachment_dedupe_cron.xml',
+        'data/message_outbox_cron.xml',
         'views/view_contract_clause.xml',
         'views/contract_addendum_views.xml',
         'views/sale_order_views.xml',
@@ -47,12 +56,16 @@
         'reports/customer_contract_action.xml',
         'views/contract_send_method_wizard_view.xml',
         'views/contract_resend_wizard_view.xml',
+        'views/contract_bulk_resend_wizard_view.xml',
         'views/contract_transfer_wizard_view.xml',
         'views/contract_transfer_wizard_action.xml',
         'reports/report_modify_quote.xml',        
         'reports/report_contract_template.xml',
         'reports/report_contract_addendum.xml',      
         'views/contract_management_menus.xml',
+        'views/docusign_webhook_event_views.xml',
+        'views/contract_render_profile_views.xml',
+        'views/contract_message_outbox_views.xml',
         'views/suspended_subscription_views.xml',
         'views/res_users_views.xml',
         'views/res_config_settings_views.xml',
@@ -1,115 +1,45 @@
-import json
-import jwt
-import time
-import requests
 import logging
 import hmac
 import hashlib
 from odoo.osv import expression
 from urllib.parse import urlparse, urljoin
-from odoo.addons.odoo_docusign.models import docu_client
 from odoo import http, models, fields, _
 from odoo.http import request
 from odoo.exceptions import ValidationError, AccessError
 from odoo.addons.portal.controllers.portal import CustomerPortal, pager as portal_pager
 
-_logger = logging.getLogger(__name__)
+from ..models.docusign_api import DocuSignClient, DocuSignError, DocuSignUnavailable, is_outage
 
-# DEPRECATED: This webhook controller has been disabled in favor of the odoo_docusign webhook
-# which includes HMAC signature verification for improved security.
-# The odoo_docusign webhook at /docusign/webhook should be used instead.
-# See odoo_docusign/controllers/webhook_controller.py for the active implementation.
-#
-# To re-enable this webhook (not recommended), uncomment the class below and change the route
-# to avoid conflicts (e.g., '/contract_management/docusign/webhook')
+_logger = logging.getLogger(__name__)
 
 class DocuSignWebhookController(http.Controller):
+    """DocuSign Connect receiver.
+
+    Validates the Connect HMAC, stores the raw event in the
+    ``docusign.webhook.event`` inbox and answers immediately; the inbox cron
+    applies the status changes asynchronously.
+    """
 
-    @http.route('/docusign/webhook1', type='json', auth='public', methods=['POST'], csrf=False)
+    @http.route('/docusign/webhook1', type='http', auth='public', methods=['POST'], csrf=False)
     def docusign_webhook(self, **kwargs):
-        # Get the JSON data from the webhook
-        data = json.loads(request.httprequest.data)
-        
-        # Extract the event and envelope ID
-        event = data.get('event')
-        envelope_id = data.get('data', {}).get('envelopeId')
-        current_user = request.env.user
-
-        if event and envelope_id:
-            # Find the corresponding record in docusign.connector
-            docusign_connector_line = request.env['docusign.connector.lines'].sudo().search([('envelope_id', '=', envelope_id)], limit=1)
-            if docusign_connector_line:
-                docusign_connector = request.env['docusign.connector'].sudo().browse(docusign_connector_line.record_id.id)
-            if docusign_connector:
-                pt = 'dev'
-                if not 'test' in request.httprequest.url_root:
-                    pt = 'prod'
-
-                # Create the JWT assertion
-                now = int(time.time())
-                payload = {
-                    'iss': request.env['ir.config_parameter'].sudo().get_param('docusign_client_id', ''),
-                    'sub': request.env['ir.config_parameter'].sudo().get_param('docusign_user_id', ''),
-                    'aud': platform_type[pt],
-                    'iat': now,
-                    'exp': now + 3600,
-                    'scope': 'signature impersonation'
-                }
-                jwt_assertion = jwt.encode(payload, request.env['ir.config_parameter'].sudo().get_param('docusign_private_key', ''), algorithm='RS256')
-                # Request an access token - default to dev environment unless the request URL does not contain the word test
-                url = "https://{0}/oauth/token".format(platform_type[pt])
-                headers = {
-                    'Content-Type': 'application/x-www-form-urlencoded'
-                }
-                data = {
-                    'grant_type': 'urn:ietf:params:oauth:grant-type:jwt-bearer',
-                    'assertion': jwt_assertion
-                }
-                response = requests.post(url, headers=headers, data=data)
-                access_token = response.json().get('access_token')
-
-                if not access_token:
-                    raise ValidationError(_("Failed to obtain access token from DocuSign"))
-
-                # Trigger the method from docu_client.py using JWT authentication
-                for connector in docusign_connector:
-                    if event == 'recipient-completed':
-                        connector.state = 'customer'
-                        subscription = request.env['sale.order'].sudo().browse(connector.sale_id.id)
-                        # Create the install task as soon as the customer signature is done and mark active
-                        try:
-                            subscription.action_create_install_task()
-                            _logger.info("[DocuSign Webhook] Installation task auto-created after customer signature for subscription %s", subscription.id)
-                        except Exception as e:
-                            _logger.warning("[DocuSign Webhook] Failed to auto-create install task after customer signature: %s", str(e))
-                            subscription.write({'installation_state': 'to_be_scheduled'})
-                        subscription.contract_state = 'active'
-                    if event == 'envelope-completed':
-                        connector.state = 'completed'
-                        subscription = request.env['sale.order'].sudo().browse(connector.sale_id.id)
-                        # Auto-create installation task and mark contract active
-                        try:
-                            subscription.action_create_install_task()
-                            _logger.info("[DocuSign Webhook] Installation task auto-created for subscription %s", subscription.id)
-                        except Exception as e:
-                            _logger.warning("[DocuSign Webhook] Failed to auto-create install task: %s", str(e))
-                            subscription.write({'installation_state': 'to_be_scheduled'})
-
-                        subscription.contract_state = 'active'
-                        
-                        # Auto-download signed documents (skip if already present to avoid duplicates)
-                        try:
-                            if not any(connector.connector_line_ids.mapped('signed_attachment_ids')):
-                                connector.download_docs()
-                            else:
-                                _logger.info("[DocuSign Webhook] Signed attachments already present; skipping download for envelope %s", envelope_id)
-                        except Exception as e:
-                            _logger.error("[DocuSign Webhook] Failed to auto-download documents: %s", str(e))
-                    if connector.state != 'completed':
-                        connector.status_docs()
-        
-        return {'status': 'success'}
-    
+        body = request.httprequest.get_data()
+        headers = request.httprequest.headers
+        signatures = [value for key, value in headers.items() if key.lower().startswith('x-docusign-signature-')]
+
+        Inbox = request.env['docusign.webhook.event'].sudo()
+        if not Inbox._verify_signature(body, signatures):
+            _logger.warning("[DocuSign Webhook] Rejected event with invalid or missing HMAC signature")
+            return request.make_json_response({'status': 'invalid signature'}, status=401)
+
+        try:
+            event = Inbox._enqueue(body)
+        except ValueError:
+            _logger.warning("[DocuSign Webhook] Rejected non-JSON payload")
+            return request.make_json_response({'status': 'invalid payload'}, status=400)
+
+        _logger.info("[DocuSign Webhook] Queued %s for envelope %s (event %s)", event.event, event.envelope_id, event.id)
+        return request.make_json_response({'status': 'accepted'})
+
 class ContractPortal(CustomerPortal):
     """Portal controller for contract management customer portal views."""
 
@@ -193,6 +123,16 @@ class ContractPortal(CustomerPortal):
         base_host = request.httprequest.host_url.rstrip('/')
         return f"{base_host}/docusign/return?contract_id={contract_id}"
 
+    def _docusign_unavailable(self, contract, exc):
+        """503 page shown while DocuSign is down or the circuit breaker is open."""
+        retry_after = max(1, int(getattr(exc, 'retry_after', None) or 60))
+        _logger.warning("[EmbeddedSign] DocuSign unavailable for contract %s, retry in %ss: %s",
+                        contract.id if contract else None, retry_after, exc)
+        return request.render('contract_management.portal_docusign_unavailable', {
+            'contract': contract,
+            'retry_after': retry_after,
+        }, status=503, headers=[('Retry-After', str(retry_after))])
+
     def _start_embedded_signing(self, contract_sudo, line_sudo, source='portal'):
         """Centralized embedded signing launch (portal, magic-link, in-person)."""
         if not line_sudo.envelope_id:
@@ -211,10 +151,9 @@ class ContractPortal(CustomerPortal):
         signer_email = line_sudo._get_recipient_email()
         signer_name = line_sudo.partner_id.name
 
-        env_sudo = request.env['ir.config_parameter'].sudo().env
-        signing_url = docu_client.create_recipient_view(
-            env_sudo,
-            request.env.user,
+        # No retries while an HTTP worker waits; the circuit breaker fails fast when DocuSign is down.
+        client = DocuSignClient.from_env(request.env(su=True), max_retries=0)
+        signing_url = client.create_recipient_view(
             line_sudo.envelope_id,
             signer_name,
             signer_email,
@@ -243,8 +182,7 @@ class ContractPortal(CustomerPortal):
             needs_normalization,
         )
         if needs_normalization:
-            config = docu_client._get_docusign_config(request.env)
-            base_uri = (config.get('base_uri') or '').rstrip('/')
+            base_uri = client.base_uri
             if base_uri:
                 base_parts = urlparse(base_uri)
                 base_root = f"{base_parts.scheme}://{base_parts.netloc}" if base_parts.scheme and base_parts.netloc else base_uri
@@ -371,6 +309,11 @@ class ContractPortal(CustomerPortal):
 
         try:
             signing_url = self._start_embedded_signing(contract_sudo, line.sudo(), source='portal')
+        except DocuSignError as exc:
+            if isinstance(exc, DocuSignUnavailable) or is_outage(exc):
+                return self._docusign_unavailable(contract_sudo, exc)
+            _logger.exception("[PortalSign] DocuSign recipient view failed for contract %s", contract_sudo.id)
+            return request.redirect('/my/contract/%s' % contract_id)
         except ValidationError:
             _logger.exception(
                 "[PortalSign] DocuSign recipient view failed for contract %s, envelope %s, client_user_id %s",
@@ -413,6 +356,14 @@ class ContractPortal(CustomerPortal):
 
         try:
             signing_url = self._start_embedded_signing(contract, line, source='magic-link')
+        except DocuSignError as exc:
+            if isinstance(exc, DocuSignUnavailable) or is_outage(exc):
+                return self._docusign_unavailable(contract, exc)
+            _logger.exception("[MagicLinkSign] Failed to start signing for contract %s: %s", contract.id, exc)
+            return request.render('contract_management.portal_sign_error', {
+                'contract': contract,
+                'reason': _('No se pudo iniciar la firma. Reenvíe el enlace.'),
+            })
         except ValidationError as exc:
             _logger.exception("[MagicLinkSign] Failed to start signing for contract %s: %s", contract.id, exc)
             return request.render('contract_management.portal_sign_error', {
@@ -442,6 +393,14 @@ class ContractPortal(CustomerPortal):
 
         try:
             signing_url = self._start_embedded_signing(contract, line.sudo(), source='in-person')
+        except DocuSignError as exc:
+            if isinstance(exc, DocuSignUnavailable) or is_outage(exc):
+                return self._docusign_unavailable(contract, exc)
+            _logger.exception("[InPersonSign] Failed to start signing for contract %s: %s", contract.id, exc)
+            return request.render('contract_management.portal_sign_error', {
+                'contract': contract,
+                'reason': _('No se pudo iniciar la firma en persona.'),
+            })
         except ValidationError as exc:
             _logger.exception("[InPersonSign] Failed to start signing for contract %s: %s", contract.id, exc)
             return request.render('contract_management.portal_sign_error', {
@@ -0,0 +1,17 @@
+import logging
+
+from odoo import SUPERUSER_ID, api
+
+_logger = logging.getLogger(__name__)
+
+
+def migrate(cr, version):
+    """Drop the per-user DocuSign token crons replaced by the shared token store."""
+    if not version:
+        return
+    env = api.Environment(cr, SUPERUSER_ID, {})
+    crons = env['ir.cron'].with_context(active_test=False).search([
+        ('name', '=like', 'Refresh DocuSign Token for User %'),
+    ])
+    _logger.info("[contract_management][migration] Removing %s legacy DocuSign token crons", len(crons))
+    crons.unlink()
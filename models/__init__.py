@@ -5,10 +5,18 @@ from . import sale_order
 from . import subscription_closure
 from . import docusign_connector
 from . import docusign_connector_line_ext
+from . import docusign_service_account
+from . import docusign_webhook_event
+from . import docusign_send_job
+from . import contract_message_outbox
+from . import ir_attachment
+from . import ir_actions_report
 from . import res_users
 from . import res_partner
 from . import product_category
 from . import res_config_settings
 from . import contract_termination_wizard
+from . import contract_bulk_resend_wizard
+from . import contract_render_profile
 from . import project_task
 from . import termination_request
\ No newline at end of file
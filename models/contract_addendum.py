@@ -2,9 +2,7 @@
 from odoo import models, fields, api, _
 from odoo.exceptions import UserError, ValidationError
 import logging
-import re
-import requests
-from odoo.addons.odoo_docusign.models import docu_client
+from .docusign_api import DocuSignClient, DocuSignError
 
 _logger = logging.getLogger(__name__)
 
@@ -411,19 +409,6 @@ class ContractAddendum(models.Model):
             }
         }
 
-    def _get_docusign_headers(self, access_token):
-        """Return headers for DocuSign API calls."""
-        return {
-            'Authorization': f'Bearer {access_token}',
-            'Accept': 'application/json',
-            'Content-Type': 'application/json'
-        }
-    
-    def _get_docusign_api_url(self, env):
-        """Get DocuSign API base URL based on environment."""
-        config = docu_client._get_docusign_config(env)
-        return f"{config['base_uri']}/restapi/v2.1/accounts/{config['account_id']}"
-    
     def _get_envelope_status(self, envelope_id):
         """Get current status of DocuSign envelope."""
         self.ensure_one()
@@ -431,27 +416,15 @@ class ContractAddendum(models.Model):
         _logger.info("[DocuSign Addendum] Getting status for envelope %s", envelope_id)
         
         try:
-            user = self.env['res.users'].browse(196)  # contratos@cabal.sv
-            access_token = docu_client._get_cached_access_token(self.env, user)
-            
-            api_base = self._get_docusign_api_url(self.env)
-            url = f"{api_base}/envelopes/{envelope_id}"
-            
-            response = requests.get(
-                url,
-                headers=self._get_docusign_headers(access_token)
-            )
-            
-            if response.status_code != 200:
-                _logger.error("[DocuSign Addendum] Failed to get envelope status: %s", response.text)
-                return None
-            
-            result = response.json()
+            result = DocuSignClient.from_env(self.env).get_envelope(envelope_id)
             status = result.get('status')
             _logger.info("[DocuSign Addendum] Envelope %s status: %s", envelope_id, status)
             
             return status
             
+        except DocuSignError as e:
+            _logger.error("[DocuSign Addendum] Failed to get envelope status: %s", e)
+            return None
         except Exception as e:
             _logger.exception("[DocuSign Addendum] Error getting envelope status: %s", str(e))
             return None
@@ -469,8 +442,7 @@ class ContractAddendum(models.Model):
             raise UserError(_("Customer does not have a WhatsApp number configured."))
         
         # Validate WhatsApp format
-        match = re.match(r'^\+(\d{1,3})(\d+)$', self.partner_id.whatsapp)
-        if not match:
+        if not self.partner_id.whatsapp_e164:
             raise UserError(_("Customer WhatsApp number is not in valid format (+country_code phone_number)."))
         
         # Get customer signer from DocuSign connector lines
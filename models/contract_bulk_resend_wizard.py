@@ -0,0 +1,208 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from odoo import api, fields, models, _
+from odoo.exceptions import UserError
+from odoo.tools.safe_eval import safe_eval
+
+from .docusign_api import DocuSignBudgetExhausted, DocuSignClient
+
+_logger = logging.getLogger(__name__)
+
+DEFAULT_BULK_CONCURRENCY = 4
+PENDING_DOMAIN = [('subscription_id.contract_state', '=', 'pending_customer_signature')]
+
+
+class ContractBulkResendWizard(models.TransientModel):
+    """Resend the signature request of many pending contracts at once.
+
+    Contracts are grouped by (envelope, channel) so an envelope is handled
+    once; DocuSign calls run with bounded concurrency and every contract
+    gets a result line (sent, skipped or failed with the reason).
+    """
+    _name = 'contract.bulk.resend.wizard'
+    _description = 'Bulk Contract Resend Wizard'
+
+    contract_ids = fields.Many2many('contract.management', string='Contracts')
+    domain = fields.Char(
+        string='Domain',
+        help='Used instead of the selected contracts when set, e.g. every contract pending customer signature.')
+    channel = fields.Selection([
+        ('contract', 'Contract Send Method'),
+        ('email', 'Email'),
+        ('whatsapp', 'WhatsApp'),
+    ], string='Channel', default='contract', required=True)
+    state = fields.Selection([('draft', 'Draft'), ('done', 'Done')], default='draft')
+    result_ids = fields.One2many('contract.bulk.resend.result', 'wizard_id', string='Results', readonly=True)
+    sent_count = fields.Integer(compute='_compute_counts')
+    skipped_count = fields.Integer(compute='_compute_counts')
+    failed_count = fields.Integer(compute='_compute_counts')
+
+    @api.model
+    def default_get(self, fields_list):
+        res = super().default_get(fields_list)
+        context = self.env.context
+        if context.get('active_model') == 'contract.management':
+            if context.get('active_domain') and not context.get('active_ids'):
+                res.setdefault('domain', str(context['active_domain']))
+            elif context.get('active_ids'):
+                res.setdefault('contract_ids', [(6, 0, context['active_ids'])])
+        if not res.get('contract_ids') and not res.get('domain'):
+            res['domain'] = str(PENDING_DOMAIN)
+        return res
+
+    @api.depends('result_ids.result')
+    def _compute_counts(self):
+        for wizard in self:
+            results = wizard.result_ids.mapped('result')
+            wizard.sent_count = results.count('sent')
+            wizard.skipped_count = results.count('skipped')
+            wizard.failed_count = results.count('failed')
+
+    def _get_contracts(self):
+        self.ensure_one()
+        if self.domain:
+            return self.env['contract.management'].search(safe_eval(self.domain))
+        return self.contract_ids
+
+    @api.model
+    def _get_concurrency(self):
+        try:
+            return max(1, int(self.env['ir.config_parameter'].sudo().get_param(
+                'contract_management.docusign_bulk_concurrency', DEFAULT_BULK_CONCURRENCY)))
+        except (TypeError, ValueError):
+            return DEFAULT_BULK_CONCURRENCY
+
+    def _prepare_job(self, contract):
+        """Return ``(key, job)`` for ``contract`` or raise UserError with the skip reason."""
+        channel = self.channel
+        if channel == 'contract':
+            channel = 'whatsapp' if contract.contract_send_method == 'whatsapp' else 'email'
+        if contract.subscription_id.contract_state != 'pending_customer_signature':
+            raise UserError(_("Contract is not pending customer signature."))
+        if not contract.docusign_id:
+            raise UserError(_("No DocuSign envelope found for this contract."))
+        line = contract.docusign_id.connector_line_ids.filtered(lambda l: l.partner_id == contract.partner_id)[:1]
+        if not line:
+            raise UserError(_("No customer signer found in DocuSign envelope."))
+        if not line.envelope_id:
+            raise UserError(_("No envelope ID found. Cannot resend."))
+        if line.sign_status:
+            raise UserError(_("Customer has already signed."))
+        recipient_id = line.recipient_id or '1'
+        if channel == 'whatsapp':
+            contact = contract.partner_id.whatsapp
+            if not contact:
+                raise UserError(_("Customer does not have a WhatsApp number configured."))
+            if not contract.partner_id.whatsapp_e164:
+                raise UserError(_("Customer WhatsApp number is not in valid format (+country_code phone_number)."))
+            payload = contract._prepare_recipient_update(recipient_id, new_phone=contact)
+        else:
+            contact = contract.partner_id.email
+            if not contact:
+                raise UserError(_("Customer does not have an email address configured."))
+            payload = contract._prepare_recipient_update(recipient_id, new_email=contact)
+        return (line.envelope_id, channel), {
+            'envelope_id': line.envelope_id,
+            'recipient_id': recipient_id,
+            'channel': channel,
+            'contact': contact,
+            'payload': payload,
+        }
+
+    @staticmethod
+    def _resend(client, job):
+        """Resend one envelope (pool thread: HTTP only). Return ``(result, reason)``."""
+        envelope_id = job['envelope_id']
+        try:
+            status = client.get_envelope(envelope_id).get('status')
+            if status in ('voided', 'declined'):
+                return 'skipped', _("Envelope is %s: use the single resend to create a new envelope.") % status
+            if status == 'completed':
+                return 'skipped', _("Envelope is already completed.")
+            if status in ('created', 'sent'):
+                # same as contract.management._update_envelope_recipient(resend_envelope=True)
+                client.update_recipients(envelope_id, job['payload'], resend_envelope=True)
+            else:
+                # same as contract.management._resend_envelope_notification
+                client.resend_recipient(envelope_id, job['recipient_id'])
+            return 'sent', _("Resent via %s to %s (envelope status: %s).") % (job['channel'], job['contact'], status)
+        except DocuSignBudgetExhausted as e:
+            return 'failed', _("DocuSign API budget exhausted, retry after %s.") % e.retry_at
+        except Exception as e:
+            _logger.warning("[DocuSign Bulk Resend] Envelope %s failed: %s", envelope_id, e)
+            return 'failed', str(e)
+
+    def action_resend(self):
+        self.ensure_one()
+        contracts = self._get_contracts()
+        if not contracts:
+            raise UserError(_("No contracts to resend."))
+
+        results = []
+        jobs = {}
+        for contract in contracts:
+            try:
+                key, job = self._prepare_job(contract)
+            except UserError as e:
+                results.append({'contract_id': contract.id, 'result': 'skipped', 'reason': e.args[0]})
+                continue
+            jobs.setdefault(key, dict(job, contracts=self.env['contract.management']))['contracts'] |= contract
+
+        if jobs:
+            try:
+                client = DocuSignClient.from_env(self.env, background=True)
+            except DocuSignBudgetExhausted as e:
+                client, outcome = None, ('failed', _("DocuSign API budget exhausted, retry after %s.") % e.retry_at)
+            job_list = list(jobs.values())
+            if client:
+                workers = min(self._get_concurrency(), len(job_list))
+                with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='docusign-resend') as pool:
+                    outcomes = list(pool.map(lambda job: self._resend(client, job), job_list))
+            else:
+                outcomes = [outcome] * len(job_list)
+
+            for job, (result, reason) in zip(job_list, outcomes):
+                for contract in job['contracts']:
+                    results.append({
+                        'contract_id': contract.id,
+                        'envelope_id': job['envelope_id'],
+                        'channel': job['channel'],
+                        'result': result,
+                        'reason': reason,
+                    })
+                    if result == 'sent':
+                        contract.write({'contract_send_method': job['channel']})
+                        contract.message_post(body=reason, subject=_("DocuSign Resent (bulk)"))
+                    elif result == 'failed':
+                        contract.message_post(body=_("Bulk resend failed: %s") % reason,
+                                              subject=_("DocuSign Resend Failed"))
+
+        self.write({'state': 'done', 'result_ids': [(5, 0, 0)] + [(0, 0, vals) for vals in results]})
+        _logger.info("[DocuSign Bulk Resend] %s contracts, %s envelopes: %s sent, %s skipped, %s failed",
+                     len(contracts), len(jobs), self.sent_count, self.skipped_count, self.failed_count)
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': self._name,
+            'res_id': self.id,
+            'view_mode': 'form',
+            'target': 'new',
+        }
+
+
+class ContractBulkResendResult(models.TransientModel):
+    _name = 'contract.bulk.resend.result'
+    _description = 'Bulk Contract Resend Result'
+    _order = 'result, id'
+
+    wizard_id = fields.Many2one('contract.bulk.resend.wizard', required=True, ondelete='cascade')
+    contract_id = fields.Many2one('contract.management', string='Contract', readonly=True)
+    partner_id = fields.Many2one(related='contract_id.partner_id', string='Customer')
+    envelope_id = fields.Char(string='Envelope ID', readonly=True)
+    channel = fields.Selection([('email', 'Email'), ('whatsapp', 'WhatsApp')], string='Channel', readonly=True)
+    result = fields.Selection([
+        ('failed', 'Failed'),
+        ('skipped', 'Skipped'),
+        ('sent', 'Sent'),
+    ], string='Result', readonly=True)
+    reason = fields.Char(string='Details', readonly=True)
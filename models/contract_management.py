@@ -1,17 +1,17 @@
 from odoo import models, fields, api, http, _
 from odoo.http import request
 from odoo.exceptions import UserError, ValidationError
-from odoo.tools import float_compare
+from odoo.tools import float_compare, frozendict, ormcache
 from datetime import date, timedelta
 from dateutil.relativedelta import relativedelta
 import time
 import base64
-import re
+import hashlib
 import json
 import jwt
-import requests
 import logging
-from odoo.addons.odoo_docusign.models import docu_client
+from .docusign_api import DocuSignClient, DocuSignError
+from .docusign_envelope import split_phone
 
 
 _logger = logging.getLogger(__name__)
@@ -762,18 +762,9 @@ class ContractManagement(models.Model):
         self.ensure_one()
         return '/my/services'
     
-    def _get_docusign_headers(self, access_token):
-        """Return headers for DocuSign API calls."""
-        return {
-            'Authorization': f'Bearer {access_token}',
-            'Accept': 'application/json',
-            'Content-Type': 'application/json'
-        }
-    
-    def _get_docusign_api_url(self, env):
-        """Get DocuSign API base URL based on environment."""
-        config = docu_client._get_docusign_config(env)
-        return f"{config['base_uri']}/restapi/v2.1/accounts/{config['account_id']}"
+    def _get_docusign_client(self):
+        """Return a DocuSign API client for the contract service user."""
+        return DocuSignClient.from_env(self.env)
     
     def _get_envelope_status(self, envelope_id):
         """Get current status of DocuSign envelope.
@@ -786,34 +777,56 @@ class ContractManagement(models.Model):
         _logger.info("[DocuSign] Getting status for envelope %s", envelope_id)
         
         try:
-            # Get access token
-            user = self.env['res.users'].browse(196)
-            access_token = docu_client._get_cached_access_token(self.env, user)
-            
-            # Build API URL
-            api_base = self._get_docusign_api_url(self.env)
-            url = f"{api_base}/envelopes/{envelope_id}"
-            
-            # Make GET request
-            response = requests.get(
-                url,
-                headers=self._get_docusign_headers(access_token)
-            )
-            
-            if response.status_code != 200:
-                _logger.error("[DocuSign] Failed to get envelope status: %s", response.text)
-                return None
-            
-            result = response.json()
+            result = self._get_docusign_client().get_envelope(envelope_id)
             status = result.get('status')
             _logger.info("[DocuSign] Envelope %s status: %s", envelope_id, status)
             
             return status
             
+        except DocuSignError as e:
+            _logger.error("[DocuSign] Failed to get envelope status: %s", e)
+            return None
         except Exception as e:
             _logger.exception("[DocuSign] Error getting envelope status: %s", str(e))
             return None
     
+    def _prepare_recipient_update(self, recipient_id, new_email=None, new_phone=None):
+        """Build the recipients PUT payload switching a signer to email or WhatsApp delivery."""
+        self.ensure_one()
+        # Prepare recipient update payload
+        recipient_update = {
+            'signers': [{
+                'recipientId': recipient_id,
+            }]
+        }
+        
+        if new_email:
+            # Switching to email delivery (default DocuSign method)
+            recipient_update['signers'][0]['email'] = new_email
+            # Remove SMS delivery method if previously set
+            recipient_update['signers'][0]['deliveryMethod'] = None
+        elif new_phone:
+            # Switching to SMS delivery
+            if new_phone == self.partner_id.whatsapp and self.partner_id.whatsapp_e164:
+                country_code, number = self.partner_id._get_whatsapp_parts()
+            else:
+                country_code, number = split_phone(
+                    new_phone, str(self.partner_id.country_id.phone_code or '') or None)
+
+            # Include email for recipient identity, but deliver via WhatsApp
+            if self.partner_id.email:
+                recipient_update['signers'][0]['email'] = self.partner_id.email
+            
+            recipient_update['signers'][0]['deliveryMethod'] = 'WhatsApp'
+            recipient_update['signers'][0]['phoneNumber'] = {
+                'countryCode': country_code,
+                'number': number
+            }
+            
+            _logger.info("[DocuSign] WhatsApp delivery: email=%s, phone=+%s%s", 
+                       self.partner_id.email, country_code, number)
+        return recipient_update
+
     def _update_envelope_recipient(self, envelope_id, recipient_id, new_email=None, new_phone=None, resend_envelope=False):
         """Update DocuSign envelope recipient information.
         
@@ -827,72 +840,10 @@ class ContractManagement(models.Model):
         self.ensure_one()
         
         try:
-            # Get access token
-            user = self.env['res.users'].browse(196)  # contratos@cabal.sv
-            access_token = docu_client._get_cached_access_token(self.env, user)
-            
-            # Build API URL with resend_envelope parameter
-            api_base = self._get_docusign_api_url(self.env)
-            url = f"{api_base}/envelopes/{envelope_id}/recipients"
-            if resend_envelope:
-                url += "?resend_envelope=true"
-            
-            # Prepare recipient update payload
-            recipient_update = {
-                'signers': [{
-                    'recipientId': recipient_id,
-                }]
-            }
-            
-            if new_email:
-                # Switching to email delivery (default DocuSign method)
-                recipient_update['signers'][0]['email'] = new_email
-                # Remove SMS delivery method if previously set
-                recipient_update['signers'][0]['deliveryMethod'] = None
-            elif new_phone:
-                # Switching to SMS delivery
-                # Parse phone number to extract country code and number
-                # Expected format: +503XXXXXXXX or +1XXXXXXXXXX
-                phone_cleaned = new_phone.lstrip('+')
-                
-                # Determine country code (503 for El Salvador, 1 for USA, etc.)
-                if phone_cleaned.startswith('503'):
-                    country_code = '503'
-                    number = phone_cleaned[3:]
-                elif phone_cleaned.startswith('1') and len(phone_cleaned) == 11:
-                    country_code = '1'
-                    number = phone_cleaned[1:]
-                elif phone_cleaned.startswith('56'):  # Chile
-                    country_code = '56'
-                    number = phone_cleaned[2:]
-                else:
-                    # Fallback: assume first 1-3 digits are country code
-                    country_code = phone_cleaned[:3]
-                    number = phone_cleaned[3:]
-                
-                # Include email for recipient identity, but deliver via WhatsApp
-                if self.partner_id.email:
-                    recipient_update['signers'][0]['email'] = self.partner_id.email
-                
-                recipient_update['signers'][0]['deliveryMethod'] = 'WhatsApp'
-                recipient_update['signers'][0]['phoneNumber'] = {
-                    'countryCode': country_code,
-                    'number': number
-                }
-                
-                _logger.info("[DocuSign] WhatsApp delivery: email=%s, phone=+%s%s", 
-                           self.partner_id.email, country_code, number)
-            
-            # Make PUT request to update recipient
-            response = requests.put(
-                url,
-                headers=self._get_docusign_headers(access_token),
-                json=recipient_update
-            )
+            recipient_update = self._prepare_recipient_update(recipient_id, new_email=new_email, new_phone=new_phone)
             
-            if response.status_code not in [200, 201]:
-                _logger.error("[DocuSign] Failed to update recipient: %s", response.text)
-                raise ValidationError(_(f"Failed to update recipient: {response.text}"))
+            self._get_docusign_client().update_recipients(
+                envelope_id, recipient_update, resend_envelope=resend_envelope)
             
             _logger.info("[DocuSign] Successfully updated recipient %s on envelope %s", recipient_id, envelope_id)
             return True
@@ -902,91 +853,53 @@ class ContractManagement(models.Model):
             raise ValidationError(_(f"Error updating envelope recipient: {str(e)}"))
     
     def _send_envelope_notification(self, envelope_id, recipient_id):
-        """Send DocuSign notification to recipient (for unsigned envelopes after updating)."""
+        """Queue a DocuSign notification to recipient (for unsigned envelopes after updating)."""
         self.ensure_one()
         
         _logger.info("[DocuSign] _send_envelope_notification called for envelope %s, recipient %s", envelope_id, recipient_id)
         
-        try:
-            # Get access token
-            user = self.env['res.users'].browse(196)  # contratos@cabal.sv
-            _logger.info("[DocuSign] Getting access token for user %s", user.login)
-            access_token = docu_client._get_cached_access_token(self.env, user)
-            _logger.info("[DocuSign] Access token obtained: %s...", access_token[:20] if access_token else 'None')
-            
-            # Build API URL for sending notification
-            api_base = self._get_docusign_api_url(self.env)
-            url = f"{api_base}/envelopes/{envelope_id}/notification"
-            _logger.info("[DocuSign] Sending notification to URL: %s", url)
-            
-            # Make PUT request with recipient details to send notification
-            payload = {
-                "recipients": {
-                    "signers": [{
-                        "recipientId": recipient_id
-                    }]
-                }
+        # PUT with recipient details to send notification
+        payload = {
+            "recipients": {
+                "signers": [{
+                    "recipientId": recipient_id
+                }]
             }
-            _logger.info("[DocuSign] Payload: %s", payload)
-            
-            response = requests.put(
-                url,
-                headers=self._get_docusign_headers(access_token),
-                json=payload
-            )
-            
-            _logger.info("[DocuSign] Response status: %s", response.status_code)
-            _logger.info("[DocuSign] Response body: %s", response.text)
-            
-            if response.status_code not in [200, 201]:
-                _logger.error("[DocuSign] Failed to send notification: %s - %s", response.status_code, response.text)
-                raise ValidationError(_(f"Failed to send notification: {response.text}"))
-            
-            _logger.info("[DocuSign] Successfully sent notification to recipient %s on envelope %s", recipient_id, envelope_id)
-            return True
-            
-        except Exception as e:
-            _logger.exception("[DocuSign] Error sending envelope notification: %s", str(e))
-            raise ValidationError(_(f"Error sending envelope notification: {str(e)}"))
+        }
+        return self._enqueue_envelope_notification(envelope_id, recipient_id, body=payload)
     
     def _resend_envelope_notification(self, envelope_id, recipient_id):
-        """Resend DocuSign notification to recipient (for signed envelopes only)."""
+        """Queue a DocuSign notification resend to recipient (for signed envelopes only)."""
         self.ensure_one()
         
         _logger.info("[DocuSign] _resend_envelope_notification called for envelope %s, recipient %s", envelope_id, recipient_id)
         
-        try:
-            # Get access token
-            user = self.env['res.users'].browse(196)  # contratos@cabal.sv
-            _logger.info("[DocuSign] Getting access token for user %s", user.login)
-            access_token = docu_client._get_cached_access_token(self.env, user)
-            _logger.info("[DocuSign] Access token obtained: %s...", access_token[:20] if access_token else 'None')
-            
-            # Build API URL for resend notification
-            api_base = self._get_docusign_api_url(self.env)
-            url = f"{api_base}/envelopes/{envelope_id}/recipients/{recipient_id}/resend_envelope"
-            _logger.info("[DocuSign] Resending notification to URL: %s", url)
-            
-            # Make PUT request to resend notification (DocuSign uses PUT with empty body)
-            response = requests.put(
-                url,
-                headers=self._get_docusign_headers(access_token),
-                json={}
-            )
-            
-            _logger.info("[DocuSign] Response status: %s", response.status_code)
-            _logger.info("[DocuSign] Response body: %s", response.text)
-            
-            if response.status_code not in [200, 201]:
-                _logger.error("[DocuSign] Failed to resend notification: %s", response.text)
-                raise ValidationError(_(f"Failed to resend notification: {response.text}"))
-            
-            _logger.info("[DocuSign] Successfully resent notification to recipient %s on envelope %s", recipient_id, envelope_id)
-            return True
-            
-        except Exception as e:
-            _logger.exception("[DocuSign] Error resending envelope notification: %s", str(e))
-            raise ValidationError(_(f"Error resending envelope notification: {str(e)}"))
+        return self._enqueue_envelope_notification(envelope_id, recipient_id)
+    
+    def _enqueue_envelope_notification(self, envelope_id, recipient_id, body=None):
+        """Queue a DocuSign notification in the outbox; without ``body`` the recipient is re-notified."""
+        self.ensure_one()
+        action = 'notify' if body else 'resend'
+        # a double-click within the same minute queues a single message
+        minute = fields.Datetime.now().strftime('%Y%m%d%H%M')
+        message = self.env['contract.message.outbox']._enqueue({
+            'name': _("Notificacion de DocuSign"),
+            'kind': 'docusign_notification',
+            'idempotency_key': f"docusign:{action}:{envelope_id}:{recipient_id}:{minute}",
+            'payload': {
+                'envelope_id': envelope_id,
+                'recipient_id': recipient_id,
+                'resend': not body,
+                'body': body,
+            },
+            'res_model': self._name,
+            'res_id': self.id,
+            'partner_id': self.partner_id.id,
+            'sent_message': _("DocuSign notification sent to recipient %s of envelope %s") % (recipient_id, envelope_id),
+        })
+        _logger.info("[DocuSign] Notification for envelope %s, recipient %s queued in outbox message %s",
+                     envelope_id, recipient_id, message.id)
+        return message
     
     def action_resend_via_whatsapp(self):
         """Resend DocuSign envelope via WhatsApp - updates contact if not signed, resends if signed."""
@@ -1002,8 +915,7 @@ class ContractManagement(models.Model):
             raise UserError(_("Customer does not have a WhatsApp number configured."))
         
         # Validate WhatsApp format
-        match = re.match(r'^\+(\d{1,3})(\d+)$', self.partner_id.whatsapp)
-        if not match:
+        if not self.partner_id.whatsapp_e164:
             raise UserError(_("Customer WhatsApp number is not in valid format (+country_code phone_number)."))
         
         # Get first connector line (customer signer)
@@ -1300,12 +1212,139 @@ class ContractClause(models.Model):
         if existing_clauses:
             # Set the version to the next version number
             vals['version'] = max(existing_clauses.mapped('version')) + 1
-        return super(ContractClause, self).create(vals)
+        res = super(ContractClause, self).create(vals)
+        self.env.registry.clear_cache()
+        return res
+
+    def write(self, vals):
+        res = super().write(vals)
+        self.env.registry.clear_cache()
+        return res
 
+    def unlink(self):
+        res = super().unlink()
+        self.env.registry.clear_cache()
+        return res
+
+    def update_field_translations(self, field_name, translations, *args, **kwargs):
+        res = super().update_field_translations(field_name, translations, *args, **kwargs)
+        self.env.registry.clear_cache()
+        return res
+
+    # Clause lookups are cached per worker; create/write/archive/unlink and
+    # translation edits clear the registry cache in every worker.
     @api.model
     def get_applicable_clauses(self, contract_template_id):
-        return self.search([
+        if isinstance(contract_template_id, models.BaseModel):
+            contract_template_id = contract_template_id.id
+        return self.browse(self._get_applicable_clause_ids(contract_template_id or False))
+
+    @api.model
+    @ormcache('contract_template_id')
+    def _get_applicable_clause_ids(self, contract_template_id):
+        return tuple(self.sudo().search([
             ('contract_template_ids', 'in', contract_template_id),
             ('active', '=', True)
-        ])
-    
\ No newline at end of file
+        ]).ids)
+
+    def _get_clause_texts(self, lang=None):
+        """Return ``{clause_id: {'name', 'clause', 'friendly_clause'}}`` in ``lang``, cached until clauses change."""
+        lang = lang or self.env.lang or 'en_US'
+        texts = self._get_clause_texts_cached(tuple(self.ids), lang)
+        return dict(texts)
+
+    @api.model
+    @ormcache('clause_ids', 'lang')
+    def _get_clause_texts_cached(self, clause_ids, lang):
+        clauses = self.sudo().with_context(lang=lang).browse(clause_ids)
+        return frozendict({
+            clause.id: frozendict(name=clause.name or '', clause=clause.clause or '',
+                                  friendly_clause=clause.friendly_clause or '')
+            for clause in clauses
+        })
+    
+
+class ContractClauseText(models.Model):
+    """Clause text as it was sent for signature.
+
+    Rows never change once created and are shared by every contract that
+    printed the same text (same hash), so a signed contract keeps its exact
+    clauses whatever happens to ``contract.clause`` afterwards.
+    """
+    _name = 'contract.clause.text'
+    _description = 'Contract Clause Snapshot'
+    _order = 'sequence, id'
+
+    hash = fields.Char(string='Hash', required=True, readonly=True, index=True)
+    clause_id = fields.Many2one('contract.clause', string='Clause', readonly=True, ondelete='set null',
+                                help='Clause this text was first taken from.')
+    version = fields.Integer(string='Version', readonly=True)
+    lang = fields.Char(string='Language', readonly=True)
+    sequence = fields.Integer(string='Sequence', readonly=True)
+    name = fields.Char(string='Clause Name', readonly=True)
+    clause = fields.Text(string='Clause Language', readonly=True)
+    friendly_clause = fields.Text(string='Friendly Clause Language', readonly=True)
+
+    _sql_constraints = [
+        ('hash_uniq', 'unique(hash)', 'A clause snapshot with the same text already exists.'),
+    ]
+
+    def write(self, vals):
+        raise UserError(_('Clause snapshots cannot be modified.'))
+
+    @api.model
+    def _compute_hash(self, vals):
+        payload = [vals.get(key) or '' for key in ('lang', 'sequence', 'name', 'clause', 'friendly_clause')]
+        return hashlib.sha256(json.dumps(payload).encode()).hexdigest()
+
+    @api.model
+    def _prepare_values(self, clauses, lang):
+        """Snapshot values of the active ``clauses`` in ``lang``, hash included, in print order."""
+        clauses = clauses.filtered('active').sorted()
+        texts = clauses._get_clause_texts(lang)
+        values = []
+        for clause in clauses:
+            vals = dict(texts[clause.id], clause_id=clause.id, version=clause.version,
+                        lang=lang, sequence=clause.sequence)
+            vals['hash'] = self._compute_hash(vals)
+            values.append(vals)
+        return values
+
+    @api.model
+    def _get_or_create(self, values):
+        """Return the snapshots of ``values`` (from :meth:`_prepare_values`), creating missing ones.
+
+        Missing rows are inserted with ``ON CONFLICT (hash) DO NOTHING``.
+        When a concurrent transaction committed the same text after this one
+        started, PostgreSQL raises a serialization failure (REPEATABLE READ)
+        and the request is retried, finding that row the second time.
+        """
+        hashes = [vals['hash'] for vals in values]
+        existing = {text.hash: text.id for text in self.sudo().search([('hash', 'in', hashes)])}
+        for vals in values:
+            if vals['hash'] in existing:
+                continue
+            self.env.cr.execute("""
+                INSERT INTO contract_clause_text
+                       (hash, clause_id, version, lang, sequence, name, clause, friendly_clause,
+                        create_uid, create_date, write_uid, write_date)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s,
+                        %s, NOW() AT TIME ZONE 'UTC', %s, NOW() AT TIME ZONE 'UTC')
+                ON CONFLICT (hash) DO NOTHING
+                RETURNING id
+            """, [vals['hash'], vals.get('clause_id') or None, vals.get('version'), vals.get('lang'),
+                  vals.get('sequence'), vals.get('name'), vals.get('clause'), vals.get('friendly_clause'),
+                  self.env.uid, self.env.uid])
+            row = self.env.cr.fetchone()
+            if row:
+                existing[vals['hash']] = row[0]
+        missing = [h for h in hashes if h not in existing]
+        if missing:
+            # conflicting rows visible to this transaction (READ COMMITTED)
+            existing.update({text.hash: text.id for text in self.sudo().search([('hash', 'in', missing)])})
+        return self.browse([existing[h] for h in hashes])
+
+    def _get_clause_texts(self, lang=None):
+        """Same shape as ``contract.clause._get_clause_texts``; snapshots have a single language."""
+        return {text.id: {'name': text.name or '', 'clause': text.clause or '',
+                          'friendly_clause': text.friendly_clause or ''} for text in self}
@@ -0,0 +1,295 @@
+# -*- coding: utf-8 -*-
+import json
+import logging
+import time
+from datetime import timedelta
+
+from odoo import api, fields, models, _
+
+from .docusign_api import DocuSignBudgetExhausted, DocuSignClient
+from .whatsapp_api import DEFAULT_CONCURRENCY, post_messages
+
+_logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 5
+# Retry n waits BACKOFF_MINUTES * 2 ** (n - 1): 1, 2, 4, 8 minutes.
+BACKOFF_MINUTES = 1
+STALE_RUNNING_MINUTES = 30
+BATCH_SIZE = 50
+RUN_BUDGET_SECONDS = 240
+# 4xx answers worth retrying; any other 4xx (invalid number, unknown
+# template, bad envelope) fails the message at once.
+RETRYABLE_CLIENT_ERRORS = frozenset({401, 408, 409, 425, 429})
+
+
+def is_permanent_error(status_code):
+    """True when an HTTP status means the message will never be accepted as is."""
+    return bool(status_code) and 400 <= status_code < 500 and status_code not in RETRYABLE_CLIENT_ERRORS
+
+
+class ContractMessageOutbox(models.Model):
+    """Outbound customer message (WhatsApp quote, signing link, DocuSign notification, ...) waiting for delivery.
+
+    Senders only enqueue; the outbox cron delivers with exponential backoff
+    and escalates to helpdesk once the retries are exhausted. The
+    idempotency key makes enqueueing the same message twice a no-op.
+    """
+    _name = 'contract.message.outbox'
+    _description = 'Contract Message Outbox'
+    _order = 'id desc'
+
+    name = fields.Char(string='Message', required=True, readonly=True)
+    kind = fields.Selection([
+        ('fc_template', 'WhatsApp Template'),
+        ('fc_quote', 'WhatsApp Quote'),
+        ('docusign_notification', 'DocuSign Notification'),
+    ], string='Kind', required=True, readonly=True)
+    idempotency_key = fields.Char(string='Idempotency Key', required=True, readonly=True, index=True, copy=False)
+    payload = fields.Text(string='Payload', required=True, readonly=True)
+    log_vals = fields.Text(string='Log Values', readonly=True,
+                           help='Values of the whatsapp.comm log created once delivered (JSON).')
+    test_mode = fields.Boolean(string='Test Mode', readonly=True)
+    res_model = fields.Char(string='Related Model', readonly=True, index=True)
+    res_id = fields.Many2oneReference(string='Related Record', model_field='res_model', readonly=True, index=True)
+    partner_id = fields.Many2one('res.partner', string='Recipient', readonly=True, ondelete='set null')
+    to_phone = fields.Char(string='Phone', readonly=True)
+    sent_message = fields.Char(string='Chatter Message', readonly=True,
+                               help='Posted on the related record once delivered.')
+    state = fields.Selection([
+        ('queued', 'Queued'),
+        ('running', 'Sending'),
+        ('done', 'Sent'),
+        ('failed', 'Failed'),
+    ], string='State', default='queued', required=True, index=True, readonly=True)
+    attempts = fields.Integer(string='Attempts', readonly=True)
+    next_attempt_at = fields.Datetime(string='Next Attempt', readonly=True)
+    started_at = fields.Datetime(string='Started At', readonly=True)
+    finished_at = fields.Datetime(string='Finished At', readonly=True)
+    request_id = fields.Char(string='Provider Request ID', readonly=True)
+    last_error = fields.Text(string='Last Error', readonly=True)
+
+    _sql_constraints = [
+        ('idempotency_key_uniq', 'unique(idempotency_key)', 'This message is already in the outbox.'),
+    ]
+
+    @api.model
+    def _enqueue(self, vals_list):
+        """Queue messages and wake the outbox cron.
+
+        ``payload`` and ``log_vals`` may be given as dicts. Messages whose
+        ``idempotency_key`` is already in the outbox are not queued again;
+        the existing message is returned in their place, so callers must
+        read its ``state``. An existing message that failed is queued again:
+        sending it again is an explicit resend.
+        """
+        single = isinstance(vals_list, dict)
+        vals_list = [vals_list] if single else vals_list
+        keys = [vals['idempotency_key'] for vals in vals_list]
+        found = self.sudo().search([('idempotency_key', 'in', keys)])
+        existing = {msg.idempotency_key: msg.id for msg in found}
+        failed = found.filtered(lambda msg: msg.state == 'failed')
+        if failed:
+            failed.write({'state': 'queued', 'attempts': 0, 'next_attempt_at': False, 'last_error': False})
+        to_create = []
+        for vals in vals_list:
+            if vals['idempotency_key'] in existing:
+                continue
+            vals = dict(vals)
+            for field in ('payload', 'log_vals'):
+                if isinstance(vals.get(field), (dict, list)):
+                    vals[field] = json.dumps(vals[field])
+            to_create.append(vals)
+        for message in self.sudo().create(to_create):
+            existing[message.idempotency_key] = message.id
+        if to_create or failed:
+            self.env.ref('contract_management.ir_cron_message_outbox').sudo()._trigger()
+        messages = self.browse([existing[key] for key in keys])
+        return messages[:1] if single else messages
+
+    @api.model
+    def _claim(self, limit):
+        """Atomically move up to ``limit`` due messages to running and commit."""
+        self.env.cr.execute("""
+            UPDATE contract_message_outbox
+               SET state = 'running',
+                   attempts = attempts + 1,
+                   started_at = NOW() AT TIME ZONE 'UTC'
+             WHERE id IN (
+                    SELECT id FROM contract_message_outbox
+                     WHERE state = 'queued'
+                       AND (next_attempt_at IS NULL OR next_attempt_at <= NOW() AT TIME ZONE 'UTC')
+                     ORDER BY id
+                     LIMIT %s
+                       FOR UPDATE SKIP LOCKED)
+         RETURNING id
+        """, [limit])
+        ids = [row[0] for row in self.env.cr.fetchall()]
+        self.env.cr.commit()
+        return ids
+
+    @api.model
+    def cron_process_outbox(self):
+        """Deliver due messages until the queue is empty or the run budget is spent."""
+        self.sudo().search([
+            ('state', '=', 'running'),
+            ('started_at', '<', fields.Datetime.now() - timedelta(minutes=STALE_RUNNING_MINUTES)),
+        ]).write({'state': 'queued'})
+
+        deadline = time.monotonic() + RUN_BUDGET_SECONDS
+        processed = 0
+        while time.monotonic() < deadline:
+            ids = self._claim(BATCH_SIZE)
+            if not ids:
+                break
+            messages = self.sudo().browse(ids)
+            for kind, batch in messages.grouped('kind').items():
+                getattr(batch, '_deliver_%s' % kind)()
+            self.env.cr.commit()
+            processed += len(ids)
+        if processed:
+            _logger.info("[Message Outbox] Processed %s messages", processed)
+        return processed
+
+    def _get_payload(self):
+        self.ensure_one()
+        return json.loads(self.payload)
+
+    def _deliver_fc_template(self):
+        """Send templates through ``whatsapp.comm``, one savepoint per message."""
+        WhatsApp = self.env['whatsapp.comm']
+        for message in self:
+            result = None
+            try:
+                with self.env.cr.savepoint():
+                    result = WhatsApp._send_fc_template_request(message._get_payload())
+                    if not result.get('success'):
+                        raise ValueError(result.get('error') or _('Unknown error sending WhatsApp'))
+                    response = result.get('response') or {}
+                    request_id = response.get('request_id')
+                    if request_id and message.log_vals:
+                        WhatsApp._create_fc_whatsapp_log(
+                            base_vals=json.loads(message.log_vals),
+                            response_dict=result,
+                            verification_dict=None,
+                            test_mode=message.test_mode,
+                        )
+                    message._mark_sent(request_id)
+            except Exception as e:
+                _logger.warning("[Message Outbox] Message %s failed: %s", message.id, e)
+                message._register_failure(str(e), permanent=is_permanent_error((result or {}).get('status_code')))
+
+    def _deliver_fc_quote(self):
+        """POST quote documents to the provider concurrently through the pooled session."""
+        ICP = self.env['ir.config_parameter'].sudo()
+        url = f"{ICP.get_param('fc_url_base', '')}/{ICP.get_param('fc_url_send', '')}"
+        headers = {
+            'Content-Type': 'application/json; charset=utf-8',
+            'Accept': 'application/json',
+            'Authorization': ICP.get_param('fc_auth_token', ''),
+        }
+        try:
+            concurrency = int(ICP.get_param('contract_management.whatsapp_send_concurrency', DEFAULT_CONCURRENCY))
+        except (TypeError, ValueError):
+            concurrency = DEFAULT_CONCURRENCY
+        replies = post_messages(url, headers, [message._get_payload() for message in self], concurrency=concurrency)
+        for message, reply in zip(self, replies):
+            if reply['request_id']:
+                try:
+                    with self.env.cr.savepoint():
+                        message._mark_sent(reply['request_id'])
+                except Exception as e:
+                    # delivered: never send it again because its chatter post failed
+                    _logger.warning("[Message Outbox] Message %s was sent but not logged: %s", message.id, e)
+                    message.write({
+                        'state': 'done',
+                        'request_id': reply['request_id'],
+                        'finished_at': fields.Datetime.now(),
+                        'last_error': str(e),
+                    })
+            else:
+                message._register_failure(reply['error'], permanent=is_permanent_error(reply['status_code']))
+
+    def _deliver_docusign_notification(self):
+        """Notify or re-notify DocuSign recipients, one savepoint per message."""
+        try:
+            client = DocuSignClient.from_env(self.env, background=True)
+        except DocuSignBudgetExhausted as e:
+            self._postpone(e.retry_at)
+            return
+        for message in self:
+            payload = message._get_payload()
+            try:
+                with self.env.cr.savepoint():
+                    if payload.get('resend'):
+                        client.resend_recipient(payload['envelope_id'], payload['recipient_id'])
+                    else:
+                        client.send_notification(payload['envelope_id'], payload['body'])
+                    message._mark_sent()
+            except DocuSignBudgetExhausted as e:
+                message._postpone(e.retry_at)
+            except Exception as e:
+                _logger.warning("[Message Outbox] Message %s failed: %s", message.id, e)
+                message._register_failure(str(e), permanent=is_permanent_error(getattr(e, 'status_code', None)))
+
+    def _get_record(self):
+        self.ensure_one()
+        if not self.res_model or not self.res_id or self.res_model not in self.env:
+            return None
+        record = self.env[self.res_model].browse(self.res_id).exists()
+        return record if record and hasattr(record, 'message_post') else None
+
+    def _mark_sent(self, request_id=None):
+        self.ensure_one()
+        self.write({
+            'state': 'done',
+            'request_id': request_id or False,
+            'finished_at': fields.Datetime.now(),
+            'last_error': False,
+        })
+        record = self._get_record()
+        if record and self.sent_message:
+            body = self.sent_message
+            if request_id:
+                body += _(" (Request ID: %s)") % request_id
+            record.message_post(body=body)
+
+    def _register_failure(self, error, permanent=False):
+        """Retry later with backoff, or fail (and escalate) once retries are spent or the error is permanent."""
+        self.ensure_one()
+        if permanent or self.attempts >= MAX_ATTEMPTS:
+            self.write({'state': 'failed', 'last_error': error, 'finished_at': fields.Datetime.now()})
+            self._escalate()
+        else:
+            self.write({
+                'state': 'queued',
+                'last_error': error,
+                'next_attempt_at': fields.Datetime.now() + timedelta(minutes=BACKOFF_MINUTES * 2 ** (self.attempts - 1)),
+            })
+
+    def _postpone(self, retry_at):
+        """Queue again without counting the attempt (API budget exhausted before calling)."""
+        for message in self:
+            message.write({
+                'state': 'queued',
+                'attempts': max(message.attempts - 1, 0),
+                'next_attempt_at': retry_at or fields.Datetime.now() + timedelta(minutes=BACKOFF_MINUTES),
+            })
+
+    def _escalate(self):
+        """Open a helpdesk ticket for a message that could not be delivered."""
+        self.ensure_one()
+        record = self._get_record()
+        if record:
+            record.message_post(body=_("%s FAILED after %s attempts: %s") % (self.name, self.attempts, self.last_error))
+        if 'helpdesk.ticket' not in self.env:
+            return
+        self.env['helpdesk.ticket'].sudo().create({
+            'name': "Unable to Send DocuSign Notification" if self.kind == 'docusign_notification' else "Unable to Send WhatsApp",
+            'description': "%s to %s was %s" % (self.name, self.to_phone, self.last_error),
+            'message_needaction': True,
+            'ticket_type_id': 4,
+        })
+
+    def action_retry(self):
+        self.write({'state': 'queued', 'attempts': 0, 'next_attempt_at': False, 'last_error': False})
+        self.env.ref('contract_management.ir_cron_message_outbox').sudo()._trigger()
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+import logging
+import time
+from collections import defaultdict
+
+from odoo import api, fields, models
+from odoo.tools import str2bool
+from odoo.tools.profiler import Profiler
+
+_logger = logging.getLogger(__name__)
+
+# Sections below both thresholds are folded into their template's total.
+MIN_SECTION_MS = 1.0
+MIN_SECTION_QUERIES = 1
+
+
+class ContractRenderProfile(models.Model):
+    """Time and SQL queries of one contract/addendum report render.
+
+    HTML generation and the wkhtmltopdf conversion are measured separately;
+    the QWeb part is broken down per template and per directive (loops,
+    sub-template calls, ...) so the expensive sections of the contract, and
+    loops that read once per order line, stand out.
+    """
+    _name = 'contract.render.profile'
+    _description = 'Contract Render Profile'
+    _order = 'id desc'
+
+    name = fields.Char(string='Report', readonly=True)
+    report_id = fields.Many2one('ir.actions.report', string='Report Action', readonly=True, ondelete='set null')
+    order_ids = fields.Many2many('sale.order', string='Orders', readonly=True)
+    order_count = fields.Integer(string='Orders Rendered', readonly=True)
+    user_id = fields.Many2one('res.users', string='User', readonly=True, default=lambda self: self.env.user)
+    total_ms = fields.Float(string='Total (ms)', readonly=True)
+    html_ms = fields.Float(string='HTML (ms)', readonly=True, help='QWeb rendering and HTML preparation.')
+    pdf_ms = fields.Float(string='wkhtmltopdf (ms)', readonly=True)
+    pdf_runs = fields.Integer(string='wkhtmltopdf Runs', readonly=True)
+    query_count = fields.Integer(string='SQL Queries', readonly=True)
+    pdf_size = fields.Integer(string='PDF Size (bytes)', readonly=True)
+    section_ids = fields.One2many('contract.render.profile.section', 'profile_id', string='Sections', readonly=True)
+
+    @api.model
+    def _is_enabled(self):
+        """Profiling mode: every contract render is profiled while the parameter is set."""
+        return str2bool(self.env['ir.config_parameter'].sudo().get_param(
+            'contract_management.contract_render_profile', 'False'))
+
+    @api.model
+    def _profile_render(self, report, res_ids, data=None):
+        """Render ``report`` for ``res_ids`` like ``_render_qweb_pdf`` and record a profile.
+
+        Return ``(pdf_content, report_type, profile)``; the profile is created
+        in the current transaction.
+        """
+        report = report.sudo()
+        cr = self.env.cr
+        timings = {'pdf_ms': 0.0, 'pdf_runs': 0}
+        Report = self.env['ir.actions.report'].with_context(contract_render_profile=timings, profile=True)
+        queries_before = cr.sql_log_count
+        started = time.monotonic()
+        with Profiler(collectors=['qweb'], db=None, description=report.report_name) as profiler:
+            pdf_content, report_type = Report._render_qweb_pdf(report.id, res_ids, data=data)
+        total_ms = (time.monotonic() - started) * 1000
+        query_count = cr.sql_log_count - queries_before
+
+        profile = self.sudo().create({
+            'name': report.report_name,
+            'report_id': report.id,
+            'order_ids': [(6, 0, res_ids)] if report.model == 'sale.order' else False,
+            'order_count': len(res_ids),
+            'total_ms': total_ms,
+            'pdf_ms': timings['pdf_ms'],
+            'html_ms': total_ms - timings['pdf_ms'],
+            'pdf_runs': timings['pdf_runs'],
+            'query_count': query_count,
+            'pdf_size': len(pdf_content or b''),
+            'section_ids': [(0, 0, vals) for vals in self._collect_sections(profiler)],
+        })
+        _logger.info("[Render Profile] %s for %d orders: %.0f ms (html %.0f ms, pdf %.0f ms), %d queries -> profile %s",
+                     report.report_name, len(res_ids), total_ms, profile.html_ms, profile.pdf_ms, query_count, profile.id)
+        return pdf_content, report_type, profile
+
+    @api.model
+    def _collect_sections(self, profiler):
+        """Aggregate the QWeb collector events per template and per directive."""
+        events = []
+        for collector in profiler.collectors:
+            for entry in collector.entries:
+                results = entry.get('results', entry)
+                events.extend(results.get('data') or [])
+
+        per_template = defaultdict(lambda: [0, 0.0, 0])
+        per_directive = defaultdict(lambda: [0, 0.0, 0])
+        for event in events:
+            view_id = event.get('view_id')
+            delay = (event.get('delay') or 0.0) * 1000
+            queries = event.get('query') or 0
+            for bucket in (per_template[view_id], per_directive[(view_id, event.get('xpath') or '', event.get('directive') or '')]):
+                bucket[0] += 1
+                bucket[1] += delay
+                bucket[2] += queries
+
+        views = self.env['ir.ui.view'].sudo().browse([view_id for view_id in per_template if view_id]).exists()
+        view_names = {view.id: view.key or view.name for view in views}
+        sections = []
+        for view_id, (calls, duration, queries) in per_template.items():
+            sections.append({
+                'template': view_names.get(view_id, str(view_id or '')),
+                'kind': 'template',
+                'calls': calls,
+                'duration_ms': duration,
+                'query_count': queries,
+            })
+        for (view_id, xpath, directive), (calls, duration, queries) in per_directive.items():
+            if duration < MIN_SECTION_MS and queries < MIN_SECTION_QUERIES:
+                continue
+            sections.append({
+                'template': view_names.get(view_id, str(view_id or '')),
+                'kind': 'directive',
+                'xpath': xpath,
+                'directive': directive,
+                'calls': calls,
+                'duration_ms': duration,
+                'query_count': queries,
+            })
+        return sections
+
+
+class ContractRenderProfileSection(models.Model):
+    _name = 'contract.render.profile.section'
+    _description = 'Contract Render Profile Section'
+    _order = 'duration_ms desc, id'
+
+    profile_id = fields.Many2one('contract.render.profile', required=True, ondelete='cascade', index=True)
+    template = fields.Char(string='Template', readonly=True)
+    kind = fields.Selection([('template', 'Template'), ('directive', 'Directive')], string='Kind', readonly=True)
+    xpath = fields.Char(string='Section (XPath)', readonly=True)
+    directive = fields.Char(string='Directive', readonly=True)
+    calls = fields.Integer(string='Calls', readonly=True)
+    duration_ms = fields.Float(string='Time (ms)', readonly=True)
+    query_count = fields.Integer(string='SQL Queries', readonly=True)
+    queries_per_call = fields.Float(string='Queries / Call', compute='_compute_queries_per_call')
+
+    @api.depends('calls', 'query_count')
+    def _compute_queries_per_call(self):
+        for section in self:
+            section.queries_per_call = section.query_count / section.calls if section.calls else 0.0
@@ -0,0 +1,465 @@
+# -*- coding: utf-8 -*-
+"""Pooled, retrying HTTP client shared by every DocuSign call of the module."""
+
+from __future__ import annotations
+
+import logging
+import os
+import random
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+from odoo import _
+from odoo.exceptions import UserError
+
+_logger = logging.getLogger(__name__)
+
+DEFAULT_CONNECT_TIMEOUT = 5.0
+DEFAULT_READ_TIMEOUT = 30.0
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BACKOFF = 0.5
+MAX_BACKOFF = 30.0
+
+POOL_CONNECTIONS = 4
+POOL_MAXSIZE = 16
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+# POST creates envelopes and tokens: only retried when DocuSign told us the
+# request was not processed (429) or the connection never got established.
+IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'PUT', 'DELETE', 'OPTIONS'})
+
+API_PATH = '/restapi/v2.1/accounts/%s'
+
+_session: Optional[requests.Session] = None
+_session_pid: Optional[int] = None
+_session_lock = threading.Lock()
+
+
+class DocuSignError(UserError):
+    """Raised when DocuSign answers with an unexpected status."""
+
+    def __init__(self, message, status_code=None, body=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.body = body
+
+
+class DocuSignBudgetExhausted(DocuSignError):
+    """Raised to background work when the API budget left is reserved for users."""
+
+    def __init__(self, message, retry_at=None):
+        super().__init__(message)
+        self.retry_at = retry_at
+
+
+class DocuSignUnavailable(DocuSignError):
+    """Raised without calling DocuSign while the circuit breaker is open."""
+
+
+def is_outage(exc: Exception) -> bool:
+    """True for failures that mean DocuSign is down: network errors and 5xx."""
+    if isinstance(exc, (DocuSignUnavailable, DocuSignBudgetExhausted)):
+        return False
+    if isinstance(exc, DocuSignError):
+        return exc.status_code is None or exc.status_code >= 500
+    return isinstance(exc, requests.RequestException)
+
+
+def parse_rate_limit(response: requests.Response) -> Optional[Dict[str, int]]:
+    """Read DocuSign's ``X-RateLimit-*`` headers (reset is an epoch timestamp)."""
+    headers = response.headers
+    try:
+        return {
+            'limit': int(headers['X-RateLimit-Limit']),
+            'remaining': int(headers['X-RateLimit-Remaining']),
+            'reset': int(headers['X-RateLimit-Reset']),
+        }
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def get_session() -> requests.Session:
+    """Return the keep-alive session of the current worker process.
+
+    The session is rebuilt after a fork so prefork workers never share
+    sockets inherited from the parent process.
+    """
+    global _session, _session_pid
+    pid = os.getpid()
+    if _session is None or _session_pid != pid:
+        with _session_lock:
+            if _session is None or _session_pid != pid:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=POOL_CONNECTIONS,
+                    pool_maxsize=POOL_MAXSIZE,
+                    max_retries=0,
+                )
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _session = session
+                _session_pid = pid
+    return _session
+
+
+def _retry_delay(attempt: int, backoff: float, response: Optional[requests.Response] = None) -> float:
+    """Exponential backoff with jitter, honouring ``Retry-After`` when present."""
+    if response is not None:
+        retry_after = response.headers.get('Retry-After')
+        if retry_after:
+            try:
+                return min(float(retry_after), MAX_BACKOFF)
+            except ValueError:
+                pass
+    delay = backoff * (2 ** attempt)
+    return min(delay + random.uniform(0, backoff), MAX_BACKOFF)
+
+
+def _error_message(response: requests.Response) -> str:
+    try:
+        data = response.json()
+        return data.get('message') or data.get('errorCode') or response.text
+    except ValueError:
+        return response.text
+
+
+def _not_sent(exc: Exception) -> bool:
+    """True when ``exc`` was raised before the request reached DocuSign (safe to repeat a POST)."""
+    if isinstance(exc, requests.ConnectTimeout):
+        return True
+    if not isinstance(exc, requests.ConnectionError) or not exc.args:
+        return False
+    # urllib3 wraps DNS failures and refused connections in MaxRetryError.reason
+    return isinstance(getattr(exc.args[0], 'reason', exc.args[0]), NewConnectionError)
+
+
+def send_request(
+    method: str,
+    url: str,
+    *,
+    timeout: Tuple[float, float] = (DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT),
+    max_retries: int = DEFAULT_MAX_RETRIES,
+    backoff: float = DEFAULT_BACKOFF,
+    expected: Iterable[int] = (200, 201),
+    label: str = '',
+    on_response: Optional[Callable[[requests.Response], None]] = None,
+    **kwargs: Any,
+) -> requests.Response:
+    """Perform one DocuSign HTTP call through the pooled session.
+
+    Retries 429/5xx answers and connection failures with exponential
+    backoff (non-idempotent methods only on 429 and on connection failures
+    raised before the request was sent: connect timeouts, refused
+    connections, DNS errors), logs
+    the latency of every attempt and raises :class:`DocuSignError` when the
+    final answer is not in ``expected``. ``on_response`` sees every answer,
+    retried ones included (used to track the rate-limit headers).
+    """
+    method = method.upper()
+    session = get_session()
+    retry_any = method in IDEMPOTENT_METHODS
+    label = label or '%s %s' % (method, url.split('?', 1)[0])
+    attempt = 0
+    while True:
+        started = time.monotonic()
+        try:
+            response = session.request(method, url, timeout=timeout, **kwargs)
+        except (requests.ConnectionError, requests.Timeout) as exc:
+            elapsed = (time.monotonic() - started) * 1000
+            retryable = retry_any or _not_sent(exc)
+            _logger.warning("[DocuSign] %s failed after %.0f ms (attempt %s): %s",
+                            label, elapsed, attempt + 1, exc)
+            if retryable and attempt < max_retries:
+                time.sleep(_retry_delay(attempt, backoff))
+                attempt += 1
+                continue
+            raise DocuSignError(_("DocuSign is not reachable: %s") % exc) from exc
+
+        elapsed = (time.monotonic() - started) * 1000
+        _logger.info("[DocuSign] %s -> %s in %.0f ms (attempt %s)",
+                     label, response.status_code, elapsed, attempt + 1)
+        if on_response is not None:
+            try:
+                on_response(response)
+            except Exception:
+                _logger.exception("[DocuSign] Response observer failed")
+
+        status = response.status_code
+        if status in RETRY_STATUSES and attempt < max_retries and (retry_any or status == 429):
+            delay = _retry_delay(attempt, backoff, response)
+            response.close()
+            time.sleep(delay)
+            attempt += 1
+            continue
+
+        if status not in expected:
+            message = _error_message(response)
+            if status == 401:
+                message = _("DocuSign authentication has expired: %s") % message
+            raise DocuSignError(_("DocuSign Error (%s): %s") % (status, message),
+                                status_code=status, body=response.text)
+        return response
+
+
+def request_access_token(oauth_host: str, assertion: str, connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+                         read_timeout: float = DEFAULT_READ_TIMEOUT, max_retries: int = DEFAULT_MAX_RETRIES,
+                         backoff: float = DEFAULT_BACKOFF) -> Dict[str, Any]:
+    """Exchange a signed JWT assertion for an access token.
+
+    ``oauth_host`` is a bare host name, or a full base URL (scheme included)
+    when pointing at a local stand-in server.
+    """
+    base_url = oauth_host if '://' in oauth_host else 'https://%s' % oauth_host
+    response = send_request(
+        'POST',
+        base_url.rstrip('/') + '/oauth/token',
+        data={
+            'grant_type': 'urn:ietf:params:oauth:grant-type:jwt-bearer',
+            'assertion': assertion,
+        },
+        headers={'Content-Type': 'application/x-www-form-urlencoded'},
+        timeout=(connect_timeout, read_timeout),
+        max_retries=max_retries,
+        backoff=backoff,
+        expected=(200,),
+        label='POST oauth/token',
+    )
+    return response.json()
+
+
+def recipient_statuses(recipients: Optional[Dict[str, Any]]) -> Dict[str, str]:
+    """Map signer emails (lowercased) to their status from a recipients payload."""
+    statuses: Dict[str, str] = {}
+    for signer in (recipients or {}).get('signers') or []:
+        email = (signer.get('email') or '').strip().lower()
+        if email:
+            statuses[email] = signer.get('status')
+    return statuses
+
+
+def parse_datetime(value: Optional[str]) -> Optional[datetime]:
+    """Naive UTC datetime of a DocuSign timestamp (``2024-01-15T10:20:30.1230000Z``), or ``None``."""
+    try:
+        return datetime.strptime((value or '')[:19], '%Y-%m-%dT%H:%M:%S')
+    except ValueError:
+        return None
+
+
+def envelope_last_activity(envelope: Dict[str, Any]) -> Optional[datetime]:
+    """Latest send, resend or change of an envelope payload; recipient updates move it."""
+    dates = [parse_datetime(envelope.get(key)) for key in (
+        'sentDateTime', 'lastModifiedDateTime', 'statusChangedDateTime', 'createdDateTime')]
+    dates = [d for d in dates if d]
+    return max(dates) if dates else None
+
+
+class DocuSignClient:
+    """Envelope operations against one DocuSign account.
+
+    Instances are cheap; the connection pool lives in the module-level
+    session so every client of the same worker reuses its sockets.
+
+    A client built for background work carries a ``budget``: the number of
+    calls it may still make before raising :class:`DocuSignBudgetExhausted`.
+    """
+
+    def __init__(self, base_uri, account_id, access_token, connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+                 read_timeout=DEFAULT_READ_TIMEOUT, max_retries=DEFAULT_MAX_RETRIES, backoff=DEFAULT_BACKOFF,
+                 on_response=None, budget=None, retry_at=None, breaker=None):
+        if not base_uri or not account_id:
+            raise UserError(_("DocuSign base URI and account ID must be configured."))
+        self.base_uri = base_uri.rstrip('/')
+        self.account_id = account_id
+        self.access_token = access_token
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.on_response = on_response
+        self.budget = budget
+        self.retry_at = retry_at
+        self.breaker = breaker
+        self._budget_lock = threading.Lock()
+
+    @classmethod
+    def get_settings(cls, env) -> Dict[str, float]:
+        """Read timeouts and retry policy from system parameters."""
+        params = env['ir.config_parameter'].sudo()
+
+        def _float(key, default):
+            try:
+                return float(params.get_param(key, default))
+            except (TypeError, ValueError):
+                return default
+
+        return {
+            'connect_timeout': _float('contract_management.docusign_connect_timeout', DEFAULT_CONNECT_TIMEOUT),
+            'read_timeout': _float('contract_management.docusign_read_timeout', DEFAULT_READ_TIMEOUT),
+            'max_retries': int(_float('contract_management.docusign_max_retries', DEFAULT_MAX_RETRIES)),
+            'backoff': _float('contract_management.docusign_retry_backoff', DEFAULT_BACKOFF),
+        }
+
+    @classmethod
+    def from_env(cls, env, user=None, background=None, **overrides):
+        """Build a client for the contract DocuSign service user.
+
+        ``background`` (default: the ``docusign_background`` context key)
+        limits the client to the API budget not reserved for interactive use.
+        ``overrides`` replace timeout/retry settings, e.g. ``max_retries=0``
+        for calls made while an HTTP worker waits.
+        """
+        from odoo.addons.odoo_docusign.models import docu_client
+
+        user = user or env['res.users']._get_contract_docusign_user()
+        if background is None:
+            background = env.context.get('docusign_background', False)
+        Account = env['docusign.service.account']
+        budget = retry_at = None
+        if background:
+            budget, retry_at = Account._background_budget(user)
+            if budget is not None and budget <= 0:
+                raise DocuSignBudgetExhausted(
+                    _("DocuSign API budget reserved for interactive use until %s") % retry_at, retry_at=retry_at)
+        breaker = Account._circuit_breaker(user)
+        breaker.before_call()  # fail fast before even touching the token
+        config = docu_client._get_docusign_config(env)
+        access_token = Account.get_access_token(user)
+        settings = dict(cls.get_settings(env), **overrides)
+        return cls(config['base_uri'], config['account_id'], access_token,
+                   on_response=Account._rate_limit_observer(user), budget=budget, retry_at=retry_at,
+                   breaker=breaker, **settings)
+
+    # ------------------------------------------------------------------
+    # Low level
+    # ------------------------------------------------------------------
+    @property
+    def api_url(self) -> str:
+        return self.base_uri + API_PATH % self.account_id
+
+    def _headers(self, extra=None):
+        headers = {
+            'Authorization': 'Bearer %s' % self.access_token,
+            'Accept': 'application/json',
+        }
+        if extra:
+            headers.update(extra)
+        return headers
+
+    def _consume_budget(self):
+        if self.budget is None:
+            return
+        with self._budget_lock:
+            if self.budget <= 0:
+                raise DocuSignBudgetExhausted(
+                    _("DocuSign API budget reserved for interactive use until %s") % self.retry_at,
+                    retry_at=self.retry_at)
+            self.budget -= 1
+
+    def request(self, method, path, expected=(200, 201), headers=None, **kwargs) -> requests.Response:
+        url = path if path.startswith('http') else self.api_url + path
+        self._consume_budget()
+        if self.breaker is not None:
+            self.breaker.before_call()
+        try:
+            response = send_request(
+                method, url,
+                headers=self._headers(headers),
+                timeout=self.timeout,
+                max_retries=self.max_retries,
+                backoff=self.backoff,
+                expected=expected,
+                label='%s %s' % (method.upper(), path.split('?', 1)[0]),
+                on_response=self.on_response,
+                **kwargs
+            )
+        except Exception as exc:
+            if self.breaker is not None:
+                self.breaker.record(exc)
+            raise
+        if self.breaker is not None:
+            self.breaker.record(None)
+        return response
+
+    # ------------------------------------------------------------------
+    # Envelopes
+    # ------------------------------------------------------------------
+    def create_envelope(self, definition) -> Dict[str, Any]:
+        return self.request('POST', '/envelopes', json=definition, expected=(201,)).json()
+
+    def create_envelope_multipart(self, body) -> str:
+        """Create an envelope from a ``docusign_envelope.MultipartBody`` and return its id.
+
+        The documents travel as raw multipart parts instead of base64 in the
+        JSON definition; the body is re-iterable so a retried POST resends it.
+        """
+        response = self.request('POST', '/envelopes', data=body,
+                                headers={'Content-Type': body.content_type}, expected=(201,))
+        return response.json()['envelopeId']
+
+    def get_envelope(self, envelope_id) -> Dict[str, Any]:
+        return self.request('GET', '/envelopes/%s' % envelope_id, expected=(200,)).json()
+
+    def replace_documents(self, envelope_id, documents, resend_envelope=False) -> Dict[str, Any]:
+        """Replace documents of an envelope in process; ``documents`` are DocuSign document dicts."""
+        params = {'resend_envelope': 'true'} if resend_envelope else None
+        return self.request('PUT', '/envelopes/%s/documents' % envelope_id,
+                            json={'documents': documents}, params=params).json()
+
+    def void_envelope(self, envelope_id, reason) -> Dict[str, Any]:
+        return self.request('PUT', '/envelopes/%s' % envelope_id,
+                            json={'status': 'voided', 'voidedReason': reason}).json()
+
+    def list_recipients(self, envelope_id) -> Dict[str, Any]:
+        return self.request('GET', '/envelopes/%s/recipients' % envelope_id, expected=(200,)).json()
+
+    def update_recipients(self, envelope_id, payload, resend_envelope=False) -> Dict[str, Any]:
+        params = {'resend_envelope': 'true'} if resend_envelope else None
+        return self.request('PUT', '/envelopes/%s/recipients' % envelope_id,
+                            json=payload, params=params).json()
+
+    def send_notification(self, envelope_id, payload) -> Dict[str, Any]:
+        return self.request('PUT', '/envelopes/%s/notification' % envelope_id, json=payload).json()
+
+    def resend_recipient(self, envelope_id, recipient_id) -> Dict[str, Any]:
+        return self.request('PUT', '/envelopes/%s/recipients/%s/resend_envelope' % (envelope_id, recipient_id),
+                            json={}).json()
+
+    def list_documents(self, envelope_id) -> Dict[str, Any]:
+        return self.request('GET', '/envelopes/%s/documents' % envelope_id, expected=(200,)).json()
+
+    def get_document(self, envelope_id, document_id='combined', stream=False) -> requests.Response:
+        return self.request('GET', '/envelopes/%s/documents/%s' % (envelope_id, document_id),
+                            expected=(200,), headers={'Accept': 'application/pdf'}, stream=stream)
+
+    def create_recipient_view(self, envelope_id, user_name, email, client_user_id, return_url) -> str:
+        """Return the embedded signing URL of an envelope recipient."""
+        data = self.request('POST', '/envelopes/%s/views/recipient' % envelope_id, json={
+            'authenticationMethod': 'none',
+            'clientUserId': client_user_id,
+            'email': email,
+            'userName': user_name,
+            'returnUrl': return_url,
+        }, expected=(201,)).json()
+        return data.get('url')
+
+    def iter_envelope_changes(self, from_date, include='recipients', page_size=100):
+        """Yield pages of envelopes whose status changed since ``from_date``."""
+        start = 0
+        while True:
+            data = self.request('GET', '/envelopes', expected=(200,), params={
+                'from_date': from_date,
+                'include': include,
+                'start_position': start,
+                'count': page_size,
+            }).json()
+            envelopes = data.get('envelopes') or []
+            if envelopes:
+                yield envelopes
+            start += int(data.get('resultSetSize') or len(envelopes))
+            if not envelopes or start >= int(data.get('totalSetSize') or 0):
+                break
@@ -3,13 +3,14 @@ from odoo.exceptions import UserError, ValidationError
 from datetime import date, timedelta
 from dateutil.relativedelta import relativedelta
 import time
-import base64
 import requests
 import json
 import re
 import logging
-from docusign_esign import ApiClient, EnvelopesApi, OAuth, Signer, RecipientPhoneNumber, Tabs, SignHere
-from odoo.addons.odoo_docusign.models import docu_client
+from concurrent.futures import ThreadPoolExecutor
+from docusign_esign import ApiClient, EnvelopesApi, OAuth
+from .docusign_api import DocuSignBudgetExhausted, DocuSignClient, envelope_last_activity, recipient_statuses
+from .docusign_envelope import MultipartBody, attachment_source, compile_envelope
 
 _logger = logging.getLogger(__name__)
 
@@ -18,10 +19,21 @@ platform_type = {
     'prod': 'account.docusign.com'
 }
 
+# Re-read a few minutes before the last sync to absorb clock skew with DocuSign.
+SYNC_OVERLAP_MINUTES = 5
+# Parallel recipient fetches of one status check.
+STATUS_CONCURRENCY = 8
+# Signed PDFs are streamed to the filestore in chunks of this size.
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+# Connectors pending longer than this are checked by the stale envelope reaper.
+DEFAULT_STALE_ENVELOPE_DAYS = 90
+# API calls made by one download_docs (envelope status + document).
+DOWNLOAD_API_CALLS = 2
+
 class OverrideDocumentStatus(models.Model):
     _inherit = 'docusign.connector'
 
-    state = fields.Selection([('new', 'New'), ('open', 'Open'),('sent', 'Sent'), ('customer', 'Customer Signed'), ('completed', 'Completed')], default='new')
+    state = fields.Selection([('new', 'New'), ('open', 'Open'),('sent', 'Sent'), ('customer', 'Customer Signed'), ('completed', 'Completed'), ('expired', 'Expired')], default='new')
     monthly_payment = fields.Float(string='Monthly Payment', help='Total of recurring line items with taxes')
     contract_value = fields.Float(string='Contract Value', help='Monthly payment * contract length')
     contract_management_id = fields.Many2one(
@@ -41,8 +53,6 @@ class OverrideDocumentStatus(models.Model):
 
     def send_docs(self, send_method):
         try:
-            user = self.env['res.users'].browse(196)
-#           user = self.env.user
             if not self.attachment_ids:
                 raise ValidationError(_('Attachment(s) not found.'))
             if not self.connector_line_ids:
@@ -61,70 +71,32 @@ class OverrideDocumentStatus(models.Model):
                     # First send - create envelope with ALL signers at once
                     _logger.info("[DocuSign Send] First send - creating envelope with %d signers", len(self.connector_line_ids))
                     
-                    # Get the attachment
+                    # Get the attachment (sent as raw bytes, never base64)
                     attach_file = self.attachment_ids[0]
                     attach_file_name = attach_file.name
-                    attach_file_data = attach_file.sudo().read(['datas'])
-                    file_data_encoded_string = attach_file_data[0]['datas']
-                    
-                    # Build signers list from all connector lines
-                    signers_list = []
+                    lines = self.connector_line_ids.sorted(key=lambda l: l.id)
+                    template = compile_envelope(self.env, send_method, len(lines))
+
+                    # Only the recipients are filled per send; the rest comes from the compiled template
+                    recipients = []
                     recipient_meta = []  # keep recipient_id/email per line for webhook matching
-                    for idx, line in enumerate(self.connector_line_ids.sorted(key=lambda l: l.id), 1):
+                    for idx, (line, skeleton) in enumerate(zip(lines, template.signers), 1):
                         recipient_email = line._get_recipient_email()
                         if not recipient_email:
                             raise ValidationError(_(f"Email not set for recipient: {line.partner_id.name}"))
-                        
-                        # First signer uses the send_method from wizard, others always use email
-                        current_send_method = send_method
-                        if idx != 1:
-                            current_send_method = 'email'  # Company signer always email delivery
-
-                        phone_obj = None
-                        country_code = None
-                        number = None
-
-                        if current_send_method.lower() == 'whatsapp':
-                            current_send_method = 'WhatsApp'
-                            if not line.partner_id.whatsapp:
+
+                        recipient = {'name': line.partner_id.name, 'email': recipient_email}
+                        if idx == 1 and template.phone_required:
+                            if not line.partner_id.whatsapp_e164:
                                 raise ValidationError(_(
                                     f"WhatsApp number not set for customer: {line.partner_id.name}"
                                 ))
-
-                            phone_cleaned = line.partner_id.whatsapp.lstrip('+')
-
-                            if phone_cleaned.startswith('503'):
-                                country_code = '503'
-                                number = phone_cleaned[3:]
-                            elif phone_cleaned.startswith('1') and len(phone_cleaned) == 11:
-                                country_code = '1'
-                                number = phone_cleaned[1:]
-                            elif phone_cleaned.startswith('56'):  # Chile
-                                country_code = '56'
-                                number = phone_cleaned[2:]
-                            else:
-                                country_code = phone_cleaned[:3]
-                                number = phone_cleaned[3:]
-
-                            phone_obj = RecipientPhoneNumber(
-                                country_code=country_code,
-                                number=number
-                            )
-
-                        signer = Signer(
-                            name=line.partner_id.name,
-                            email=recipient_email,
-                            recipient_id=str(idx),
-                            routing_order=str(idx),
-                            delivery_method=current_send_method,
-                            **({"phone_number": phone_obj} if phone_obj else {})
-                        )
+                            recipient['phone'] = line.partner_id._get_whatsapp_parts()
 
                         # Enable embedded signing for the customer signer when linked to a contract
-                        client_user_id = None
                         if self.contract_management_id and line.partner_id == self.contract_management_id.partner_id:
                             client_user_id = str(self.contract_management_id.id)
-                            setattr(signer, 'client_user_id', client_user_id)
+                            recipient['client_user_id'] = client_user_id
                             line.client_user_id = client_user_id
                             self.contract_management_id.write({
                                 'docusign_client_user_id': client_user_id,
@@ -133,21 +105,20 @@ class OverrideDocumentStatus(models.Model):
                                 'docusign_embedded_status': 'draft',
                             })
 
-                        signer.partner = line.partner_id
-                        signers_list.append(signer)
-                        recipient_meta.append((line, str(idx), recipient_email))
+                        recipients.append(recipient)
+                        recipient_meta.append((line, skeleton['recipientId'], recipient_email))
 
-                        if send_method == "whatsapp":
+                        if recipient.get('phone'):
                             _logger.info(
-                                "[DocuSign Send] Signer %d (WhatsApp): %s (%s, +%s %s)",
-                                idx, line.partner_id.name, recipient_email, country_code, number
+                                "[DocuSign Send] Signer %d (%s): %s (%s, +%s %s)",
+                                idx, skeleton['deliveryMethod'], line.partner_id.name, recipient_email, *recipient['phone']
                             )
                         else:
                             _logger.info(
-                                "[DocuSign Send] Signer %d (Email): %s (%s)",
-                                idx, line.partner_id.name, recipient_email
+                                "[DocuSign Send] Signer %d (%s): %s (%s)",
+                                idx, skeleton['deliveryMethod'], line.partner_id.name, recipient_email
                             )
-                   
+
                     # Prepare custom fields for DocuSign envelope
                     custom_fields = None
                     if self.monthly_payment or self.contract_value:
@@ -166,13 +137,12 @@ class OverrideDocumentStatus(models.Model):
                                 'value': str(round(self.contract_value, 2)),
                                 'show': 'true'
                             })
-                    
-                    # Send envelope with all signers and custom fields
-                    envelope_id = docu_client.send_docusign_envelope_multiple_signers(
-                        self.env, user, attach_file_name, file_data_encoded_string, signers_list,
-                        custom_fields=custom_fields
-                    )
-                    
+
+                    # Send envelope with all signers and custom fields; the PDF is a multipart part
+                    definition = template.build(recipients, attach_file_name, custom_fields=custom_fields)
+                    body = MultipartBody(definition, [('1', attach_file_name, attachment_source(attach_file))])
+                    envelope_id = DocuSignClient.from_env(self.env).create_envelope_multipart(body)
+
                     # Set the SAME envelope_id on ALL connector lines with per-line recipient ids
                     for line, recipient_id, recipient_email in recipient_meta:
                         line.un_signed_attachment_ids |= attach_file
@@ -188,8 +158,9 @@ class OverrideDocumentStatus(models.Model):
                                     envelope_id, line.id, recipient_email)
                     
                     self.write({'state': 'sent'})
+                    self._record_job_envelope(envelope_id)
                     self.env.cr.commit()
-                    return self.action_of_button(_("Document sent to %d recipients") % len(signers_list))
+                    return self.action_of_button(_("Document sent to %d recipients") % len(recipients))
                 else:
                     # Envelope already exists - allow replace only if no one has signed yet
                     any_signed = any(line.sign_status for line in lines_with_envelope)
@@ -204,11 +175,10 @@ class OverrideDocumentStatus(models.Model):
                         raise ValidationError(_("Cannot replace document: envelope_id is missing."))
 
                     # Optional safety: confirm envelope is still modifiable
+                    client = DocuSignClient.from_env(self.env)
                     envelope_status = None
-                    envelope_details = None
                     try:
-                        envelope_details = docu_client.get_envelope_details(self.env, user, envelope_id)
-                        envelope_status = envelope_details.get('status') if isinstance(envelope_details, dict) else None
+                        envelope_status = client.get_envelope(envelope_id).get('status')
                     except Exception as status_err:
                         _logger.warning("[DocuSign Send] Unable to fetch envelope status for %s: %s", envelope_id, status_err)
 
@@ -224,22 +194,19 @@ class OverrideDocumentStatus(models.Model):
                     # Determine document_id to replace (default to first document)
                     document_id = '1'
                     try:
-                        if envelope_details:
-                            env_docs = envelope_details.get('documents') or envelope_details.get('envelopeDocuments') or []
-                            if env_docs:
-                                document_id = str(env_docs[0].get('documentId', document_id))
+                        env_docs = [d for d in client.list_documents(envelope_id).get('envelopeDocuments') or []
+                                    if d.get('type', 'content') == 'content']
+                        if env_docs:
+                            document_id = str(env_docs[0].get('documentId', document_id))
                     except Exception as doc_err:
                         _logger.warning("[DocuSign Send] Unable to resolve document_id for envelope %s: %s. Falling back to %s", envelope_id, doc_err, document_id)
 
-                    docu_client.replace_envelope_document(
-                        self.env,
-                        user,
-                        envelope_id,
-                        document_id,
-                        attach_file_name,
-                        file_data_encoded_string,
-                        resend_envelope=True,
-                    )
+                    client.replace_documents(envelope_id, [{
+                        'documentId': document_id,
+                        'name': attach_file_name,
+                        'fileExtension': 'pdf',
+                        'documentBase64': file_data_encoded_string.decode() if isinstance(file_data_encoded_string, bytes) else file_data_encoded_string,
+                    }], resend_envelope=True)
 
                     # Refresh unsigned attachments and keep envelope_id on all lines
                     for line in self.connector_line_ids:
@@ -253,12 +220,19 @@ class OverrideDocumentStatus(models.Model):
                         _logger.info("[DocuSign Send] Replaced document on envelope %s for line %d (%s)", envelope_id, line.id, line.email)
 
                     self.write({'state': 'sent'})
+                    self._record_job_envelope(envelope_id)
                     self.env.cr.commit()
                     return self.action_of_button(_("Document replaced on existing envelope and resent to recipients."))
 
         except Exception as e:
             raise ValidationError(_(str(e)))
 
+    def _record_job_envelope(self, envelope_id):
+        """Remember on the running send job that its envelope went out (committed with the send)."""
+        job_id = self.env.context.get('docusign_send_job_id')
+        if job_id:
+            self.env['docusign.send.job'].sudo().browse(job_id).write({'envelope_id': envelope_id})
+
     def download_docs(self):
         try:
             _logger.info("[DocuSign Download] Starting download for connector %s", self.id)
@@ -285,91 +259,68 @@ class OverrideDocumentStatus(models.Model):
                     raise ValidationError(_('Document download failed: Missing Docusign envelope.'))
 
                 _logger.info("[DocuSign Download] Downloading envelope %s", line.envelope_id)
-                docu_status, document_data = docu_client.download_documents(self.env, user, line.envelope_id)
-                _logger.info("[DocuSign Download] Status: %s, Document data: %s", 
-                           docu_status, "received" if document_data else "None")
+                client = DocuSignClient.from_env(self.env, user)
+                docu_status = client.get_envelope(line.envelope_id).get('status')
+                _logger.info("[DocuSign Download] Envelope status: %s", docu_status)
                 
-                # Validate document_data
-                if not document_data:
-                    _logger.error("[DocuSign Download] No document data received from DocuSign (status: %s)", docu_status)
-                    raise ValidationError(_('Document download failed: No content received from DocuSign API. Status: %s') % docu_status)
+                if docu_status != 'completed':
+                    _logger.error("[DocuSign Download] Document status is not completed: %s", docu_status)
+                    raise ValidationError(_('Document download failed: Document status is %s') % str(docu_status))
                 
-                # Extract content from the document data dictionary
-                file_content = document_data.get('content')
-                filename = document_data.get('filename', line.name or 'Document.pdf')
-                mimetype = document_data.get('mimetype', 'application/pdf')
+                # Find the contract.management record linked to this connector
+                contract_mgmt = self.env['contract.management'].search([('docusign_id', '=', self.id)], limit=1)
                 
-                if not file_content:
-                    _logger.error("[DocuSign Download] Document data missing 'content' field")
-                    raise ValidationError(_('Document download failed: Document data is incomplete.'))
+                if not contract_mgmt:
+                    _logger.warning("[DocuSign Download] No contract.management found for connector %s", self.id)
+                    # Fallback to storing on connector line
+                    res_model = 'docusign.connector.lines'
+                    res_id = line.id
+                else:
+                    _logger.info("[DocuSign Download] Storing signed document on contract.management %s", contract_mgmt.id)
+                    res_model = 'contract.management'
+                    res_id = contract_mgmt.id
                 
-                # Check if all recipients are completed (docu_status can be a dict or string)
-                all_completed = False
-                if isinstance(docu_status, dict):
-                    # If it's a dict, check that all values are 'completed'
-                    all_completed = all(status == 'completed' for status in docu_status.values())
-                    _logger.info("[DocuSign Download] All recipients completed: %s", all_completed)
-                elif docu_status == 'completed':
-                    all_completed = True
+                # Stream the PDF straight into the filestore (constant memory, no base64 round trip)
+                document_id = self.env['ir.config_parameter'].sudo().get_param(
+                    'contract_management.docusign_download_document', 'combined')
+                response = client.get_document(line.envelope_id, document_id, stream=True)
+                try:
+                    attachment = self.env['ir.attachment'].sudo()._create_from_stream(
+                        response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE),
+                        {
+                            'name': line.name or 'Document.pdf',
+                            'mimetype': 'application/pdf',
+                            'res_model': res_model,
+                            'res_id': res_id,
+                        },
+                        dedupe=True,
+                    )
+                finally:
+                    response.close()
+                _logger.info("[DocuSign Download] Created attachment %s on %s (ID: %s, %s bytes)", 
+                           attachment.id, res_model, res_id, attachment.file_size)
+
+                line.sudo().write({
+                    'signed_attachment_ids': [(4, attachment.id)],
+                    'status': 'completed',
+                    'sign_status': True,
+                })
+                next_recipient = self.connector_line_ids.filtered(lambda r: r.id > line.id and not r.send_status)
+                if next_recipient:
+                    next_recipient[0].un_signed_attachment_ids |= attachment
                 
-                if not all_completed:
-                    _logger.error("[DocuSign Download] Document status is not completed: %s", docu_status)
-                    raise ValidationError(_('Document download failed: Document status is %s') % str(docu_status))
+                _logger.info("[DocuSign Download] Successfully downloaded signed document")
                 
-                if all_completed:
-                    # file_content is already bytes from docu_client, no need to encode
-                    _logger.info("[DocuSign Download] Processing completed document: %s (%d bytes)", 
-                               filename, len(file_content))
-
-                    # Find the contract.management record linked to this connector
-                    contract_mgmt = self.env['contract.management'].search([('docusign_id', '=', self.id)], limit=1)
-                    
-                    if not contract_mgmt:
-                        _logger.warning("[DocuSign Download] No contract.management found for connector %s", self.id)
-                        # Fallback to storing on connector line
-                        res_model = 'docusign.connector.lines'
-                        res_id = line.id
-                    else:
-                        _logger.info("[DocuSign Download] Storing signed document on contract.management %s", contract_mgmt.id)
-                        res_model = 'contract.management'
-                        res_id = contract_mgmt.id
-
-                    attachment = self.env['ir.attachment'].sudo().create({
-                        'name': filename,
-                        'type': 'binary',
-                        'datas': base64.b64encode(file_content).decode('utf-8'),
-                        'store_fname': filename,
-                        'mimetype': mimetype,
-                        'res_model': res_model,
-                        'res_id': res_id,
-                    })
-                    _logger.info("[DocuSign Download] Created attachment %s on %s (ID: %s)", 
-                               attachment.id, res_model, res_id)
-
-                    line.sudo().write({
-                        'signed_attachment_ids': [(4, attachment.id)],
-                        'status': 'completed',
-                        'sign_status': True,
-                    })
-                    next_recipient = self.connector_line_ids.filtered(lambda r: r.id > line.id and not r.send_status)
-                    if next_recipient:
-                        next_recipient[0].un_signed_attachment_ids |= attachment
-                    
-                    _logger.info("[DocuSign Download] Successfully downloaded signed document")
-                    
-                    return {
-                        'type': 'ir.actions.client',
-                        'tag': 'display_notification',
-                        'params': {
-                            'title': _('Download Complete'),
-                            'message': _('Signed document downloaded successfully.'),
-                            'type': 'success',
-                            'sticky': False,
-                        }
+                return {
+                    'type': 'ir.actions.client',
+                    'tag': 'display_notification',
+                    'params': {
+                        'title': _('Download Complete'),
+                        'message': _('Signed document downloaded successfully.'),
+                        'type': 'success',
+                        'sticky': False,
                     }
-                else:
-                    _logger.warning("[DocuSign Download] Status is not completed: %s", docu_status)
-                    raise ValidationError(_('Document download failed: Document status is %s') % docu_status)
+                }
 
             # self.write({'state': 'completed'})
         except Exception as e:
@@ -377,104 +328,35 @@ class OverrideDocumentStatus(models.Model):
             raise ValidationError(_(str(e)))
 
     def status_docs(self):
-        """Override to use contract_management's legacy docu_client and add completion handling."""
-        
+        """Refresh signature statuses from DocuSign and run completion handling.
+
+        Works on several connectors at once: unsigned lines are grouped by
+        envelope, each envelope's recipients are fetched exactly once, the
+        fetches run concurrently and the database is only written afterwards,
+        from this thread.
+        """
         try:
-            # Authenticate and get the user with fresh token (hardcoded user 196 like legacy code)
-            authenticated = self.sale_id.authenicate_jwt()
-            user = self.env['res.users'].browse(196)
-            
-            _logger.info("[DocuSign Status Check] Starting for connector %s - Total lines: %s", 
-                        self.id, len(self.connector_line_ids))
-            
-            for line in self.connector_line_ids:
-                if not line.envelope_id:
-                    raise ValidationError(_('Action Failed! Docusign envelope is missing.'))
-                
-                _logger.info("[DocuSign Status Check] Line %s - Partner: %s (%s), Envelope: %s, Current sign_status: %s",
-                            line.id, line.partner_id.name, line.email, line.envelope_id, line.sign_status)
-                
-                if not line.sign_status:
-                    docu_status = docu_client.get_status(self.env, user, line.envelope_id)
-                    _logger.info("[DocuSign Status Check] Line %s - DocuSign returned status: %s", 
-                                line.id, docu_status)
-                    
-                    # Handle dict response (multiple signers) or string response (single signer)
-                    line_status = 'unknown'
-                    if isinstance(docu_status, dict):
-                        # Multiple signers - look up this line's email
-                        line_email = line.email.lower() if line.email else ''
-                        line_status = docu_status.get(line_email, 'unknown')
-                        _logger.info("[DocuSign Status Check] Line %s - Email %s has status: %s", 
-                                    line.id, line_email, line_status)
-                    else:
-                        # Single signer - use status directly
-                        line_status = docu_status
-                    
-                    if line_status == 'completed':
-                        line.sudo().write({
-                            'status': 'completed',
-                            'sign_status': True,
-                        })
-                        self.message_post(
-                            body=_('Document signed by %s (verified via status check)') % line.partner_id.name,
-                            subject=_('Signature Confirmed'),
-                            message_type='notification',
-                            subtype_xmlid='mail.mt_note'
-                        )
-            
-            # Contract-specific logic: Update state based on signature progress.
-            # Only consider the customer signer when computing completion so legacy company
-            # signer rows do not block completion for existing connectors.
-            relevant_lines = self.connector_line_ids
-            if self.sale_id and self.sale_id.partner_id:
-                customer_lines = relevant_lines.filtered(lambda l: l.partner_id == self.sale_id.partner_id)
-                if customer_lines:
-                    relevant_lines = customer_lines
-            signed_lines = [l for l in relevant_lines if l.sign_status]
-            total_lines = len(relevant_lines)
-            _logger.info("[DocuSign Status Check] Connector %s - Signed: %s/%s customer lines", 
-                        self.id, len(signed_lines), total_lines)
-            
-            all_signed = all(l.sign_status for l in relevant_lines)
-            any_signed = any(l.sign_status for l in relevant_lines)
-            
-            _logger.info("[DocuSign Status Check] Current state: %s, any_signed: %s, all_signed: %s", 
-                        self.state, any_signed, all_signed)
-            
-            if all_signed:
-                _logger.info("[DocuSign Status Check] ALL LINES SIGNED - Marking connector %s as completed", self.id)
-                self.write({'state': 'completed'})
-            elif any_signed:
-                _logger.info("[DocuSign Status Check] SOME LINES SIGNED - Marking connector %s as 'customer' (Customer Signed)", self.id)
-                self.write({'state': 'customer'})
-            elif not all_signed:
-                _logger.info("[DocuSign Status Check] NOT all lines signed yet - Connector %s remains in state: %s", 
-                            self.id, self.state)
-            
-            # If connector completed, update subscription and contract management states
-            if self.state == 'completed':
-                # All signatures complete - auto-create install task
-                sub = self.env['sale.order'].browse(self.sale_id.id)
-                if sub.contract_state in ['pending_customer_signature', 'pending_contract', 'pending_cabal_signature']:
-                    # Skip install task creation for no-change renewals/config-only flows
-                    if sub.service_change_mode == 'no_change':
-                        _logger.info("[DocuSign Status Check] Skipping install task for no-change subscription %s", sub.id)
-                    else:
-                        # Auto-create installation task
-                        try:
-                            sub.action_create_install_task()
-                            _logger.info("[DocuSign Status Check] Installation task auto-created for subscription %s", sub.id)
-                        except Exception as e:
-                            _logger.warning("[DocuSign Status Check] Failed to auto-create install task: %s", str(e))
-                            # If task creation fails, still advance state manually
-                            sub.write({'installation_state': 'to_be_scheduled'})
-                    
-                    # Update contract to active when all signatures complete
-                    cm = self.env['contract.management'].sudo().search([('name','=',sub.cabal_sequence)]) 
-                    if cm:
-                        cm[0].write({'state': 'active'})
-                        _logger.info("[DocuSign Status Check] Contract %s activated (all signatures complete)", cm[0].id)
+            lines = self.mapped('connector_line_ids')
+            _logger.info("[DocuSign Status Check] Starting for connectors %s - Total lines: %s",
+                        self.ids, len(lines))
+            if lines.filtered(lambda l: not l.envelope_id):
+                raise ValidationError(_('Action Failed! Docusign envelope is missing.'))
+
+            pending = lines.filtered(lambda l: not l.sign_status)
+            statuses = self._fetch_envelope_statuses(set(pending.mapped('envelope_id')))
+
+            signed_count = total_lines = 0
+            for connector in self:
+                for line in connector.connector_line_ids & pending:
+                    docu_status = statuses[line.envelope_id]
+                    if isinstance(docu_status, Exception):
+                        raise docu_status
+                    _logger.info("[DocuSign Status Check] Line %s - Partner: %s (%s), Envelope: %s, DocuSign statuses: %s",
+                                line.id, line.partner_id.name, line.email, line.envelope_id, docu_status)
+                    connector._apply_line_status(line, docu_status)
+                signed, total = connector._update_signature_state()
+                signed_count += signed
+                total_lines += total
             
             # Return notification instead of popup
             return {
@@ -482,11 +364,324 @@ class OverrideDocumentStatus(models.Model):
                 'tag': 'display_notification',
                 'params': {
                     'title': _('Status Check Complete'),
-                    'message': _('Signature status updated. %s of %s recipients have signed.') % (len(signed_lines), total_lines),
+                    'message': _('Signature status updated. %s of %s recipients have signed.') % (signed_count, total_lines),
                     'type': 'success',
                     'sticky': False,
                 }
             }
 
         except Exception as e:
-            raise ValidationError(_(str(e)))
\ No newline at end of file
+            raise ValidationError(_(str(e)))
+
+    @api.model
+    def _fetch_envelope_statuses(self, envelope_ids):
+        """Return ``{envelope_id: {email: status}}``, one recipients call per envelope.
+
+        Calls run on a bounded thread pool; they only touch the HTTP client,
+        never the environment. A failed envelope maps to its exception.
+        """
+        return self._map_envelopes(
+            envelope_ids, lambda client, envelope_id: recipient_statuses(client.list_recipients(envelope_id)))
+
+    @api.model
+    def _map_envelopes(self, envelope_ids, func, client=None):
+        """Return ``{envelope_id: func(client, envelope_id)}`` computed on a bounded thread pool.
+
+        ``func`` runs in pool threads and may only use the client. An
+        envelope whose call failed maps to the exception.
+        """
+        envelope_ids = sorted(envelope_ids)
+        if not envelope_ids:
+            return {}
+        client = client or DocuSignClient.from_env(self.env)
+        try:
+            concurrency = int(self.env['ir.config_parameter'].sudo().get_param(
+                'contract_management.docusign_status_concurrency', STATUS_CONCURRENCY))
+        except (TypeError, ValueError):
+            concurrency = STATUS_CONCURRENCY
+
+        def call(envelope_id):
+            try:
+                return func(client, envelope_id)
+            except Exception as e:
+                _logger.warning("[DocuSign Status Check] Envelope %s failed: %s", envelope_id, e)
+                return e
+
+        workers = max(1, min(concurrency, len(envelope_ids)))
+        if workers == 1:
+            return {envelope_id: call(envelope_id) for envelope_id in envelope_ids}
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='docusign-status') as pool:
+            return dict(zip(envelope_ids, pool.map(call, envelope_ids)))
+
+    def _apply_line_status(self, line, docu_status):
+        """Mark ``line`` signed when DocuSign reports it completed.
+
+        ``docu_status`` is either a dict ``{email: status}`` (multiple signers)
+        or a single status string. Returns True when the line became signed.
+        """
+        self.ensure_one()
+        # Handle dict response (multiple signers) or string response (single signer)
+        if isinstance(docu_status, dict):
+            # Multiple signers - look up this line's email
+            line_email = line.email.lower() if line.email else ''
+            line_status = docu_status.get(line_email, 'unknown')
+            _logger.info("[DocuSign Status Check] Line %s - Email %s has status: %s", 
+                        line.id, line_email, line_status)
+        else:
+            # Single signer - use status directly
+            line_status = docu_status or 'unknown'
+        
+        if line_status != 'completed':
+            return False
+        line.sudo().write({
+            'status': 'completed',
+            'sign_status': True,
+        })
+        self.message_post(
+            body=_('Document signed by %s (verified via status check)') % line.partner_id.name,
+            subject=_('Signature Confirmed'),
+            message_type='notification',
+            subtype_xmlid='mail.mt_note'
+        )
+        return True
+
+    def _update_signature_state(self):
+        """Advance the connector from its lines and apply completion side effects.
+
+        Returns ``(signed_count, total_lines)`` for the customer lines.
+        """
+        self.ensure_one()
+        # Contract-specific logic: Update state based on signature progress.
+        # Only consider the customer signer when computing completion so legacy company
+        # signer rows do not block completion for existing connectors.
+        relevant_lines = self.connector_line_ids
+        if self.sale_id and self.sale_id.partner_id:
+            customer_lines = relevant_lines.filtered(lambda l: l.partner_id == self.sale_id.partner_id)
+            if customer_lines:
+                relevant_lines = customer_lines
+        signed_lines = [l for l in relevant_lines if l.sign_status]
+        total_lines = len(relevant_lines)
+        _logger.info("[DocuSign Status Check] Connector %s - Signed: %s/%s customer lines", 
+                    self.id, len(signed_lines), total_lines)
+        
+        all_signed = all(l.sign_status for l in relevant_lines)
+        any_signed = any(l.sign_status for l in relevant_lines)
+        
+        _logger.info("[DocuSign Status Check] Current state: %s, any_signed: %s, all_signed: %s", 
+                    self.state, any_signed, all_signed)
+        
+        if all_signed:
+            _logger.info("[DocuSign Status Check] ALL LINES SIGNED - Marking connector %s as completed", self.id)
+            self.write({'state': 'completed'})
+        elif any_signed:
+            _logger.info("[DocuSign Status Check] SOME LINES SIGNED - Marking connector %s as 'customer' (Customer Signed)", self.id)
+            self.write({'state': 'customer'})
+        else:
+            _logger.info("[DocuSign Status Check] NOT all lines signed yet - Connector %s remains in state: %s", 
+                        self.id, self.state)
+        
+        # If connector completed, update subscription and contract management states
+        if self.state == 'completed':
+            # All signatures complete - auto-create install task
+            sub = self.env['sale.order'].browse(self.sale_id.id)
+            if sub.contract_state in ['pending_customer_signature', 'pending_contract', 'pending_cabal_signature']:
+                # Skip install task creation for no-change renewals/config-only flows
+                if sub.service_change_mode == 'no_change':
+                    _logger.info("[DocuSign Status Check] Skipping install task for no-change subscription %s", sub.id)
+                else:
+                    # Auto-create installation task
+                    try:
+                        sub.action_create_install_task()
+                        _logger.info("[DocuSign Status Check] Installation task auto-created for subscription %s", sub.id)
+                    except Exception as e:
+                        _logger.warning("[DocuSign Status Check] Failed to auto-create install task: %s", str(e))
+                        # If task creation fails, still advance state manually
+                        sub.write({'installation_state': 'to_be_scheduled'})
+                
+                # Update contract to active when all signatures complete
+                cm = self.env['contract.management'].sudo().search([('name','=',sub.cabal_sequence)]) 
+                if cm:
+                    cm[0].write({'state': 'active'})
+                    _logger.info("[DocuSign Status Check] Contract %s activated (all signatures complete)", cm[0].id)
+        return len(signed_lines), total_lines
+
+    @api.model
+    def _apply_envelope_listing(self, envelopes):
+        """Apply a page of DocuSign envelope summaries to the matching lines.
+
+        Lines are fetched with a single query for the whole page and side
+        effects run once per affected connector. Returns the number of
+        connectors whose signatures advanced.
+        """
+        by_envelope = {e['envelopeId']: e for e in envelopes if e.get('envelopeId')}
+        if not by_envelope:
+            return 0
+        lines = self.env['docusign.connector.lines'].sudo().search([
+            ('envelope_id', 'in', list(by_envelope)),
+            ('sign_status', '=', False),
+        ])
+        updated = 0
+        for connector in lines.mapped('record_id'):
+            try:
+                with self.env.cr.savepoint():
+                    changed = False
+                    for line in lines.filtered(lambda l: l.record_id == connector):
+                        envelope = by_envelope[line.envelope_id]
+                        if envelope.get('status') == 'completed':
+                            docu_status = 'completed'
+                        else:
+                            docu_status = recipient_statuses(envelope.get('recipients')) or envelope.get('status')
+                        changed |= connector._apply_line_status(line, docu_status)
+                    if changed:
+                        connector._update_signature_state()
+                        updated += 1
+            except Exception as e:
+                _logger.exception("[DocuSign Sync] Failed to apply status to connector %s: %s", connector.id, e)
+        return updated
+
+    @api.model
+    def cron_sync_envelope_statuses(self):
+        """Pull every envelope changed since the last run in one paginated listing."""
+        params = self.env['ir.config_parameter'].sudo()
+        account = self.env['docusign.service.account']._ensure_account(
+            self.env['res.users']._get_contract_docusign_user())
+        started = fields.Datetime.now()
+        lookback_days = int(params.get_param('contract_management.docusign_sync_lookback_days', 30))
+        from_date = (account.status_synced_at or started - timedelta(days=lookback_days)) - timedelta(minutes=SYNC_OVERLAP_MINUTES)
+
+        try:
+            client = DocuSignClient.from_env(self.env, background=True)
+            pages = envelopes_seen = updated = 0
+            for envelopes in client.iter_envelope_changes(from_date.strftime('%Y-%m-%dT%H:%M:%SZ')):
+                pages += 1
+                envelopes_seen += len(envelopes)
+                updated += self._apply_envelope_listing(envelopes)
+        except DocuSignBudgetExhausted as e:
+            # keep status_synced_at: the next run re-reads the same window
+            account._defer_cron('contract_management.ir_cron_docusign_status_sync', e.retry_at)
+            return 0
+
+        account.write({'status_synced_at': started})
+        _logger.info("[DocuSign Sync] %s envelopes changed since %s (%s pages), %s connectors advanced",
+                     envelopes_seen, from_date, pages, updated)
+        return updated
+
+    @api.model
+    def cron_download_signed_documents(self, limit=50):
+        """Fetch the signed PDF of completed connectors that do not have it yet."""
+        connectors = self.search([
+            ('state', '=', 'completed'),
+            ('docs_policy', '=', 'in'),
+            ('connector_line_ids.envelope_id', '!=', False),
+            # none of the lines has the signed PDF yet (download_docs attaches it to one line only)
+            ('connector_line_ids', 'not any', [('signed_attachment_ids', '!=', False)]),
+        ], limit=limit, order='id')
+        Account = self.env['docusign.service.account']
+        downloaded = 0
+        for connector in connectors:
+            budget, retry_at = Account._background_budget()
+            if budget is not None and budget < DOWNLOAD_API_CALLS:
+                Account._defer_cron('contract_management.ir_cron_docusign_download_signed', retry_at)
+                break
+            try:
+                with self.env.cr.savepoint():
+                    connector.with_context(docusign_background=True).download_docs()
+                downloaded += 1
+            except Exception as e:
+                _logger.error("[DocuSign Download] Batch download failed for connector %s: %s", connector.id, e)
+        if downloaded:
+            _logger.info("[DocuSign Download] Downloaded signed documents for %s/%s connectors", downloaded, len(connectors))
+        return downloaded
+
+    @api.model
+    def cron_reap_stale_envelopes(self, limit=200):
+        """Retire envelopes pending signature for longer than the configured age.
+
+        Real statuses are fetched in bulk first: completed envelopes are
+        applied as usual, the others are voided in DocuSign (or only archived
+        locally) and their connector and contract move to a terminal state.
+        The age is measured from the envelope's last send or change in
+        DocuSign, so an old connector resent recently (bulk resend, recipient
+        update) is left alone; the connector's creation date only preselects.
+        """
+        params = self.env['ir.config_parameter'].sudo()
+        try:
+            days = int(params.get_param('contract_management.docusign_stale_envelope_days', DEFAULT_STALE_ENVELOPE_DAYS))
+        except (TypeError, ValueError):
+            days = DEFAULT_STALE_ENVELOPE_DAYS
+        void_in_docusign = params.get_param('contract_management.docusign_stale_envelope_action', 'void') == 'void'
+        connectors = self.search([
+            ('state', 'in', ('sent', 'open')),
+            ('create_date', '<', fields.Datetime.now() - timedelta(days=days)),
+        ], limit=limit, order='create_date')
+        if not connectors:
+            return 0
+
+        lines = connectors.mapped('connector_line_ids').filtered('envelope_id')
+        try:
+            client = DocuSignClient.from_env(self.env, background=True)
+            envelopes = self._map_envelopes(
+                set(lines.mapped('envelope_id')), lambda c, envelope_id: c.get_envelope(envelope_id), client=client)
+        except DocuSignBudgetExhausted as e:
+            self.env['docusign.service.account']._defer_cron('contract_management.ir_cron_docusign_stale_reaper', e.retry_at)
+            return 0
+        cutoff = fields.Datetime.now() - timedelta(days=days)
+
+        completed = [e for e in envelopes.values() if isinstance(e, dict) and e.get('status') == 'completed']
+        if completed:
+            self._apply_envelope_listing(completed)
+
+        reaped = 0
+        for connector in connectors:
+            envelope_ids = set(connector.connector_line_ids.mapped('envelope_id')) - {False}
+            found = [envelopes.get(envelope_id) for envelope_id in envelope_ids]
+            if any(isinstance(e, Exception) for e in found) or connector.state not in ('sent', 'open'):
+                continue  # unknown status, or it just advanced: leave it for the next run
+            statuses = {e.get('status') for e in found}
+            if 'completed' in statuses:
+                continue
+            activity = [envelope_last_activity(e) for e in found]
+            if any(not last or last >= cutoff for last in activity):
+                continue  # resent or changed within the age limit (or undated)
+            try:
+                with self.env.cr.savepoint():
+                    voided = []
+                    if void_in_docusign:
+                        for envelope in found:
+                            if envelope.get('status') in ('created', 'sent', 'delivered'):
+                                client.void_envelope(envelope['envelopeId'], _(
+                                    "Not signed within %s days") % days)
+                                voided.append(envelope['envelopeId'])
+                    connector._mark_expired(days, voided, sorted(statuses - {None}))
+                reaped += 1
+            except DocuSignBudgetExhausted as e:
+                self.env['docusign.service.account']._defer_cron(
+                    'contract_management.ir_cron_docusign_stale_reaper', e.retry_at)
+                break
+            except Exception as e:
+                _logger.exception("[DocuSign Reaper] Failed to retire connector %s: %s", connector.id, e)
+        _logger.info("[DocuSign Reaper] %s stale connectors checked, %s retired, %s completed",
+                     len(connectors), reaped, len(completed))
+        return reaped
+
+    def _mark_expired(self, days, voided_envelopes, statuses):
+        """Move the connector, its contract and subscription out of pending signature."""
+        self.ensure_one()
+        self.write({'state': 'expired'})
+        if voided_envelopes:
+            body = _("Envelope(s) %s voided in DocuSign after %s days without signature.") % (
+                ', '.join(voided_envelopes), days)
+        else:
+            body = _("Signature request archived after %s days without signature (DocuSign status: %s).") % (
+                days, ', '.join(statuses) or _('unknown'))
+        self.message_post(body=body, subject=_('Signature Request Expired'))
+
+        contracts = self.env['contract.management'].search([('docusign_id', '=', self.id)])
+        for contract in contracts:
+            contract.write({'docusign_embedded_status': 'canceled'})
+            contract.message_post(body=body, subject=_('Signature Request Expired'))
+            subscription = contract.subscription_id
+            if subscription.contract_state == 'pending_customer_signature':
+                subscription.write({'contract_state': 'pending_contract'})
+                subscription.message_post(body=body)
+        _logger.info("[DocuSign Reaper] Connector %s expired (voided: %s)", self.id, voided_envelopes)
@@ -6,6 +6,7 @@ from odoo import api, fields, models, _
 from odoo.exceptions import ValidationError
 
 
+
 def _hash_token(token: str) -> str:
     """Return a stable sha256 hash for a token."""
     return hashlib.sha256(token.encode('utf-8')).hexdigest()
@@ -18,6 +19,7 @@ class DocusignConnectorLineMagic(models.Model):
         string='Recipient Email',
         help='Explicit recipient email used for DocuSign. Falls back to partner email when empty.',
     )
+    envelope_id = fields.Char(index=True)
     magic_token_hash = fields.Char(string='Magic Link Token Hash', index=True, copy=False)
     magic_token_expires_at = fields.Datetime(string='Magic Link Expires At', copy=False)
     magic_token_used_at = fields.Datetime(string='Magic Link Used At', copy=False)
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+"""Envelope definitions compiled once per channel and signer layout.
+
+The static part of an envelope (subject, delivery method, routing, sign-here
+tabs) only depends on the send method and on the signer layout, so it is
+compiled once per process and reused; a send only fills in the recipients
+and the document name. The PDF travels as raw bytes in a multipart body
+instead of base64 inside the JSON definition.
+"""
+
+from __future__ import annotations
+
+import functools
+import json
+import logging
+import os
+import uuid
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .phone_utils import normalize_e164, split_e164
+
+_logger = logging.getLogger(__name__)
+
+# Per send method: DocuSign delivery method, whether a phone number is
+# required and the email subject. Extended/overridden by the JSON system
+# parameter ``contract_management.docusign_envelope_channels``, so a new
+# channel is a configuration change.
+DEFAULT_CHANNELS = {
+    'email': {
+        'delivery_method': 'email',
+        'phone': False,
+        'email_subject': 'IMPORTANTE: Confirmar su servicio de internet....Firmar su contrato ahora',
+    },
+    'whatsapp': {
+        'delivery_method': 'WhatsApp',
+        'phone': True,
+        'email_subject': 'ACCION REQUERIDA: Firmar su contrato con Cabal Internet ahora',
+    },
+}
+# Signers after the first (company countersignature) always get email.
+DEFAULT_FOLLOWING_CHANNEL = 'email'
+SIGN_HERE_ANCHOR = '/sn%d/'
+READ_CHUNK_SIZE = 64 * 1024
+
+
+def split_phone(phone: str, default_country_code: Optional[str] = None) -> Tuple[str, str]:
+    """Split ``phone`` into DocuSign's ``(countryCode, number)``; national numbers take ``default_country_code``."""
+    return split_e164(normalize_e164(phone, default_country_code))
+
+
+def get_channels(env) -> str:
+    """Return the channel configuration as canonical JSON (used as cache key)."""
+    channels = dict(DEFAULT_CHANNELS)
+    raw = env['ir.config_parameter'].sudo().get_param('contract_management.docusign_envelope_channels')
+    if raw:
+        try:
+            for name, config in json.loads(raw).items():
+                channels[name.lower()] = dict(channels.get(name.lower(), {}), **config)
+        except (ValueError, AttributeError) as e:
+            _logger.error("[DocuSign Envelope] Invalid docusign_envelope_channels parameter: %s", e)
+    return json.dumps(channels, sort_keys=True)
+
+
+class EnvelopeTemplate:
+    """Compiled static part of an envelope definition."""
+
+    __slots__ = ('send_method', 'email_subject', 'signers', 'phone_required')
+
+    def __init__(self, send_method, email_subject, signers, phone_required):
+        self.send_method = send_method
+        self.email_subject = email_subject
+        self.signers = signers
+        self.phone_required = phone_required
+
+    def build(self, recipients: Sequence[Dict[str, Any]], document_name: str,
+              custom_fields: Optional[Dict[str, Any]] = None, document_id: str = '1') -> Dict[str, Any]:
+        """Fill recipients into the compiled definition.
+
+        ``recipients`` are dicts with ``name``, ``email`` and optionally
+        ``phone`` (``(country_code, number)``) and ``client_user_id``, in
+        routing order. The document itself is sent as a multipart part.
+        """
+        if len(recipients) != len(self.signers):
+            raise ValueError('Template compiled for %s signers, got %s' % (len(self.signers), len(recipients)))
+        signers = []
+        for skeleton, recipient in zip(self.signers, recipients):
+            signer = dict(skeleton, name=recipient['name'], email=recipient['email'])
+            if skeleton.get('deliveryMethod') != 'email' and recipient.get('phone'):
+                country_code, number = recipient['phone']
+                signer['phoneNumber'] = {'countryCode': str(country_code), 'number': str(number)}
+            if recipient.get('client_user_id'):
+                signer['clientUserId'] = recipient['client_user_id']
+            signers.append(signer)
+        definition = {
+            'emailSubject': self.email_subject,
+            'documents': [{'documentId': document_id, 'name': document_name, 'fileExtension': 'pdf'}],
+            'recipients': {'signers': signers},
+            'status': 'sent',
+        }
+        if custom_fields:
+            definition['customFields'] = custom_fields
+        return definition
+
+
+@functools.lru_cache(maxsize=64)
+def _compile(channels_json: str, send_method: str, signer_count: int) -> EnvelopeTemplate:
+    channels = json.loads(channels_json)
+    if send_method not in channels:
+        raise ValueError('Unknown DocuSign send method %r' % send_method)
+    following = channels.get(DEFAULT_FOLLOWING_CHANNEL) or DEFAULT_CHANNELS[DEFAULT_FOLLOWING_CHANNEL]
+    signers = []
+    for idx in range(1, signer_count + 1):
+        channel = channels[send_method] if idx == 1 else following
+        signers.append({
+            'recipientId': str(idx),
+            'routingOrder': str(idx),
+            'deliveryMethod': channel.get('delivery_method') or 'email',
+            'tabs': {
+                'signHereTabs': [{
+                    'anchorString': SIGN_HERE_ANCHOR % idx,
+                    'anchorYOffset': '0',
+                    'anchorUnits': 'pixels',
+                    'documentId': '1',
+                    'pageNumber': '1',
+                }],
+            },
+        })
+    _logger.info("[DocuSign Envelope] Compiled envelope template for %s with %s signers", send_method, signer_count)
+    return EnvelopeTemplate(send_method, channels[send_method].get('email_subject') or '', tuple(signers),
+                            bool(channels[send_method].get('phone')))
+
+
+def compile_envelope(env, send_method: str, signer_count: int) -> EnvelopeTemplate:
+    """Return the (cached) compiled envelope template for this send method and layout."""
+    return _compile(get_channels(env), (send_method or 'email').lower(), signer_count)
+
+
+def attachment_source(attachment):
+    """Return the filestore path of ``attachment`` when it has one, else its bytes."""
+    attachment = attachment.sudo()
+    if attachment.store_fname:
+        path = attachment._full_path(attachment.store_fname)
+        if os.path.isfile(path):
+            return path
+    return attachment.raw or b''
+
+
+class MultipartBody:
+    """Re-iterable ``multipart/form-data`` body for DocuSign envelope calls.
+
+    The first part is the JSON definition, the following parts the documents
+    (filestore paths are streamed in chunks, never loaded whole). The length
+    is known up front so requests sends a Content-Length, and the body can be
+    iterated again when a call is retried.
+    """
+
+    def __init__(self, definition: Dict[str, Any], documents: List[Tuple[str, str, Any]]):
+        self.boundary = uuid.uuid4().hex
+        self.content_type = 'multipart/form-data; boundary=%s' % self.boundary
+        self._parts = [(
+            self._header('application/json', 'form-data'),
+            json.dumps(definition, separators=(',', ':')).encode(),
+        )]
+        for document_id, filename, source in documents:
+            disposition = 'file; filename="%s"; documentid=%s' % (filename.replace('"', ''), document_id)
+            self._parts.append((self._header('application/pdf', disposition), source))
+        self._closing = ('--%s--\r\n' % self.boundary).encode()
+
+    def _header(self, content_type, disposition):
+        return ('--%s\r\nContent-Type: %s\r\nContent-Disposition: %s\r\n\r\n'
+                % (self.boundary, content_type, disposition)).encode()
+
+    @staticmethod
+    def _source_length(source):
+        return os.path.getsize(source) if isinstance(source, str) else len(source)
+
+    def __len__(self):
+        return sum(len(header) + self._source_length(source) + 2 for header, source in self._parts) + len(self._closing)
+
+    def __iter__(self) -> Iterator[bytes]:
+        for header, source in self._parts:
+            yield header
+            if isinstance(source, str):
+                with open(source, 'rb') as fp:
+                    for chunk in iter(lambda: fp.read(READ_CHUNK_SIZE), b''):
+                        yield chunk
+            else:
+                yield source
+            yield b'\r\n'
+        yield self._closing
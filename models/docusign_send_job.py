@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from odoo import api, fields, models, _
+
+_logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 3
+DEFAULT_CONCURRENCY = 4
+# Jobs still "running" after this long belong to a dead worker and are requeued.
+STALE_RUNNING_MINUTES = 30
+# Wall clock budget of one cron run so a long queue never pins a cron worker.
+RUN_BUDGET_SECONDS = 240
+
+
+class DocusignSendJob(models.Model):
+    """Envelope waiting to be rendered and sent to DocuSign.
+
+    ``sale.order.action_send_for_signature`` only records a job; the queue
+    cron sends it with bounded concurrency, one database cursor per job.
+    """
+    _name = 'docusign.send.job'
+    _description = 'DocuSign Envelope Send Job'
+    _order = 'id desc'
+    _rec_name = 'sale_order_id'
+
+    sale_order_id = fields.Many2one('sale.order', string='Subscription', required=True, ondelete='cascade', index=True)
+    user_id = fields.Many2one('res.users', string='Requested By', default=lambda self: self.env.user, readonly=True)
+    send_method = fields.Char(string='Send Method', readonly=True)
+    state = fields.Selection([
+        ('queued', 'Queued'),
+        ('running', 'Sending'),
+        ('done', 'Sent'),
+        ('failed', 'Failed'),
+    ], string='State', default='queued', required=True, index=True, readonly=True)
+    attempts = fields.Integer(string='Attempts', readonly=True)
+    next_attempt_at = fields.Datetime(string='Next Attempt', readonly=True)
+    started_at = fields.Datetime(string='Started At', readonly=True)
+    finished_at = fields.Datetime(string='Finished At', readonly=True)
+    last_error = fields.Text(string='Last Error', readonly=True)
+    envelope_id = fields.Char(string='Envelope ID', readonly=True, copy=False,
+                              help='Set once the envelope went out; a retry then resumes instead of sending again.')
+
+    @api.model
+    def _enqueue(self, orders):
+        """Create one job per order unless one is already pending."""
+        pending = self.sudo().search([
+            ('sale_order_id', 'in', orders.ids),
+            ('state', 'in', ('queued', 'running')),
+        ])
+        # Public confirmation links run as the portal/public user: send as superuser then.
+        user = self.env.user if self.env.user._is_internal() else self.env.ref('base.user_root')
+        jobs = pending
+        for order in orders - pending.mapped('sale_order_id'):
+            jobs |= self.sudo().create({
+                'sale_order_id': order.id,
+                'user_id': user.id,
+                'send_method': order.contract_send_method,
+            })
+            order.sudo().message_post(body=_("Contract queued for sending via DocuSign."))
+        self.env.ref('contract_management.ir_cron_docusign_send_queue').sudo()._trigger()
+        return jobs
+
+    @api.model
+    def _get_concurrency(self):
+        try:
+            return max(1, int(self.env['ir.config_parameter'].sudo().get_param(
+                'contract_management.docusign_send_concurrency', DEFAULT_CONCURRENCY)))
+        except (TypeError, ValueError):
+            return DEFAULT_CONCURRENCY
+
+    @api.model
+    def _claim(self, limit):
+        """Atomically move up to ``limit`` due jobs to running and commit."""
+        self.env.cr.execute("""
+            UPDATE docusign_send_job
+               SET state = 'running',
+                   attempts = attempts + 1,
+                   started_at = NOW() AT TIME ZONE 'UTC'
+             WHERE id IN (
+                    SELECT id FROM docusign_send_job
+                     WHERE state = 'queued'
+                       AND (next_attempt_at IS NULL OR next_attempt_at <= NOW() AT TIME ZONE 'UTC')
+                     ORDER BY id
+                     LIMIT %s
+                       FOR UPDATE SKIP LOCKED)
+         RETURNING id
+        """, [limit])
+        ids = [row[0] for row in self.env.cr.fetchall()]
+        self.env.cr.commit()
+        return ids
+
+    @api.model
+    def cron_process_queue(self):
+        """Drain the send queue with at most N envelopes in flight."""
+        self.sudo().search([
+            ('state', '=', 'running'),
+            ('started_at', '<', fields.Datetime.now() - timedelta(minutes=STALE_RUNNING_MINUTES)),
+        ]).write({'state': 'queued'})
+
+        concurrency = self._get_concurrency()
+        deadline = time.monotonic() + RUN_BUDGET_SECONDS
+        processed = 0
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='docusign-send') as pool:
+            while time.monotonic() < deadline:
+                job_ids = self._claim(concurrency)
+                if not job_ids:
+                    break
+                self._prerender(job_ids)
+                list(pool.map(self._run_job_in_new_cursor, job_ids))
+                processed += len(job_ids)
+        if processed:
+            _logger.info("[DocuSign Queue] Processed %s send jobs", processed)
+        return processed
+
+    @api.model
+    def _prerender(self, job_ids):
+        """Batch-render the contracts of the claimed jobs before the threads send them.
+
+        Committed right away so the job transactions find the cached PDFs and
+        do not wait on the rows written here.
+        """
+        orders = self.browse(job_ids).sale_order_id
+        if len(orders) < 2:
+            return
+        try:
+            orders.sudo()._prerender_contract_documents()
+            self.env.cr.commit()
+        except Exception as e:
+            self.env.cr.rollback()
+            _logger.warning("[DocuSign Queue] Batch render of %s orders failed: %s", len(orders), e)
+
+    def _run_job_in_new_cursor(self, job_id):
+        """Send one job in its own transaction (called from pool threads)."""
+        registry = self.env.registry
+        try:
+            with registry.cursor() as cr:
+                env = api.Environment(cr, self.env.uid, {})
+                job = env[self._name].browse(job_id)
+                user = job.user_id or env.user
+                job.with_user(user).with_context(lang=user.lang)._send()
+                job.write({'state': 'done', 'finished_at': fields.Datetime.now(), 'last_error': False})
+        except Exception as e:
+            _logger.exception("[DocuSign Queue] Job %s failed: %s", job_id, e)
+            with registry.cursor() as cr:
+                env = api.Environment(cr, self.env.uid, {})
+                env[self._name].browse(job_id)._register_failure(str(e))
+
+    def _send(self):
+        self.ensure_one()
+        order = self.sale_order_id
+        if self.envelope_id:
+            self._resume_sent()
+            return
+        _logger.info("[DocuSign Queue] Sending contract for %s (job %s, attempt %s)", order.name, self.id, self.attempts)
+        order.with_context(docusign_send_job_id=self.id)._send_for_signature_now()
+
+    def _resume_sent(self):
+        """Finish a job whose envelope was sent before the job failed, without sending it again."""
+        self.ensure_one()
+        order = self.sale_order_id
+        base_order = order._get_addendum_base_order()
+        target_order = base_order if base_order and base_order != order else order
+        _logger.info("[DocuSign Queue] Envelope %s of job %s already sent; not sending %s again",
+                     self.envelope_id, self.id, order.name)
+        if target_order.contract_state == 'pending_contract':
+            target_order.sudo().write({'contract_state': 'pending_customer_signature'})
+        target_order.sudo().message_post(
+            body=_("Contract already sent via DocuSign (Envelope ID: %s); the retry did not send it again.") % self.envelope_id)
+
+    def _register_failure(self, error):
+        self.ensure_one()
+        if self.attempts >= MAX_ATTEMPTS:
+            self.write({'state': 'failed', 'last_error': error, 'finished_at': fields.Datetime.now()})
+            self.sale_order_id.sudo().message_post(
+                body=_("DocuSign send failed after %s attempts: %s") % (self.attempts, error))
+        else:
+            self.write({
+                'state': 'queued',
+                'last_error': error,
+                'next_attempt_at': fields.Datetime.now() + timedelta(minutes=2 ** self.attempts),
+            })
+
+    def action_retry(self):
+        self.write({'state': 'queued', 'attempts': 0, 'next_attempt_at': False, 'last_error': False})
+        self.env.ref('contract_management.ir_cron_docusign_send_queue').sudo()._trigger()
@@ -0,0 +1,462 @@
+# -*- coding: utf-8 -*-
+import logging
+import threading
+import time
+from datetime import datetime
+from urllib.parse import urlparse
+
+import jwt
+
+from odoo import SUPERUSER_ID, api, fields, models, _
+from odoo.exceptions import ValidationError
+
+from .docusign_api import (
+    DocuSignBudgetExhausted,
+    DocuSignClient,
+    DocuSignUnavailable,
+    is_outage,
+    parse_rate_limit,
+    request_access_token,
+)
+
+_logger = logging.getLogger(__name__)
+
+platform_type = {
+    'dev': 'account-d.docusign.com',
+    'prod': 'account.docusign.com'
+}
+
+DEFAULT_TOKEN_MARGIN = 600  # seconds before expiry at which a token is refreshed
+JWT_LIFETIME = 3600
+# Share of the hourly API quota kept for interactive actions (portal signing...).
+DEFAULT_RATE_RESERVE_RATIO = 0.2
+# Rate-limit observations are written to the shared row at most this often,
+# unless the remaining budget is about to cross the reserve.
+RATE_PERSIST_INTERVAL = 15
+DEFAULT_BREAKER_THRESHOLD = 5  # consecutive outage failures that open the circuit
+DEFAULT_BREAKER_COOLDOWN = 60  # seconds the circuit stays open before one probe
+# A closed circuit is re-read from the database at most this often per worker.
+BREAKER_CACHE_SECONDS = 2
+
+# (dbname, user_id) -> (access_token, expires_at epoch); lets a worker skip
+# even the database read while its copy of the token is still comfortably valid.
+_TOKEN_CACHE = {}
+_TOKEN_CACHE_LOCK = threading.Lock()
+
+# (dbname, user_id) -> last X-RateLimit-* reading of this worker, plus the
+# time it was observed and last written to the database.
+_RATE_STATE = {}
+_RATE_STATE_LOCK = threading.Lock()
+
+# (dbname, user_id) -> (breaker row tuple, read at); see CircuitBreaker._read.
+_BREAKER_CACHE = {}
+
+
+class CircuitBreaker:
+    """Circuit breaker around DocuSign, shared by every worker via the account row.
+
+    Closed: calls go through and outage failures (network errors, 5xx) are
+    counted. After ``threshold`` consecutive ones the circuit opens and calls
+    fail fast with :class:`DocuSignUnavailable`. Once ``cooldown`` seconds
+    have passed, a single caller claims the half-open probe; its outcome
+    closes or re-opens the circuit. Uses its own cursors so it works from
+    HTTP threads and survives the caller's rollback.
+    """
+
+    def __init__(self, registry, dbname, user_id, threshold, cooldown):
+        self.registry = registry
+        self.key = (dbname, user_id)
+        self.user_id = user_id
+        self.threshold = threshold
+        self.cooldown = cooldown
+        # True while this instance owns the half-open probe: its own next call goes through
+        self.probing = False
+
+    def _read(self):
+        cached = _BREAKER_CACHE.get(self.key)
+        if cached and cached[0][0] == 'closed' and time.time() - cached[1] < BREAKER_CACHE_SECONDS:
+            return cached[0]
+        with self.registry.cursor() as cr:
+            cr.execute("""
+                SELECT COALESCE(breaker_state, 'closed'), COALESCE(breaker_failures, 0),
+                       EXTRACT(EPOCH FROM COALESCE(breaker_probe_at, breaker_opened_at))
+                  FROM docusign_service_account
+                 WHERE user_id = %s
+            """, [self.user_id])
+            row = cr.fetchone() or ('closed', 0, None)
+        _BREAKER_CACHE[self.key] = (row, time.time())
+        return row
+
+    def _unavailable(self, since):
+        retry_in = max(1, int((since or 0) + self.cooldown - time.time()))
+        error = DocuSignUnavailable(_("DocuSign is temporarily unavailable, please try again shortly."))
+        error.retry_after = retry_in
+        return error
+
+    def before_call(self):
+        if self.probing:
+            return
+        state, failures, since = self._read()
+        if state == 'closed':
+            return
+        now = time.time()
+        if since and now < float(since) + self.cooldown:
+            raise self._unavailable(float(since))
+        # cooldown over (or the previous probe never reported back): claim the probe
+        with self.registry.cursor() as cr:
+            cr.execute("""
+                UPDATE docusign_service_account
+                   SET breaker_state = 'half_open',
+                       breaker_probe_at = NOW() AT TIME ZONE 'UTC'
+                 WHERE user_id = %s
+                   AND breaker_state IN ('open', 'half_open')
+                   AND COALESCE(breaker_probe_at, breaker_opened_at) <= (NOW() AT TIME ZONE 'UTC') - %s * INTERVAL '1 second'
+             RETURNING id
+            """, [self.user_id, self.cooldown])
+            claimed = cr.fetchone()
+        _BREAKER_CACHE.pop(self.key, None)
+        if not claimed:
+            raise self._unavailable(now)
+        self.probing = True
+        _logger.info("[DocuSign Breaker] Half-open: probing DocuSign for user %s", self.user_id)
+
+    def record(self, exc):
+        """Report the outcome of a call (``exc`` is None on success)."""
+        if exc is not None and is_outage(exc):
+            self.probing = False
+            self._record_failure(exc)
+        elif exc is None or not isinstance(exc, (DocuSignUnavailable, DocuSignBudgetExhausted)):
+            # any answer from DocuSign, even a 4xx, proves it is reachable
+            self.probing = False
+            self._record_success()
+
+    def _record_success(self):
+        cached = _BREAKER_CACHE.get(self.key)
+        if cached and cached[0][0] == 'closed' and not cached[0][1]:
+            return
+        with self.registry.cursor() as cr:
+            cr.execute("""
+                UPDATE docusign_service_account
+                   SET breaker_state = 'closed', breaker_failures = 0,
+                       breaker_opened_at = NULL, breaker_probe_at = NULL
+                 WHERE user_id = %s
+                   AND (breaker_state != 'closed' OR breaker_failures > 0)
+             RETURNING id
+            """, [self.user_id])
+            if cr.fetchone():
+                _logger.info("[DocuSign Breaker] Circuit closed for user %s", self.user_id)
+        _BREAKER_CACHE[self.key] = (('closed', 0, None), time.time())
+
+    def _record_failure(self, exc):
+        with self.registry.cursor() as cr:
+            cr.execute("""
+                UPDATE docusign_service_account
+                   SET breaker_failures = COALESCE(breaker_failures, 0) + 1,
+                       breaker_state = CASE
+                           WHEN breaker_state = 'half_open' OR COALESCE(breaker_failures, 0) + 1 >= %s THEN 'open'
+                           ELSE COALESCE(breaker_state, 'closed') END,
+                       breaker_opened_at = CASE
+                           WHEN breaker_state = 'half_open' OR COALESCE(breaker_failures, 0) + 1 >= %s
+                           THEN NOW() AT TIME ZONE 'UTC' ELSE breaker_opened_at END,
+                       breaker_probe_at = NULL
+                 WHERE user_id = %s
+             RETURNING breaker_state, breaker_failures
+            """, [self.threshold, self.threshold, self.user_id])
+            row = cr.fetchone()
+        _BREAKER_CACHE.pop(self.key, None)
+        if row and row[0] == 'open':
+            _logger.error("[DocuSign Breaker] Circuit open for user %s after %s failures: %s",
+                          self.user_id, row[1], exc)
+
+
+class DocusignServiceAccount(models.Model):
+    """Shared DocuSign state of the contract service user.
+
+    One row per service user, read by every worker. The access token is
+    refreshed only when it is within the safety margin of its expiry, under a
+    row lock, so concurrent workers never trigger parallel OAuth exchanges.
+    """
+    _name = 'docusign.service.account'
+    _description = 'DocuSign Service Account'
+    _rec_name = 'user_id'
+
+    user_id = fields.Many2one('res.users', string='Service User', required=True, ondelete='cascade', index=True)
+    access_token = fields.Char(string='Access Token', groups='base.group_system', copy=False)
+    token_expires_at = fields.Datetime(string='Token Expires At', readonly=True, copy=False)
+    token_refreshed_at = fields.Datetime(string='Token Refreshed At', readonly=True, copy=False)
+    refresh_count = fields.Integer(string='Refresh Count', readonly=True, copy=False)
+    status_synced_at = fields.Datetime(
+        string='Envelope Status Synced At', readonly=True, copy=False,
+        help='Start time of the last successful bulk envelope status sync.')
+    rate_limit = fields.Integer(string='API Calls per Window', readonly=True, copy=False)
+    rate_remaining = fields.Integer(string='API Calls Remaining', readonly=True, copy=False)
+    rate_reset_at = fields.Datetime(string='API Quota Resets At', readonly=True, copy=False)
+    rate_observed_at = fields.Datetime(string='API Quota Observed At', readonly=True, copy=False)
+    breaker_state = fields.Selection([
+        ('closed', 'Closed'),
+        ('open', 'Open'),
+        ('half_open', 'Half-open'),
+    ], string='Circuit Breaker', default='closed', readonly=True, copy=False)
+    breaker_failures = fields.Integer(string='Consecutive Failures', readonly=True, copy=False)
+    breaker_opened_at = fields.Datetime(string='Circuit Opened At', readonly=True, copy=False)
+    breaker_probe_at = fields.Datetime(string='Last Probe At', readonly=True, copy=False)
+
+    _sql_constraints = [
+        ('user_uniq', 'unique(user_id)', 'There is already a DocuSign service account for this user.'),
+    ]
+
+    @api.model
+    def _get_token_margin(self):
+        try:
+            return int(self.env['ir.config_parameter'].sudo().get_param(
+                'contract_management.docusign_token_margin', DEFAULT_TOKEN_MARGIN))
+        except (TypeError, ValueError):
+            return DEFAULT_TOKEN_MARGIN
+
+    @api.model
+    def _ensure_account(self, user):
+        """Return the store row of ``user``, creating it if needed.
+
+        The row is inserted through a committed cursor of its own, like the
+        token refresh and the circuit breaker do, so none of them ever waits
+        on a row this transaction has not committed yet. Under the current
+        snapshot a just-created row may therefore come back empty.
+        """
+        account = self.sudo().search([('user_id', '=', user.id)], limit=1)
+        if not account:
+            with self.env.registry.cursor() as cr:
+                self._insert_account_row(cr, user.id)
+            account = self.sudo().search([('user_id', '=', user.id)], limit=1)
+        return account
+
+    @api.model
+    def get_access_token(self, user=None, force_refresh=False):
+        """Return a valid access token for the DocuSign service user.
+
+        Lookup order: worker memory, then the shared row, then a refresh
+        under row lock when the token is within the safety margin of expiry.
+        """
+        user = user or self.env['res.users']._get_contract_docusign_user()
+        margin = self._get_token_margin()
+        key = (self.env.cr.dbname, user.id)
+
+        if not force_refresh:
+            cached = _TOKEN_CACHE.get(key)
+            if cached and cached[1] - margin > time.time():
+                return cached[0]
+
+            self.env.cr.execute("""
+                SELECT access_token, EXTRACT(EPOCH FROM token_expires_at)
+                  FROM docusign_service_account
+                 WHERE user_id = %s
+            """, [user.id])
+            row = self.env.cr.fetchone()
+            if row and row[0] and row[1] and float(row[1]) - margin > time.time():
+                self._remember_token(key, row[0], float(row[1]))
+                return row[0]
+
+        token, expires_at = self._refresh_token(user, margin, force=force_refresh)
+        self._remember_token(key, token, expires_at)
+        return token
+
+    @api.model
+    def _remember_token(self, key, token, expires_at):
+        # Process cache only: the token lives in the service-account row written by _refresh_token.
+        with _TOKEN_CACHE_LOCK:
+            _TOKEN_CACHE[key] = (token, expires_at)
+
+    @api.model
+    def _refresh_token(self, user, min_validity, force=False):
+        """Refresh the token of ``user`` in a dedicated transaction.
+
+        The row lock serializes refreshes across workers: whoever waits on
+        the lock re-reads the row afterwards and reuses the fresh token.
+        Runs in READ COMMITTED so the waiting worker sees the committed token.
+        """
+        with self.env.registry.cursor() as cr:
+            cr.execute("SET TRANSACTION ISOLATION LEVEL READ COMMITTED")
+            self._insert_account_row(cr, user.id)
+            cr.execute("""
+                SELECT id, access_token, EXTRACT(EPOCH FROM token_expires_at)
+                  FROM docusign_service_account
+                 WHERE user_id = %s
+                   FOR UPDATE
+            """, [user.id])
+            account_id, token, expires_at = cr.fetchone()
+            if not force and token and expires_at and float(expires_at) - min_validity > time.time():
+                return token, float(expires_at)
+
+            env = api.Environment(cr, SUPERUSER_ID, {})
+            token, expires_in = env[self._name]._request_new_token(env['res.users'].browse(user.id))
+            expires_at = time.time() + expires_in
+            cr.execute("""
+                UPDATE docusign_service_account
+                   SET access_token = %s,
+                       token_expires_at = %s,
+                       token_refreshed_at = NOW() AT TIME ZONE 'UTC',
+                       refresh_count = COALESCE(refresh_count, 0) + 1,
+                       write_date = NOW() AT TIME ZONE 'UTC'
+                 WHERE id = %s
+            """, [token, datetime.utcfromtimestamp(expires_at), account_id])
+            _logger.info("[DocuSign Token] Refreshed access token for user %s (valid %ss)", user.id, expires_in)
+            return token, expires_at
+
+    @api.model
+    def _insert_account_row(self, cr, user_id):
+        cr.execute("""
+            INSERT INTO docusign_service_account (user_id, refresh_count, create_uid, write_uid, create_date, write_date)
+            VALUES (%s, 0, %s, %s, NOW() AT TIME ZONE 'UTC', NOW() AT TIME ZONE 'UTC')
+            ON CONFLICT (user_id) DO NOTHING
+        """, [user_id, SUPERUSER_ID, SUPERUSER_ID])
+
+    @api.model
+    def _request_new_token(self, user):
+        """Perform the JWT grant and return ``(access_token, expires_in)``."""
+        params = self.env['ir.config_parameter'].sudo()
+        # contract_management.docusign_oauth_host overrides the platform host,
+        # e.g. http://127.0.0.1:8765 for tools/docusign_fake_server.py
+        oauth_host = (params.get_param('contract_management.docusign_oauth_host')
+                      or platform_type[user.account_type or 'dev'])
+        now = int(time.time())
+        payload = {
+            'iss': params.get_param('docusign_client_id', ''),
+            'sub': params.get_param('docusign_user_id', ''),
+            'aud': urlparse(oauth_host).netloc or oauth_host,
+            'iat': now,
+            'exp': now + JWT_LIFETIME,
+            'scope': 'signature impersonation'
+        }
+        jwt_assertion = jwt.encode(payload, params.get_param('docusign_private_key', ''), algorithm='RS256')
+        response = request_access_token(oauth_host, jwt_assertion, **DocuSignClient.get_settings(self.env))
+        access_token = response.get('access_token')
+        if not access_token:
+            raise ValidationError(_("Failed to obtain access token from DocuSign"))
+        return access_token, int(response.get('expires_in') or JWT_LIFETIME)
+
+    @api.model
+    def cron_refresh_tokens(self):
+        """Proactively refresh tokens that would expire before the next run."""
+        self._ensure_account(self.env['res.users']._get_contract_docusign_user())
+        lookahead = self._get_token_margin() * 2
+        for account in self.sudo().search([]):
+            try:
+                token, expires_at = self._refresh_token(account.user_id, lookahead)
+                self._remember_token((self.env.cr.dbname, account.user_id.id), token, expires_at)
+            except Exception as e:
+                _logger.exception("[DocuSign Token] Proactive refresh failed for user %s: %s", account.user_id.id, e)
+
+    # ------------------------------------------------------------------
+    # API rate limit
+    # ------------------------------------------------------------------
+    @api.model
+    def _rate_limit_observer(self, user):
+        """Return a callback recording the rate-limit headers of every response.
+
+        The callback runs in HTTP threads too, so it only uses the registry,
+        never this environment.
+        """
+        registry = self.env.registry
+        key = (self.env.cr.dbname, user.id)
+        reserve_ratio = self._get_rate_reserve_ratio()
+
+        def observe(response):
+            info = parse_rate_limit(response)
+            if not info:
+                return
+            now = time.time()
+            with _RATE_STATE_LOCK:
+                state = _RATE_STATE.get(key) or {'persisted': 0}
+                state.update(info, observed=now)
+                _RATE_STATE[key] = state
+                low = info['remaining'] <= info['limit'] * reserve_ratio * 2
+                due = low or now - state['persisted'] >= RATE_PERSIST_INTERVAL
+                if due:
+                    state['persisted'] = now
+            if due:
+                self._persist_rate_limit(registry, user.id, info, now)
+
+        return observe
+
+    @api.model
+    def _persist_rate_limit(self, registry, user_id, info, observed):
+        try:
+            with registry.cursor() as cr:
+                cr.execute("""
+                    UPDATE docusign_service_account
+                       SET rate_limit = %s,
+                           rate_remaining = %s,
+                           rate_reset_at = %s,
+                           rate_observed_at = %s
+                     WHERE user_id = %s
+                       AND (rate_observed_at IS NULL OR rate_observed_at <= %s)
+                """, [info['limit'], info['remaining'], datetime.utcfromtimestamp(info['reset']),
+                      datetime.utcfromtimestamp(observed), user_id, datetime.utcfromtimestamp(observed)])
+        except Exception as e:
+            _logger.warning("[DocuSign Rate] Could not store rate-limit state for user %s: %s", user_id, e)
+
+    @api.model
+    def _get_rate_reserve_ratio(self):
+        try:
+            return float(self.env['ir.config_parameter'].sudo().get_param(
+                'contract_management.docusign_rate_reserve_ratio', DEFAULT_RATE_RESERVE_RATIO))
+        except (TypeError, ValueError):
+            return DEFAULT_RATE_RESERVE_RATIO
+
+    @api.model
+    def _get_rate_state(self, user):
+        """Freshest known quota reading of ``user``, from this worker or the shared row."""
+        state = _RATE_STATE.get((self.env.cr.dbname, user.id))
+        self.env.cr.execute("""
+            SELECT rate_limit, rate_remaining,
+                   EXTRACT(EPOCH FROM rate_reset_at), EXTRACT(EPOCH FROM rate_observed_at)
+              FROM docusign_service_account
+             WHERE user_id = %s
+        """, [user.id])
+        row = self.env.cr.fetchone()
+        if row and row[0] is not None and row[3] is not None and (not state or float(row[3]) > state['observed']):
+            state = {'limit': row[0], 'remaining': row[1], 'reset': float(row[2] or 0), 'observed': float(row[3])}
+        if not state or state['reset'] <= time.time():
+            return None  # nothing known, or the window has rolled over
+        return state
+
+    @api.model
+    def _background_budget(self, user=None):
+        """Return ``(calls, retry_at)`` available to non-interactive work.
+
+        ``calls`` is None when no quota is known (no cap). Otherwise it is the
+        remaining quota minus the share reserved for interactive actions, and
+        ``retry_at`` is when the quota window resets.
+        """
+        user = user or self.env['res.users']._get_contract_docusign_user()
+        state = self._get_rate_state(user)
+        if not state:
+            return None, None
+        reserve = int(state['limit'] * self._get_rate_reserve_ratio())
+        retry_at = datetime.utcfromtimestamp(state['reset']).replace(microsecond=0)
+        return max(0, state['remaining'] - reserve), retry_at
+
+    @api.model
+    def _defer_cron(self, xmlid, retry_at):
+        """Reschedule a background cron for when the API quota resets."""
+        cron = self.env.ref(xmlid, raise_if_not_found=False)
+        if cron and retry_at:
+            cron.sudo()._trigger(at=retry_at)
+        _logger.warning("[DocuSign Rate] API budget low, deferring %s until %s", xmlid, retry_at)
+
+    # ------------------------------------------------------------------
+    # Circuit breaker
+    # ------------------------------------------------------------------
+    @api.model
+    def _circuit_breaker(self, user=None):
+        user = user or self.env['res.users']._get_contract_docusign_user()
+        params = self.env['ir.config_parameter'].sudo()
+        try:
+            threshold = int(params.get_param('contract_management.docusign_breaker_threshold', DEFAULT_BREAKER_THRESHOLD))
+            cooldown = int(params.get_param('contract_management.docusign_breaker_cooldown', DEFAULT_BREAKER_COOLDOWN))
+        except (TypeError, ValueError):
+            threshold, cooldown = DEFAULT_BREAKER_THRESHOLD, DEFAULT_BREAKER_COOLDOWN
+        if (self.env.cr.dbname, user.id) not in _BREAKER_CACHE:
+            # committed right away: the breaker only works through its own cursors
+            with self.env.registry.cursor() as cr:
+                self._insert_account_row(cr, user.id)
+        return CircuitBreaker(self.env.registry, self.env.cr.dbname, user.id, max(1, threshold), max(1, cooldown))
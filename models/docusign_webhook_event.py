@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+import base64
+import hashlib
+import hmac
+import json
+import logging
+from datetime import timedelta
+
+from odoo import api, fields, models, _
+
+from .docusign_api import DocuSignBudgetExhausted, DocuSignClient
+
+_logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 5
+RETENTION_DAYS = 30
+
+# Connect event -> envelope status, used when the payload carries no envelopeSummary.
+EVENT_ENVELOPE_STATUS = {
+    'envelope-sent': 'sent',
+    'envelope-delivered': 'delivered',
+    'envelope-completed': 'completed',
+    'envelope-declined': 'declined',
+    'envelope-voided': 'voided',
+}
+
+
+class DocusignWebhookEvent(models.Model):
+    """Durable inbox of DocuSign Connect notifications.
+
+    The webhook only validates and stores the raw event; the inbox cron
+    applies the status changes in batches, one pass per envelope.
+    """
+    _name = 'docusign.webhook.event'
+    _description = 'DocuSign Connect Event'
+    _order = 'id desc'
+    _rec_name = 'event'
+
+    envelope_id = fields.Char(string='Envelope ID', index=True, readonly=True)
+    event = fields.Char(string='Event', readonly=True)
+    generated_at = fields.Char(string='Generated At (DocuSign)', readonly=True)
+    payload = fields.Text(string='Payload', readonly=True)
+    state = fields.Selection([
+        ('pending', 'Pending'),
+        ('done', 'Processed'),
+        ('superseded', 'Superseded'),
+        ('failed', 'Failed'),
+    ], string='State', default='pending', required=True, index=True, readonly=True)
+    attempts = fields.Integer(string='Attempts', readonly=True)
+    processed_at = fields.Datetime(string='Processed At', readonly=True)
+    error = fields.Text(string='Error', readonly=True)
+
+    # ------------------------------------------------------------------
+    # Receiving
+    # ------------------------------------------------------------------
+    @api.model
+    def _get_hmac_keys(self):
+        raw = self.env['ir.config_parameter'].sudo().get_param('contract_management.docusign_connect_hmac_key') or ''
+        return [key.strip() for key in raw.replace(',', '\n').splitlines() if key.strip()]
+
+    @api.model
+    def _verify_signature(self, body, signatures):
+        """Return True when one of the Connect HMAC signatures matches ``body``.
+
+        DocuSign sends ``X-DocuSign-Signature-1..n`` (one per active key) as
+        base64(HMAC-SHA256(key, body)); several keys allow rotation.
+        """
+        keys = self._get_hmac_keys()
+        if not keys or not signatures:
+            return False
+        for key in keys:
+            expected = base64.b64encode(hmac.new(key.encode('utf-8'), body, hashlib.sha256).digest()).decode()
+            if any(hmac.compare_digest(expected, signature) for signature in signatures):
+                return True
+        return False
+
+    @api.model
+    def _enqueue(self, body):
+        """Store a raw Connect payload and wake up the inbox worker."""
+        data = json.loads(body)
+        event = self.sudo().create({
+            'event': data.get('event'),
+            'envelope_id': (data.get('data') or {}).get('envelopeId'),
+            'generated_at': data.get('generatedDateTime'),
+            'payload': body.decode('utf-8'),
+        })
+        cron = self.env.ref('contract_management.ir_cron_docusign_webhook_inbox', raise_if_not_found=False)
+        if cron:
+            cron.sudo()._trigger()
+        return event
+
+    # ------------------------------------------------------------------
+    # Processing
+    # ------------------------------------------------------------------
+    def _envelope_summary(self):
+        """Build a listing-style envelope dict from the event payload."""
+        self.ensure_one()
+        data = (json.loads(self.payload or '{}').get('data')) or {}
+        summary = data.get('envelopeSummary') or {}
+        return {
+            'envelopeId': self.envelope_id,
+            'status': summary.get('status') or EVENT_ENVELOPE_STATUS.get(self.event),
+            'recipients': summary.get('recipients'),
+        }
+
+    @api.model
+    def cron_process_inbox(self, batch_size=200):
+        """Apply pending events, deduplicated per envelope (latest event wins)."""
+        self.env.cr.execute("""
+            SELECT id FROM docusign_webhook_event
+             WHERE state = 'pending'
+             ORDER BY id
+             LIMIT %s
+               FOR UPDATE SKIP LOCKED
+        """, [batch_size])
+        events = self.browse([row[0] for row in self.env.cr.fetchall()])
+        if not events:
+            return 0
+
+        latest = {}
+        for event in events:
+            if not event.envelope_id:
+                event.write({'state': 'failed', 'error': _('Payload without envelopeId'), 'processed_at': fields.Datetime.now()})
+                continue
+            if event.envelope_id in latest:
+                latest[event.envelope_id] |= event
+            else:
+                latest[event.envelope_id] = event
+
+        Connector = self.env['docusign.connector'].sudo()
+        client = None
+        for envelope_id, envelope_events in latest.items():
+            current = envelope_events.sorted('id')[-1]
+            older = envelope_events - current
+            try:
+                with self.env.cr.savepoint():
+                    envelope = current._envelope_summary()
+                    if not envelope['recipients'] and envelope['status'] != 'completed':
+                        # recipient-level event without summary: ask DocuSign once
+                        client = client or DocuSignClient.from_env(self.env, background=True)
+                        envelope['recipients'] = client.list_recipients(envelope_id)
+                    Connector._apply_envelope_listing([envelope])
+                    if envelope['status'] == 'completed':
+                        self._download_completed(envelope_id)
+                    now = fields.Datetime.now()
+                    current.write({'state': 'done', 'processed_at': now, 'error': False})
+                    older.write({'state': 'superseded', 'processed_at': now})
+            except DocuSignBudgetExhausted as e:
+                # leave the remaining events pending until the quota resets
+                self.env['docusign.service.account']._defer_cron(
+                    'contract_management.ir_cron_docusign_webhook_inbox', e.retry_at)
+                return len(latest)
+            except Exception as e:
+                _logger.exception("[DocuSign Inbox] Failed to process envelope %s: %s", envelope_id, e)
+                attempts = current.attempts + 1
+                envelope_events.write({
+                    'attempts': attempts,
+                    'error': str(e),
+                    'state': 'failed' if attempts >= MAX_ATTEMPTS else 'pending',
+                })
+
+        self.sudo().search([
+            ('state', 'in', ('done', 'superseded')),
+            ('processed_at', '<', fields.Datetime.now() - timedelta(days=RETENTION_DAYS)),
+        ]).unlink()
+        _logger.info("[DocuSign Inbox] Processed %s events for %s envelopes", len(events), len(latest))
+        if len(events) >= batch_size:
+            self.env.ref('contract_management.ir_cron_docusign_webhook_inbox')._trigger()
+        return len(latest)
+
+    @api.model
+    def _download_completed(self, envelope_id):
+        lines = self.env['docusign.connector.lines'].sudo().search([('envelope_id', '=', envelope_id)])
+        for connector in lines.mapped('record_id'):
+            if any(connector.connector_line_ids.mapped('signed_attachment_ids')):
+                continue
+            try:
+                with self.env.cr.savepoint():
+                    connector.with_context(docusign_background=True).download_docs()
+            except Exception as e:
+                _logger.error("[DocuSign Inbox] Failed to auto-download documents for envelope %s: %s", envelope_id, e)
+
+    def action_requeue(self):
+        self.write({'state': 'pending', 'attempts': 0, 'error': False})
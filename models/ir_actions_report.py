@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+import time
+
+from odoo import models
+
+
+class IrActionsReport(models.Model):
+    _inherit = 'ir.actions.report'
+
+    def _run_wkhtmltopdf(self, bodies, *args, **kwargs):
+        # contract.render.profile passes a dict to measure the PDF conversion apart from the HTML
+        timings = self.env.context.get('contract_render_profile')
+        if timings is None:
+            return super()._run_wkhtmltopdf(bodies, *args, **kwargs)
+        started = time.monotonic()
+        try:
+            return super()._run_wkhtmltopdf(bodies, *args, **kwargs)
+        finally:
+            timings['pdf_ms'] += (time.monotonic() - started) * 1000
+            timings['pdf_runs'] += 1
@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+import base64
+import hashlib
+import logging
+import os
+import tempfile
+
+from odoo import api, fields, models
+
+_logger = logging.getLogger(__name__)
+
+# Records whose duplicate attachments are collapsed by _cron_collapse_duplicates.
+DEFAULT_DEDUPE_MODELS = 'sale.order,contract.management,contract.addendum,docusign.connector,docusign.connector.lines'
+
+
+class IrAttachment(models.Model):
+    _inherit = 'ir.attachment'
+
+    contract_render_key = fields.Char(
+        string='Contract Render Key', index=True, copy=False, readonly=True,
+        help='Hash of the inputs a rendered contract PDF was built from; a render with the same key reuses this attachment.')
+
+    @api.model
+    def _find_contract_render(self, render_key):
+        """Return the attachment previously rendered for ``render_key``, if its file is still there."""
+        attachment = self.sudo().search([('contract_render_key', '=', render_key)], order='id desc', limit=1)
+        if attachment and attachment.file_size:
+            return attachment
+        return self.browse()
+
+    @api.model
+    def _create_from_stream(self, chunks, vals, dedupe=False):
+        """Create a binary attachment from an iterable of byte chunks.
+
+        With file storage the chunks are written straight into the filestore
+        while the sha1 is computed on the fly, so memory use does not depend
+        on the file size and no base64 round trip happens. Database storage
+        falls back to a regular ``raw`` create. With ``dedupe`` an attachment
+        of the same record with the same bytes is returned instead of a new one.
+        """
+        if self._storage() != 'file':
+            create = self._create_deduplicated if dedupe else self.create
+            return create(dict(vals, raw=b''.join(chunks)))
+
+        sha = hashlib.sha1()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(prefix='.stream-', dir=self._filestore())
+        try:
+            with os.fdopen(fd, 'wb') as fp:
+                for chunk in chunks:
+                    if not chunk:
+                        continue
+                    sha.update(chunk)
+                    size += len(chunk)
+                    fp.write(chunk)
+            checksum = sha.hexdigest()
+            fname = self._stream_target_fname(checksum)
+            full_path = self._full_path(fname)
+            if os.path.exists(full_path):
+                os.unlink(tmp_path)
+            else:
+                os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                os.replace(tmp_path, full_path)
+                # add fname to checklist, in case the transaction aborts
+                self._mark_for_gc(fname)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+        if dedupe:
+            existing = self._find_duplicate(vals.get('res_model'), vals.get('res_id'), checksum)
+            if existing:
+                _logger.info("[Attachment] Streamed %s bytes identical to attachment %s, reusing it", size, existing.id)
+                return existing
+        attachment = self.create(dict(vals, type='binary'))
+        # create() drops store_fname/checksum/file_size from vals: set them directly
+        self.env.cr.execute("""
+            UPDATE ir_attachment
+               SET store_fname = %s, checksum = %s, file_size = %s
+             WHERE id = %s
+        """, [fname, checksum, size, attachment.id])
+        attachment.invalidate_recordset(['store_fname', 'checksum', 'file_size', 'raw', 'datas'])
+        _logger.info("[Attachment] Streamed %s bytes into %s (attachment %s)", size, fname, attachment.id)
+        return attachment
+
+    @api.model
+    def _stream_target_fname(self, checksum):
+        # same layout as _get_path, including the legacy 3-char directories
+        legacy = checksum[:3] + '/' + checksum
+        if os.path.isfile(self._full_path(legacy)):
+            return legacy
+        return checksum[:2] + '/' + checksum
+
+    # ------------------------------------------------------------------
+    # Deduplication
+    # ------------------------------------------------------------------
+    @api.model
+    def _find_duplicate(self, res_model, res_id, checksum):
+        """Return the oldest binary attachment of the record with this checksum."""
+        if not (res_model and checksum):
+            return self.browse()
+        return self.sudo().search([
+            ('res_model', '=', res_model),
+            ('res_id', '=', res_id or 0),
+            ('checksum', '=', checksum),
+            ('type', '=', 'binary'),
+        ], order='id', limit=1)
+
+    @api.model
+    def _create_deduplicated(self, vals_list):
+        """``create`` that reuses an attachment of the same record with the same bytes.
+
+        Accepts a dict or a list of dicts carrying ``raw`` or ``datas`` and
+        returns the attachments in the same order, existing or new.
+        """
+        single = isinstance(vals_list, dict)
+        vals_list = [vals_list] if single else vals_list
+        results = [None] * len(vals_list)
+        to_create = []
+        for index, vals in enumerate(vals_list):
+            raw = vals.get('raw')
+            if raw is None and vals.get('datas'):
+                raw = base64.b64decode(vals['datas'])
+            if isinstance(raw, str):
+                raw = raw.encode()
+            existing = self._find_duplicate(vals.get('res_model'), vals.get('res_id'), self._compute_checksum(raw or b''))
+            if existing:
+                results[index] = existing.id
+            else:
+                to_create.append(index)
+        created = self.create([vals_list[index] for index in to_create]) if to_create else self.browse()
+        for index, attachment in zip(to_create, created):
+            results[index] = attachment.id
+        if len(to_create) < len(vals_list):
+            _logger.info("[Attachment] Reused %d existing attachments with identical content", len(vals_list) - len(to_create))
+        return self.browse(results)
+
+    @api.model
+    def _get_dedupe_models(self):
+        raw = self.env['ir.config_parameter'].sudo().get_param(
+            'contract_management.attachment_dedupe_models', DEFAULT_DEDUPE_MODELS)
+        return [model.strip() for model in raw.split(',') if model.strip()]
+
+    @api.model
+    def _cron_collapse_duplicates(self, limit=500):
+        """Collapse attachments of the same record with identical bytes into the oldest one.
+
+        References from many2one/many2many fields (messages, DocuSign lines,
+        ...) are moved to the kept attachment before the duplicates are
+        deleted; the filestore file is shared by checksum and garbage
+        collected once no row points to it. Attachments with an access token
+        are never deleted: their ``/web/content`` links were handed out
+        (WhatsApp quotes, ...) and cannot be repointed. A group holding one
+        keeps its oldest tokenized attachment.
+        """
+        models_ = self._get_dedupe_models()
+        if not models_:
+            return 0
+        self.flush_model()
+        self.env.cr.execute("""
+            SELECT coalesce(min(id) FILTER (WHERE access_token IS NOT NULL), min(id)),
+                   array_agg(id ORDER BY id) FILTER (WHERE access_token IS NULL)
+              FROM ir_attachment
+             WHERE res_model IN %s
+               AND type = 'binary'
+               AND res_field IS NULL
+               AND checksum IS NOT NULL
+             GROUP BY res_model, res_id, checksum
+            HAVING count(*) > 1
+               AND count(*) FILTER (WHERE access_token IS NULL)
+                   > CASE WHEN bool_or(access_token IS NOT NULL) THEN 0 ELSE 1 END
+             LIMIT %s
+        """, [tuple(models_), limit])
+        groups = self.env.cr.fetchall()
+        if not groups:
+            return 0
+        duplicates = {}
+        for keep_id, untokenized_ids in groups:
+            for dup_id in untokenized_ids:
+                if dup_id != keep_id:
+                    duplicates[dup_id] = keep_id
+        self._repoint_attachment_references(duplicates)
+        self.browse(list(duplicates)).sudo().unlink()
+        _logger.info("[Attachment] Collapsed %d duplicate attachments into %d", len(duplicates), len(groups))
+        return len(duplicates)
+
+    @api.model
+    def _repoint_attachment_references(self, duplicates):
+        """Point every stored reference to an attachment of ``duplicates`` ({dup_id: keep_id}) to the kept one."""
+        cr = self.env.cr
+        self.env.flush_all()
+        dup_ids, keep_ids = list(duplicates), list(duplicates.values())
+        mapping = "SELECT unnest(%s::int[]) AS dup_id, unnest(%s::int[]) AS keep_id"
+        for model in self.env.registry.values():
+            if model._abstract or not model._auto:
+                continue
+            for field in model._fields.values():
+                if field.type not in ('many2one', 'many2many') or field.comodel_name != self._name:
+                    continue
+                if not field.store or field.inherited:
+                    continue
+                if field.type == 'many2one':
+                    cr.execute("""
+                        UPDATE "{table}" t SET "{col}" = m.keep_id
+                          FROM ({mapping}) m
+                         WHERE t."{col}" = m.dup_id
+                    """.format(table=model._table, col=field.name, mapping=mapping), [dup_ids, keep_ids])
+                else:
+                    # link the kept attachment where a duplicate was linked, then drop the duplicate rows
+                    cr.execute("""
+                        INSERT INTO "{rel}" ("{col1}", "{col2}")
+                        SELECT r."{col1}", m.keep_id
+                          FROM "{rel}" r JOIN ({mapping}) m ON r."{col2}" = m.dup_id
+                        ON CONFLICT DO NOTHING
+                    """.format(rel=field.relation, col1=field.column1, col2=field.column2, mapping=mapping),
+                        [dup_ids, keep_ids])
+                    cr.execute('DELETE FROM "{}" WHERE "{}" = ANY(%s)'.format(field.relation, field.column2), [dup_ids])
+        self.env.invalidate_all()
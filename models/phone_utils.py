@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""Utilities to normalize phone numbers to E.164 and split their country code."""
+
+from __future__ import annotations
+
+import re
+from typing import Optional, Tuple
+
+try:
+    import phonenumbers
+except ImportError:
+    phonenumbers = None
+
+# Country calling code used for local numbers written without one (El Salvador).
+DEFAULT_COUNTRY_CODE = '503'
+# Digits of a national number (after the calling code), per calling code.
+# Used without ``phonenumbers``; countries missing here accept any length.
+NATIONAL_NUMBER_LENGTHS = {
+    '1': (10,),        # United States, Canada, Caribbean
+    '34': (9,),        # Spain
+    '51': (9,),        # Peru
+    '52': (10,),       # Mexico
+    '53': (8,),        # Cuba
+    '54': (10,),       # Argentina
+    '55': (10, 11),    # Brazil
+    '56': (9,),        # Chile
+    '57': (10,),       # Colombia
+    '58': (10,),       # Venezuela
+    '501': (7,),       # Belize
+    '502': (8,),       # Guatemala
+    '503': (8,),       # El Salvador
+    '504': (8,),       # Honduras
+    '505': (8,),       # Nicaragua
+    '506': (8,),       # Costa Rica
+    '507': (7, 8),     # Panama
+    '591': (8,),       # Bolivia
+    '593': (8, 9),     # Ecuador
+    '595': (9,),       # Paraguay
+    '598': (8,),       # Uruguay
+}
+
+# Calling codes are prefix-free: 1 and 7 are one digit, the codes below two
+# digits and every other code three digits (ITU-T E.164 assignment).
+ONE_DIGIT_CODES = frozenset({'1', '7'})
+TWO_DIGIT_CODES = frozenset({
+    '20', '27', '30', '31', '32', '33', '34', '36', '39', '40', '41', '43', '44', '45', '46', '47', '48', '49',
+    '51', '52', '53', '54', '55', '56', '57', '58', '60', '61', '62', '63', '64', '65', '66',
+    '81', '82', '84', '86', '90', '91', '92', '93', '94', '95', '98',
+})
+
+_NON_DIGITS = re.compile(r'\D')
+
+
+def normalize_e164(phone: Optional[str], default_country_code: Optional[str] = None) -> Optional[str]:
+    """Return ``phone`` as ``+<country><number>`` or ``None`` when it cannot be a phone number.
+
+    Spaces, dashes, dots and brackets are ignored and ``00`` is read as
+    ``+``. Any other number is national to ``default_country_code`` (El
+    Salvador when unset): its leading digits are taken as a calling code
+    only when they are that code and what follows is a national number.
+    The lengths come from ``phonenumbers`` when it is installed.
+    """
+    if not phone or not isinstance(phone, str):
+        return None
+    phone = phone.strip()
+    international = phone.startswith('+')
+    digits = _NON_DIGITS.sub('', phone)
+    if not international and digits.startswith('00'):
+        digits, international = digits[2:], True
+    country_code = None if international else (default_country_code or DEFAULT_COUNTRY_CODE)
+    if phonenumbers is not None:
+        region = phonenumbers.region_code_for_country_code(int(country_code)) if country_code else None
+        if region != phonenumbers.UNKNOWN_REGION:
+            return _normalize_with_phonenumbers(digits, region)
+    if country_code:
+        digits = _add_country_code(digits, country_code)
+    if not digits or not 8 <= len(digits) <= 15 or digits.startswith('0'):
+        return None
+    return '+' + digits
+
+
+def _normalize_with_phonenumbers(digits: str, region: Optional[str]) -> Optional[str]:
+    try:
+        number = phonenumbers.parse(digits if region else '+' + digits, region)
+    except phonenumbers.NumberParseException:
+        return None
+    if not phonenumbers.is_possible_number(number):
+        return None
+    return phonenumbers.format_number(number, phonenumbers.PhoneNumberFormat.E164)
+
+
+def _add_country_code(digits: str, country_code: str) -> Optional[str]:
+    """Prefix the national number ``digits`` with ``country_code``; ``None`` when its length is wrong."""
+    lengths = NATIONAL_NUMBER_LENGTHS.get(country_code)
+    if digits.startswith(country_code) and (lengths is None or len(digits) - len(country_code) in lengths):
+        return digits
+    if digits.startswith('0'):
+        # national trunk prefix
+        digits = digits[1:]
+    if lengths is not None and len(digits) not in lengths:
+        return None
+    return country_code + digits
+
+
+def country_code_length(digits: str) -> int:
+    if digits[:1] in ONE_DIGIT_CODES:
+        return 1
+    if digits[:2] in TWO_DIGIT_CODES:
+        return 2
+    return 3
+
+
+def split_e164(e164: Optional[str]) -> Tuple[str, str]:
+    """Split ``+<country><number>`` into ``(country_code, number)``; empty strings when unset."""
+    digits = (e164 or '').lstrip('+')
+    if not digits:
+        return '', ''
+    length = country_code_length(digits)
+    return digits[:length], digits[length:]
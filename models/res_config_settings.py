@@ -28,6 +28,33 @@ class ResConfigSettings(models.TransientModel):
         config_parameter='contract_management.docusign_service_user_id',
     )
     
+    docusign_connect_timeout = fields.Float(
+        string='DocuSign Connect Timeout (s)',
+        help='Seconds to wait for a TCP/TLS connection to DocuSign before giving up.',
+        config_parameter='contract_management.docusign_connect_timeout',
+        default=5.0,
+    )
+
+    docusign_read_timeout = fields.Float(
+        string='DocuSign Read Timeout (s)',
+        help='Seconds to wait for a DocuSign response once connected.',
+        config_parameter='contract_management.docusign_read_timeout',
+        default=30.0,
+    )
+
+    docusign_max_retries = fields.Integer(
+        string='DocuSign Max Retries',
+        help='Retries with exponential backoff on rate limiting (429) and server errors (5xx).',
+        config_parameter='contract_management.docusign_max_retries',
+        default=3,
+    )
+    
+    docusign_connect_hmac_key = fields.Char(
+        string='DocuSign Connect HMAC Key',
+        help='Secret(s) configured on the DocuSign Connect configuration, comma-separated, used to validate webhook signatures.',
+        config_parameter='contract_management.docusign_connect_hmac_key',
+    )
+    
     contract_cancellation_email = fields.Char(
         string='Cancellation Notification Email',
         help='Email address to receive notifications when customers intend to cancel their contracts',
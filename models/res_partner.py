@@ -6,6 +6,7 @@ from odoo import api, fields, models, _
 from odoo.exceptions import UserError, ValidationError
 from odoo.osv import expression
 from odoo.tools import email_normalize
+from odoo.tools.sql import column_exists, create_column
 
 try:
     import dns.resolver
@@ -17,6 +18,7 @@ from .email_domain_utils import (
     normalize_email_domain,
     parse_bad_email_domain_map,
 )
+from .phone_utils import normalize_e164, split_e164
 
 
 _logger = logging.getLogger(__name__)
@@ -32,9 +34,72 @@ class ResPartner(models.Model):
     email_verify_token = fields.Char(copy=False, index=True)
     email_verify_token_date = fields.Datetime(copy=False)
     email_verify_last_sent = fields.Datetime(copy=False)
+    whatsapp_e164 = fields.Char(
+        string='WhatsApp (E.164)', compute='_compute_whatsapp_e164', store=True, index=True,
+        help='WhatsApp number normalized to +<country code><number>; empty when it is not a valid number.')
+    whatsapp_country_code = fields.Char(string='WhatsApp Country Code', compute='_compute_whatsapp_e164', store=True)
 
     BAD_EMAIL_DOMAIN_PARAM_KEY = 'contract_management.bad_email_domain_map'
 
+    def _auto_init(self):
+        # Backfill in SQL batches instead of letting the ORM recompute every partner at install
+        cr = self.env.cr
+        backfill = not column_exists(cr, 'res_partner', 'whatsapp_e164') and column_exists(cr, 'res_partner', 'whatsapp')
+        if backfill:
+            create_column(cr, 'res_partner', 'whatsapp_e164', 'varchar')
+            create_column(cr, 'res_partner', 'whatsapp_country_code', 'varchar')
+        res = super()._auto_init()
+        if backfill:
+            self._backfill_whatsapp_e164()
+        return res
+
+    @api.model
+    def _backfill_whatsapp_e164(self, batch_size=10000):
+        """Store the normalized WhatsApp number of every partner, ``batch_size`` rows per query."""
+        cr = self.env.cr
+        last_id, count = 0, 0
+        while True:
+            cr.execute("""
+                SELECT p.id, p.whatsapp, c.phone_code
+                  FROM res_partner p
+                  LEFT JOIN res_country c ON c.id = p.country_id
+                 WHERE p.whatsapp IS NOT NULL AND p.whatsapp != '' AND p.id > %s
+                 ORDER BY p.id
+                 LIMIT %s
+            """, [last_id, batch_size])
+            rows = cr.fetchall()
+            if not rows:
+                break
+            ids, numbers, codes = [], [], []
+            for partner_id, whatsapp, phone_code in rows:
+                e164 = normalize_e164(whatsapp, str(phone_code) if phone_code else None)
+                ids.append(partner_id)
+                numbers.append(e164)
+                codes.append(split_e164(e164)[0] or None)
+            cr.execute("""
+                UPDATE res_partner p
+                   SET whatsapp_e164 = v.e164, whatsapp_country_code = v.code
+                  FROM unnest(%s::int[], %s::varchar[], %s::varchar[]) AS v(id, e164, code)
+                 WHERE p.id = v.id
+            """, [ids, numbers, codes])
+            last_id = ids[-1]
+            count += len(rows)
+        self.invalidate_model(['whatsapp_e164', 'whatsapp_country_code'])
+        _logger.info("[Partner Phone] Normalized WhatsApp numbers of %s partners", count)
+        return count
+
+    @api.depends('whatsapp', 'country_id.phone_code')
+    def _compute_whatsapp_e164(self):
+        for partner in self:
+            e164 = normalize_e164(partner.whatsapp, str(partner.country_id.phone_code or '') or None)
+            partner.whatsapp_e164 = e164 or False
+            partner.whatsapp_country_code = split_e164(e164)[0] or False
+
+    def _get_whatsapp_parts(self):
+        """Return ``(country_code, number)`` of the stored WhatsApp number (empty strings when invalid)."""
+        self.ensure_one()
+        return split_e164(self.whatsapp_e164)
+
     def action_open_change_payment_day_batch_wizard(self):
         self.ensure_one()
         partner = self.commercial_partner_id or self
@@ -215,26 +215,17 @@ class ResUserCustom(models.Model):
                 _logger.error("Failed to refresh access token: %s", response.text)
 
     def schedule_refresh_token(self):
-        cron_name = f'Refresh DocuSign Token for User {self.id}'
-        cron = self.env['ir.cron'].search([('name', '=', cron_name)], limit=1)
-        if not cron:
-            self.env['ir.cron'].create({
-                'name': cron_name,
-                'model_id': self.env.ref('contract_management.model_res_users').id,
-                'state': 'code',
-                'code': f'model.browse({self.id}).refresh_access_token()',
-                'interval_number': 28,
-                'interval_type': 'days',
-                'numbercall': -1,
-                'doall': False,
-            })
-        else:
-            cron.write({
-                'interval_number': 28,
-                'interval_type': 'days',
-            })
-
+        """Register the users in the shared DocuSign token store.
 
+        Tokens are refreshed proactively by the single token store cron, so
+        the legacy per-user refresh crons are removed instead of created.
+        """
+        accounts = self.env['docusign.service.account'].sudo()
+        for user in self:
+            accounts._ensure_account(user)
+            self.env['ir.cron'].sudo().search([
+                ('name', '=', f'Refresh DocuSign Token for User {user.id}'),
+            ]).unlink()
         return self.sudo()
 
     @api.model
@@ -1,18 +1,28 @@
 from odoo import models, fields, api, _
 from odoo.exceptions import UserError, ValidationError
 from odoo.tools.misc import html_escape
-from odoo.tools import float_round
+from odoo.tools import float_compare, float_round, str2bool
+from odoo.tools.pdf import PdfFileReader, PdfFileWriter
 from markupsafe import Markup
 from datetime import date, timedelta
 import calendar
 import hmac
 import hashlib
 from dateutil.relativedelta import relativedelta
-import time, base64, uuid, re, json, jwt, requests
+import io, uuid, re, json
 import logging
 
 _logger = logging.getLogger(__name__)
 
+# Contracts rendered per wkhtmltopdf run by _create_documents_to_be_signed.
+CONTRACT_BATCH_RENDER_SIZE = 20
+# Invisible start-of-document marker printed by the contract reports in batch renders.
+CONTRACT_BATCH_MARKER = re.compile(r'CMDOC(\d+)CMDOC')
+
+
+class ContractRenderSimulation(Exception):
+    """Raised to roll back the savepoint of a render done as if the order were confirmed."""
+
 
 SUBSCRIPTION_DRAFT_STATE = ['1_draft', '2_renewal', '7_upsell']
 
@@ -101,6 +111,10 @@ class SaleSubscription(models.Model):
         store=True,
     )
     cabal_sequence = fields.Char(string='Contract Number', readonly=True, copy=False)
+    cabal_sequence_reserved = fields.Char(
+        string='Reserved Contract Number', readonly=True, copy=False,
+        help='Drawn when the contract of the quote is pre-rendered. It becomes the contract number when the '
+             'contract is sent, or goes to the next quote if this one is cancelled or expires.')
     contract_send_method = fields.Selection(string='Send Method', selection=CONTRACT_SEND_METHODS, default='email', required=True)
     contract_magic_token = fields.Char(string='Contract Magic Token', readonly=True, copy=False)
     contract_magic_link = fields.Char(string='Contract Magic Link', readonly=True, copy=False)
@@ -155,6 +169,14 @@ class SaleSubscription(models.Model):
     contract_ids = fields.One2many('contract.management', 'subscription_id', string="Contracts")
     contract_count = fields.Integer(string='Contract Count', compute='_compute_contract_count')
     docusign_ids = fields.One2many('docusign.connector', 'sale_id', string="DocuSign Envelopes")
+    docusign_send_job_ids = fields.One2many('docusign.send.job', 'sale_order_id', string='DocuSign Send Jobs')
+    docusign_send_state = fields.Selection([
+        ('queued', 'Queued'),
+        ('running', 'Sending'),
+        ('done', 'Sent'),
+        ('failed', 'Failed'),
+    ], string='DocuSign Send Status', compute='_compute_docusign_send_state',
+        help='Status of the latest queued DocuSign envelope send for this subscription.')
     has_docusign_client_user_id = fields.Boolean(
         string='Has Embedded DocuSign Signer',
         compute='_compute_has_docusign_client_user_id',
@@ -183,6 +205,10 @@ class SaleSubscription(models.Model):
     confirmation_uuid = fields.Char(string='UUID', readonly=True, default=lambda self: str(uuid.uuid4()))
     confirmation_url = fields.Char(string='Confirmation URL', compute='_compute_confirmation_url')
     clause_ids = fields.Many2many('contract.clause', string='Clauses')
+    clause_snapshot_ids = fields.Many2many(
+        'contract.clause.text', 'sale_order_clause_text_rel', 'order_id', 'text_id',
+        string='Signed Clauses', readonly=True, copy=False,
+        help='Exact clause texts of the contract sent for signature.')
     quote_confirmed = fields.Boolean(string='Quote Confirmed', default=False)
     contract_term = fields.Many2one('dte.base.contract', string="Contract Term")
     contract_value = fields.Float(string = "Contract Value")
@@ -686,6 +712,12 @@ class SaleSubscription(models.Model):
     #         else:
     #             order.next_action = False
 
+    @api.depends('docusign_send_job_ids.state')
+    def _compute_docusign_send_state(self):
+        for order in self:
+            jobs = order.docusign_send_job_ids.sorted('id')
+            order.docusign_send_state = jobs[-1].state if jobs else False
+
     @api.depends('contract_state', 'contract_ids', 'docusign_ids')
     def _compute_can_resend_contract(self):
         for order in self:
@@ -907,6 +939,46 @@ class SaleSubscription(models.Model):
     @api.model
     def _get_cabal_sequence(self):
         return self.env['ir.sequence'].sudo().next_by_code('sus.contract.cabal')
+
+    def _assign_cabal_sequence(self):
+        """Give the order its contract number: the one reserved at pre-render, else a new one."""
+        self.ensure_one()
+        if not self.cabal_sequence:
+            self.sudo().write({
+                'cabal_sequence': self.cabal_sequence_reserved or self._get_cabal_sequence(),
+                'cabal_sequence_reserved': False,
+            })
+        return self.cabal_sequence
+
+    def _reserve_cabal_sequence(self):
+        """Reserve the contract number a quote will print once confirmed.
+
+        The number of a cancelled or expired quote that was never sent is
+        reused first, so pre-rendering quotes that are never confirmed does
+        not leave holes in the sequence.
+        """
+        self.ensure_one()
+        if self.cabal_sequence or self.cabal_sequence_reserved:
+            return self.cabal_sequence or self.cabal_sequence_reserved
+        self.flush_model(['cabal_sequence', 'cabal_sequence_reserved', 'state', 'validity_date'])
+        self.env.cr.execute("""
+            SELECT id, cabal_sequence_reserved
+              FROM sale_order
+             WHERE cabal_sequence_reserved IS NOT NULL
+               AND cabal_sequence IS NULL
+               AND (state = 'cancel' OR (state IN ('draft', 'sent') AND validity_date < %s))
+             ORDER BY id
+             LIMIT 1
+               FOR UPDATE SKIP LOCKED
+        """, [fields.Date.context_today(self)])
+        row = self.env.cr.fetchone()
+        if row:
+            self.browse(row[0]).sudo().cabal_sequence_reserved = False
+            _logger.info("[DocuSign] Contract number %s released by order ID=%s, reserved for order ID=%s",
+                         row[1], row[0], self.id)
+        number = row[1] if row else self._get_cabal_sequence()
+        self.sudo().cabal_sequence_reserved = number
+        return number
     
     def _cm_get_billing_period_delta(self):
         """Return the billing delta for this subscription's plan."""
@@ -996,6 +1068,9 @@ class SaleSubscription(models.Model):
                 if was_active or not is_active_now:
                     continue
 
+                if not order.clause_snapshot_ids:
+                    order._snapshot_contract_clauses()
+
                 is_upsell = order.subscription_state == '7_upsell' or bool(order.upsell_from_id)
                 is_renewal = order.subscription_state == '2_renewal' or bool(order.renewal_of_id)
 
@@ -1044,34 +1119,12 @@ class SaleSubscription(models.Model):
         return res
 
     def authenicate_jwt(self):
-        # Create the JWT assertion
-        user = self.env['res.users'].browse(196)
-        now = int(time.time())
-        payload = {
-            'iss': self.env['ir.config_parameter'].sudo().get_param('docusign_client_id', ''),
-            'sub': self.env['ir.config_parameter'].sudo().get_param('docusign_user_id', ''),
-            'aud': platform_type[user.account_type],
-            'iat': now,
-            'exp': now + 3600,
-            'scope': 'signature impersonation'
-        }
-        jwt_assertion = jwt.encode(payload, self.env['ir.config_parameter'].sudo().get_param('docusign_private_key', ''), algorithm='RS256')
-        # Request an access token
-        url = "https://{0}/oauth/token".format(platform_type[user.account_type])
-        headers = {
-            'Content-Type': 'application/x-www-form-urlencoded'
-        }
-        data = {
-            'grant_type': 'urn:ietf:params:oauth:grant-type:jwt-bearer',
-            'assertion': jwt_assertion
-        }
-        response = requests.post(url, headers=headers, data=data)
-        access_token = response.json().get('access_token')
-        user.access_token = access_token
+        """Make sure the DocuSign service user holds a valid access token.
 
-        if not access_token:
-            raise ValidationError(_("Failed to obtain access token from DocuSign"))
-        
+        Served from the shared token store; an OAuth round trip only happens
+        when the stored token is close to expiry.
+        """
+        self.env['docusign.service.account'].get_access_token()
         return True
 
     def _ensure_docusign_config(self):
@@ -1136,7 +1189,7 @@ class SaleSubscription(models.Model):
 
         # If there is no envelope yet, send the contract now using the selected method.
         if not contract_record or not contract_record.docusign_id:
-            self.action_send_for_signature()
+            self._send_for_signature_now()
             if self.contract_ids:
                 contract_record = self.contract_ids.sorted(lambda r: r.id)[-1]
 
@@ -1220,22 +1273,8 @@ class SaleSubscription(models.Model):
                 
                 # Send for signature (will use addendum template for upsells, full contract for normal subscriptions)
                 # Normalize WhatsApp only when the send method is WhatsApp and a number is present
-                if self.contract_send_method == 'whatsapp':
-                    whatsapp_number = self.partner_id.whatsapp or ''
-                    if not isinstance(whatsapp_number, str) or not whatsapp_number:
-                        self.write({'contract_send_method': 'email'})
-                    else:
-                        if whatsapp_number.startswith('+1') and len(whatsapp_number) == 12:
-                            match = re.match(r'^\+(\d{1})(\d{10})$', whatsapp_number)
-                        elif whatsapp_number.startswith('+503') and len(whatsapp_number) == 12:
-                            match = re.match(r'^\+(\d{1,3})(\d+)$', whatsapp_number)
-                        else:
-                            match = re.match(r'^\+(\d{1,3})(\d{4,14})$', whatsapp_number)
-                        if match:
-                            country_code = match.group(1)
-                            phone_number = match.group(2)
-                        else:
-                            self.write({'contract_send_method': 'email'})
+                if self.contract_send_method == 'whatsapp' and not self.partner_id.whatsapp_e164:
+                    self.write({'contract_send_method': 'email'})
                 self.action_send_for_signature()
             return res
         
@@ -1486,6 +1525,8 @@ class SaleSubscription(models.Model):
     def action_quotation_send(self):
         """Send quote via WhatsApp template when possible; fallback to email."""
         self.ensure_one()
+        # the quote becomes confirmable: have its contract PDF ready before the customer confirms
+        self._schedule_contract_prerender()
 
         ICP = self.env['ir.config_parameter'].sudo()
 
@@ -1511,7 +1552,7 @@ class SaleSubscription(models.Model):
             _logger.info("[QuoteSend] WhatsApp sending disabled via config; using email for order %s", self.name)
             can_use_whatsapp = False
 
-        pdf_base64 = None
+        quote_attachment = None
         if can_use_whatsapp:
             action_report = self.env.ref('sale.action_report_saleorder', raise_if_not_found=False)
             if not action_report:
@@ -1522,17 +1563,7 @@ class SaleSubscription(models.Model):
                 can_use_whatsapp = False
             else:
                 try:
-                    pdf_content, _report_format = action_report._render_qweb_pdf(
-                        report_ref='sale.action_report_saleorder',
-                        res_ids=self.ids,
-                    )
-                    pdf_base64 = base64.b64encode(pdf_content).decode('utf-8') if pdf_content else None
-                    if not pdf_base64:
-                        _logger.warning(
-                            "[QuoteSend] Empty PDF content for order %s; skipping WhatsApp send",
-                            self.name,
-                        )
-                        can_use_whatsapp = False
+                    quote_attachment = self._get_quote_pdf_attachment()
                 except Exception as exc:
                     _logger.warning(
                         "[QuoteSend] Failed to render PDF for order %s; skipping WhatsApp send: %s",
@@ -1551,8 +1582,7 @@ class SaleSubscription(models.Model):
             confirmation_link = self.confirmation_url or self.get_portal_url()
             WhatsApp = self.env['whatsapp.comm']
 
-            normalized_phone = WhatsApp.normalize_phone(whatsapp_number)
-            client_phone = f"+{normalized_phone}" if normalized_phone else None
+            client_phone = partner_for_comm.whatsapp_e164 or None
 
             if client_phone:
                 context_info = f"quote {self.id} to {partner_for_comm.name} ({client_phone})"
@@ -1573,15 +1603,8 @@ class SaleSubscription(models.Model):
 
                 pdf_media_url = None
                 try:
-                    if pdf_base64:
-                        attachment = self.env['ir.attachment'].sudo().create({
-                            'name': f"{self.name}.pdf",
-                            'datas': pdf_base64,
-                            'type': 'binary',
-                            'res_model': self._name,
-                            'res_id': self.id,
-                            'mimetype': 'application/pdf',
-                        })
+                    if quote_attachment:
+                        attachment = quote_attachment
 
                         token = attachment.access_token or attachment.generate_access_token()
                         if isinstance(token, (list, tuple, set)):
@@ -1799,47 +1822,197 @@ class SaleSubscription(models.Model):
             }
 
     def action_send_for_signature(self):
+        """Queue the contracts for DocuSign; the send queue renders and sends them.
+
+        Pass ``docusign_send_sync`` in the context, or disable the
+        ``contract_management.docusign_async_send`` parameter, to send inside
+        the current request instead.
+        """
+        async_send = str2bool(self.env['ir.config_parameter'].sudo().get_param(
+            'contract_management.docusign_async_send', 'True'))
+        if self.env.context.get('docusign_send_sync') or not async_send:
+            return self._send_for_signature_now()
+        self.env['docusign.send.job']._enqueue(self)
+        return
+
+    def _compute_contract_amounts(self):
+        """Compute and persist the contract value printed on the contract PDF.
+
+        Return ``(monthly_payment, contract_value)``; the monthly payment is
+        tax-inclusive and comes from the non-upsell ancestor's recurring lines.
+        """
+        self.ensure_one()
+        contract = self
+        # Calculate monthly_payment (tax-inclusive) and contract_value from recurring order lines
+        base_order = contract._get_addendum_base_order()
+        contract_value_source = contract._get_contract_value_source_order()
+        recurring_lines_current = contract.order_line.filtered(lambda l: l.product_id.recurring_invoice)
+        recurring_lines_base = base_order.order_line.filtered(lambda l: l.product_id.recurring_invoice) if base_order and base_order != contract else contract.env['sale.order.line']
+        combined_recurring_lines = (recurring_lines_base | recurring_lines_current) if recurring_lines_base else recurring_lines_current
+
+        # Use non-upsell ancestor for monthly and contract value to avoid double counting
+        contract_value = 0.0
+        contract_value_lines = contract_value_source.order_line.filtered(lambda l: l.product_id.recurring_invoice) if contract_value_source else contract.env['sale.order.line']
+        contract_value_monthly = sum(line.price_total for line in contract_value_lines)
+        monthly_payment = contract_value_monthly
+
+        # Calculate contract value based on contract term and billing period (prefer base order settings for upsells)
+        billing_source = base_order if base_order else contract
+        contract_value_billing_source = contract_value_source if contract_value_source else billing_source
+        if contract_value_billing_source.contract_term and contract_value_billing_source.plan_id:
+            contract_term_months = contract_value_billing_source.contract_term.term
+            # Get billing period in months from the plan
+            billing_period_months = contract_value_billing_source.plan_id.billing_period_value if contract_value_billing_source.plan_id.billing_period_unit == 'month' else 1
+            if billing_period_months > 0:
+                duration = contract_term_months / billing_period_months
+                contract_value = contract_value_monthly * duration
+            else:
+                contract_value = contract_value_monthly * 12  # Fallback to 12 if calculation fails
+        else:
+            contract_value = contract_value_monthly * 12  # Default to 12 if no contract term/plan
+        
+        _logger.info("[DocuSign] Calculated values for contract ID=%s: monthly_payment=%.2f, contract_value=%.2f", 
+                    contract.id, monthly_payment, contract_value)
+
+        # Persist contract_value so QWeb reports (contract PDFs) render the correct amount
+        if float_compare(contract.contract_value, contract_value, precision_digits=6):
+            contract.sudo().write({'contract_value': contract_value})
+        return monthly_payment, contract_value
+
+    def _prepare_contract_template(self):
+        """Assign the contract number and (re)compute the contract template.
+
+        Return the addendum record of an upsell, or False.
+        """
+        self.ensure_one()
+        contract = self
+        # Step 1: Generate contract number
+        if contract.is_subscription and not contract.cabal_sequence:
+            contract._assign_cabal_sequence()
+            _logger.info("[DocuSign] Generated contract sequence: %s", contract.cabal_sequence)
+        
+        # Step 2: Fetch the contract template (force recompute for upsells)
+        # For upsells, check if an addendum was created (not subscription_state, which may have changed)
+        has_addendum = contract.env['contract.addendum'].search_count([
+            ('upsell_subscription_id', '=', contract.id)
+        ]) > 0
+        
+        _logger.info("[DocuSign] Contract subscription_state=%s, has_addendum=%s", 
+                    contract.subscription_state, has_addendum)
+
+        addendum_record = False
+        if has_addendum:
+            addendum_record = contract.env['contract.addendum'].search([
+                ('upsell_subscription_id', '=', contract.id)
+            ], order='create_date desc', limit=1)
+        
+        if has_addendum:
+            # This is an upsell - force recompute to use addendum template
+            contract._compute_contract_template()
+            _logger.info("[DocuSign] Addendum detected, forced recompute. contract_template=%s", 
+                       contract.contract_template.name if contract.contract_template else None)
+        return addendum_record
+
+    def _prerender_contract_documents(self, as_confirmed=False):
+        """Render the contracts of several orders in batches, grouped by template.
+
+        Fills the render cache so the per-order send that follows only picks
+        up the attachment. Orders that fail here are left to that send.
+
+        With ``as_confirmed`` (quotes not confirmed yet) the PDFs are rendered
+        as the orders will look once confirmed: the confirmation date is
+        written inside a savepoint that is rolled back after rendering, and
+        only the attachments are kept. The contract number they will print is
+        reserved (see :meth:`_reserve_cabal_sequence`) and stamped inside the
+        same savepoint, so the quote itself gets no contract number before it
+        is sent.
+        """
+        by_template = {}
+        for contract in self:
+            try:
+                contract._compute_contract_amounts()
+                if as_confirmed:
+                    # upsells are not pre-rendered: no addendum to prepare
+                    if contract.is_subscription:
+                        contract._reserve_cabal_sequence()
+                else:
+                    contract._prepare_contract_template()
+            except Exception as e:
+                _logger.warning("[DocuSign] Cannot prepare contract ID=%s for batch render: %s", contract.id, e)
+                continue
+            if contract.contract_template:
+                by_template.setdefault(contract.contract_template, self.browse())
+                by_template[contract.contract_template] |= contract
+        for report_template, contracts in by_template.items():
+            rendered = {}
+            try:
+                if not as_confirmed:
+                    self._create_documents_to_be_signed(contracts, report_template)
+                    continue
+                try:
+                    with self.env.cr.savepoint():
+                        # action_confirm stamps date_order with the confirmation time
+                        contracts.sudo().write({'date_order': fields.Datetime.now()})
+                        for contract in contracts.filtered(lambda c: c.cabal_sequence_reserved and not c.cabal_sequence):
+                            contract.sudo().cabal_sequence = contract.cabal_sequence_reserved
+                        _cached, rendered = self._render_contract_pdfs(contracts, report_template)
+                        raise ContractRenderSimulation()
+                except ContractRenderSimulation:
+                    pass
+                finally:
+                    self.env.invalidate_all()
+                self._attach_contract_pdfs(contracts, rendered)
+            except Exception as e:
+                _logger.warning("[DocuSign] Batch render of %s with %s failed: %s", contracts.ids, report_template.name, e)
+
+    @api.model
+    def cron_prerender_contracts(self, limit=100):
+        """Pre-render the contract of every confirmable quote whose inputs changed.
+
+        A quote is confirmable once it was sent to the customer; at
+        confirmation the signature flow then finds the PDF in the render
+        cache instead of running wkhtmltopdf inside the customer's request.
+        """
+        if not str2bool(self.env['ir.config_parameter'].sudo().get_param(
+                'contract_management.contract_prerender', 'True')):
+            return 0
+        quotes = self.sudo().search(self._get_prerender_domain(), order='id desc', limit=limit)
+        if quotes:
+            quotes._prerender_contract_documents(as_confirmed=True)
+            _logger.info("[DocuSign] Pre-render checked %d confirmable quotes", len(quotes))
+        return len(quotes)
+
+    @api.model
+    def _get_prerender_domain(self):
+        today = fields.Date.context_today(self)
+        return [
+            ('state', '=', 'sent'),
+            ('is_subscription', '=', True),
+            ('quote_confirmed', '=', False),
+            ('contract_template', '!=', False),
+            # upsells get their addendum (and template) only at confirmation
+            ('subscription_state', '!=', '7_upsell'),
+            ('upsell_from_id', '=', False),
+            '|', ('validity_date', '=', False), ('validity_date', '>=', today),
+        ]
+
+    def _schedule_contract_prerender(self):
+        cron = self.env.ref('contract_management.ir_cron_contract_prerender', raise_if_not_found=False)
+        if cron:
+            cron.sudo()._trigger(at=fields.Datetime.now() + timedelta(minutes=1))
+
+    def _send_for_signature_now(self):
         _logger.info("[DocuSign] action_send_for_signature called for %d contract(s)", len(self))
+        if len(self) > 1:
+            self._prerender_contract_documents()
         for contract in self:
             _logger.info("[DocuSign] Processing contract ID=%s, name=%s, send_method=%s", 
                         contract.id, contract.name, contract.contract_send_method)
 
             # Always send contracts for renewals; do not auto-activate identical renewals
             
-            # Calculate monthly_payment (tax-inclusive) and contract_value from recurring order lines
-            base_order = contract._get_addendum_base_order()
-            contract_value_source = contract._get_contract_value_source_order()
-            recurring_lines_current = contract.order_line.filtered(lambda l: l.product_id.recurring_invoice)
-            recurring_lines_base = base_order.order_line.filtered(lambda l: l.product_id.recurring_invoice) if base_order and base_order != contract else contract.env['sale.order.line']
-            combined_recurring_lines = (recurring_lines_base | recurring_lines_current) if recurring_lines_base else recurring_lines_current
-
-            # Use non-upsell ancestor for monthly and contract value to avoid double counting
-            contract_value = 0.0
-            contract_value_lines = contract_value_source.order_line.filtered(lambda l: l.product_id.recurring_invoice) if contract_value_source else contract.env['sale.order.line']
-            contract_value_monthly = sum(line.price_total for line in contract_value_lines)
-            monthly_payment = contract_value_monthly
-
-            # Calculate contract value based on contract term and billing period (prefer base order settings for upsells)
-            billing_source = base_order if base_order else contract
-            contract_value_billing_source = contract_value_source if contract_value_source else billing_source
-            if contract_value_billing_source.contract_term and contract_value_billing_source.plan_id:
-                contract_term_months = contract_value_billing_source.contract_term.term
-                # Get billing period in months from the plan
-                billing_period_months = contract_value_billing_source.plan_id.billing_period_value if contract_value_billing_source.plan_id.billing_period_unit == 'month' else 1
-                if billing_period_months > 0:
-                    duration = contract_term_months / billing_period_months
-                    contract_value = contract_value_monthly * duration
-                else:
-                    contract_value = contract_value_monthly * 12  # Fallback to 12 if calculation fails
-            else:
-                contract_value = contract_value_monthly * 12  # Default to 12 if no contract term/plan
-            
-            _logger.info("[DocuSign] Calculated values for contract ID=%s: monthly_payment=%.2f, contract_value=%.2f", 
-                        contract.id, monthly_payment, contract_value)
+            monthly_payment, contract_value = contract._compute_contract_amounts()
 
-            # Persist contract_value so QWeb reports (contract PDFs) render the correct amount
-            contract.sudo().write({'contract_value': contract_value})
-            
             # Step 0: Choose delivery method with WhatsApp-first, email fallback
             send_method = contract.contract_send_method or 'whatsapp'
             partner_email = (contract.partner_id.email or '').strip()
@@ -1854,35 +2027,13 @@ class SaleSubscription(models.Model):
                     contract.id,
                 )
 
-            # Step 1: Generate contract number
-            if contract.is_subscription and not contract.cabal_sequence:
-                contract.sudo().cabal_sequence = contract._get_cabal_sequence()
-                _logger.info("[DocuSign] Generated contract sequence: %s", contract.cabal_sequence)
-            
-            # Step 2: Fetch the contract template (force recompute for upsells)
-            # For upsells, check if an addendum was created (not subscription_state, which may have changed)
-            has_addendum = self.env['contract.addendum'].search_count([
-                ('upsell_subscription_id', '=', contract.id)
-            ]) > 0
-            
-            _logger.info("[DocuSign] Contract subscription_state=%s, has_addendum=%s", 
-                        contract.subscription_state, has_addendum)
-
-            addendum_record = False
-            if has_addendum:
-                addendum_record = self.env['contract.addendum'].search([
-                    ('upsell_subscription_id', '=', contract.id)
-                ], order='create_date desc', limit=1)
-            
-            if has_addendum:
-                # This is an upsell - force recompute to use addendum template
-                contract._compute_contract_template()
-                _logger.info("[DocuSign] Addendum detected, forced recompute. contract_template=%s", 
-                           contract.contract_template.name if contract.contract_template else None)
-            
+            # Steps 1-2: contract number and template (forced recompute for upsells)
+            addendum_record = contract._prepare_contract_template()
+
             if not contract.contract_template:
                 _logger.error("[DocuSign] Contract template not specified for contract ID=%s", contract.id)
                 raise UserError('Contract template not specified.')
+            contract._snapshot_contract_clauses()
             # Step 3: Create the document to be signed using the template
             _logger.info("[DocuSign] Creating document for contract ID=%s with template=%s", 
                         contract.id, contract.contract_template.name)
@@ -2126,7 +2277,7 @@ class SaleSubscription(models.Model):
             raise ValidationError(_("Contract template is not specified."))
 
         if not self.cabal_sequence:
-            self.sudo().cabal_sequence = self._get_cabal_sequence()
+            self._assign_cabal_sequence()
 
         contract_value_source = self._get_contract_value_source_order()
         recurring_lines = contract_value_source.order_line.filtered(lambda l: l.product_id.recurring_invoice) if contract_value_source else self.env['sale.order.line']
@@ -2225,6 +2376,220 @@ class SaleSubscription(models.Model):
 
         return 0.0
 
+    @api.model
+    def _get_report_views_stamp(self, report):
+        """Version of the QWeb views a report renders with: those of its module and the web layouts."""
+        module = (report.report_name or '').split('.', 1)[0]
+        self.env['ir.ui.view'].flush_model(['write_date', 'key'])
+        self.env.cr.execute("""
+            SELECT count(*), max(write_date)
+              FROM ir_ui_view
+             WHERE key LIKE %s OR key LIKE 'web.%%layout' OR key = 'web.html_container'
+        """, [module + '.%'])
+        views_count, views_date = self.env.cr.fetchone()
+        return [views_count, str(views_date)]
+
+    def _get_contract_render_key(self, subscription, report_template):
+        """Hash of everything the contract PDF of ``subscription`` is rendered from.
+
+        Covers the printed values of the order and its lines (the parent
+        order's recurring lines for upsells), the partners, company, term and
+        clauses shown, the report action, its paper format, the version of the
+        module's QWeb views and the rendering language. Any change to one of
+        them gives a new key.
+        """
+        report = report_template.sudo()
+        subscription = subscription.sudo()
+
+        def stamp(records):
+            return [(r._name, r.id, str(r.write_date)) for r in records if r]
+
+        partners = subscription.partner_id | subscription.partner_invoice_id | subscription.partner_shipping_id
+        lines = subscription.order_line | subscription._get_recurring_lines_for_addendum()
+        inputs = {
+            'report': stamp(report | report.paperformat_id),
+            'views': self._get_report_views_stamp(report),
+            'lang': subscription.partner_id.lang or self.env.lang,
+            # values, not write_date: sending the contract writes the order itself. Only the
+            # date of date_order is printed (confirmation re-stamps it with the current time)
+            'order': [str(v) for v in (
+                subscription.id, subscription.name, subscription.cabal_sequence,
+                subscription.date_order and subscription.date_order.date(),
+                subscription.contract_value, subscription.amount_total,
+                getattr(subscription, 'recurring_total', None), subscription.contract_template.id,
+            )],
+            'lines': sorted(
+                (l.id, l.product_id.id, l.name, l.price_unit, l.product_uom_qty, l.discount,
+                 l.price_total, tuple(l.tax_id.ids))
+                for l in lines
+            ),
+            'partners': sorted(stamp(partners | partners.commercial_partner_id)),
+            'company': stamp(subscription.company_id),
+            'term': stamp(subscription.contract_term),
+            'clauses': [vals['hash'] for vals in subscription._get_contract_clause_values()],
+        }
+        return hashlib.sha256(json.dumps(inputs, sort_keys=True).encode()).hexdigest()
+
+    def _get_contract_clauses(self):
+        """Clauses printed on the contract: the signed snapshot once taken, else the live active clauses."""
+        self.ensure_one()
+        return self.clause_snapshot_ids or self.clause_ids.filtered('active')
+
+    def _get_contract_clause_values(self):
+        """Snapshot values (with hash) of the clauses printed on the contract."""
+        self.ensure_one()
+        if self.clause_snapshot_ids:
+            return [{'hash': text.hash} for text in self.clause_snapshot_ids]
+        return self.env['contract.clause.text']._prepare_values(
+            self.sudo().clause_ids, self.partner_id.lang or self.env.lang or 'en_US')
+
+    def _snapshot_contract_clauses(self):
+        """Freeze the clause texts the contract is sent with; identical texts share one snapshot row."""
+        ClauseText = self.env['contract.clause.text']
+        for order in self:
+            values = ClauseText._prepare_values(order.sudo().clause_ids, order.partner_id.lang or self.env.lang or 'en_US')
+            texts = ClauseText._get_or_create(values)
+            if set(texts.ids) != set(order.clause_snapshot_ids.ids):
+                order.sudo().with_context(skip_renewal_completion=True).write({'clause_snapshot_ids': [(6, 0, texts.ids)]})
+
+    def _create_documents_to_be_signed(self, subscriptions, report_template):
+        """Return ``{subscription_id: attachment}`` with the contract PDF of each subscription.
+
+        Cached renders are reused; the others are rendered by
+        :meth:`_render_contract_pdfs` and attached in one ``create``.
+        """
+        documents, rendered = self._render_contract_pdfs(subscriptions, report_template)
+        documents.update(self._attach_contract_pdfs(subscriptions, rendered))
+        return documents
+
+    def _render_contract_pdfs(self, subscriptions, report_template):
+        """Render the contract PDFs of ``subscriptions`` with one report template.
+
+        Subscriptions whose inputs were already rendered reuse the cached
+        attachment. The others are rendered in chunks of one report call (one
+        wkhtmltopdf run) each, split back per order on the invisible
+        start-of-document markers; a batch whose markers cannot be matched
+        falls back to one render per subscription.
+
+        Return ``(cached, rendered)``: ``{subscription_id: attachment}`` and
+        ``{subscription_id: (render_key, pdf_content)}``.
+        """
+        Attachment = self.env['ir.attachment'].sudo()
+        report = report_template.sudo()
+        cached = {}
+        render_keys = {}
+        for subscription in subscriptions:
+            # Reuse the PDF rendered from the same inputs (resends of an unchanged subscription)
+            render_key = self._get_contract_render_key(subscription, report)
+            attachment = Attachment._find_contract_render(render_key)
+            if attachment:
+                _logger.info("[DocuSign] Render cache hit for subscription ID=%s: attachment ID=%s", subscription.id, attachment.id)
+                cached[subscription.id] = attachment
+            else:
+                render_keys[subscription.id] = render_key
+        todo = subscriptions.filtered(lambda s: s.id in render_keys)
+
+        pdfs = {}
+        batch_size = self._get_contract_batch_render_size()
+        for index in range(0, len(todo), batch_size):
+            chunk = todo[index:index + batch_size]
+            if len(chunk) < 2:
+                continue
+            _logger.info("[DocuSign] Batch rendering %d contracts with report ID=%s", len(chunk), report.id)
+            pdf_content, _report_format = self._render_contract_report(report, chunk.ids, data={'contract_batch_markers': True})
+            split = self._split_contract_batch_pdf(pdf_content, chunk.ids)
+            if split is None:
+                _logger.warning("[DocuSign] Batch markers did not match orders %s; rendering them one by one", chunk.ids)
+            else:
+                pdfs.update(split)
+        for subscription in todo.filtered(lambda s: s.id not in pdfs):
+            _logger.info("[DocuSign] Rendering PDF for subscription ID=%s using report ID=%s", subscription.id, report.id)
+            pdfs[subscription.id], _report_format = self._render_contract_report(report, [subscription.id])
+        return cached, {res_id: (render_keys[res_id], pdf) for res_id, pdf in pdfs.items()}
+
+    @api.model
+    def _render_contract_report(self, report, res_ids, data=None):
+        """``_render_qweb_pdf`` of a contract report, profiled while profiling mode is on."""
+        Profile = self.env['contract.render.profile']
+        if Profile._is_enabled():
+            pdf_content, report_type, _profile = Profile._profile_render(report, res_ids, data=data)
+            return pdf_content, report_type
+        return self.env['ir.actions.report']._render_qweb_pdf(report.id, res_ids, data=data)
+
+    def action_profile_contract_render(self):
+        """Render the contract of the selected orders once with profiling and show the result."""
+        profiles = self.env['contract.render.profile']
+        for report_template, orders in self.grouped('contract_template').items():
+            if not report_template:
+                raise UserError(_("Contract template not specified for %s.") % ', '.join(orders.mapped('name')))
+            profiles |= profiles.sudo()._profile_render(report_template, orders.ids)[2]
+        return {
+            'type': 'ir.actions.act_window',
+            'name': _('Contract Render Profiles'),
+            'res_model': 'contract.render.profile',
+            'view_mode': 'tree,form',
+            'domain': [('id', 'in', profiles.ids)],
+        }
+
+    def _attach_contract_pdfs(self, subscriptions, rendered):
+        """Create the attachments of ``rendered`` (see :meth:`_render_contract_pdfs`) in one ``create``."""
+        todo = subscriptions.filtered(lambda s: s.id in rendered)
+        attachments = self.env['ir.attachment'].sudo()._create_deduplicated([{
+            'name': f'{subscription.cabal_sequence or subscription.cabal_sequence_reserved}_{subscription.name}_customer_contract.pdf',
+            'type': 'binary',
+            'raw': rendered[subscription.id][1],
+            'res_model': 'sale.order',
+            'res_id': subscription.id,
+            'mimetype': 'application/pdf',
+            'contract_render_key': rendered[subscription.id][0],
+        } for subscription in todo])
+        documents = {}
+        for subscription, attachment in zip(todo, attachments):
+            if attachment.contract_render_key != rendered[subscription.id][0]:
+                # identical bytes already attached to the order: file the reused one under the new key
+                attachment.contract_render_key = rendered[subscription.id][0]
+            _logger.info("[DocuSign] Attachment created successfully: ID=%s (%d bytes) for subscription ID=%s",
+                         attachment.id, attachment.file_size, subscription.id)
+            documents[subscription.id] = attachment
+        return documents
+
+    @api.model
+    def _get_contract_batch_render_size(self):
+        try:
+            return max(1, int(self.env['ir.config_parameter'].sudo().get_param(
+                'contract_management.contract_batch_render_size', CONTRACT_BATCH_RENDER_SIZE)))
+        except (TypeError, ValueError):
+            return CONTRACT_BATCH_RENDER_SIZE
+
+    @api.model
+    def _split_contract_batch_pdf(self, pdf_content, res_ids):
+        """Split a batch render into ``{res_id: pdf}`` on the start-of-document markers.
+
+        Return None unless every order of ``res_ids`` starts exactly once,
+        the first one on the first page.
+        """
+        reader = PdfFileReader(io.BytesIO(pdf_content), strict=False)
+        page_count = reader.getNumPages()
+        starts = []
+        for page_no in range(page_count):
+            page = reader.getPage(page_no)
+            extract = getattr(page, 'extract_text', None) or page.extractText
+            match = CONTRACT_BATCH_MARKER.search(re.sub(r'\s+', '', extract() or ''))
+            if match:
+                starts.append((page_no, int(match.group(1))))
+        found = [res_id for _page_no, res_id in starts]
+        if not starts or starts[0][0] != 0 or len(set(found)) != len(found) or set(found) != set(res_ids):
+            return None
+        result = {}
+        for (first, res_id), last in zip(starts, [page_no for page_no, _res_id in starts[1:]] + [page_count]):
+            writer = PdfFileWriter()
+            for page_no in range(first, last):
+                writer.addPage(reader.getPage(page_no))
+            stream = io.BytesIO()
+            writer.write(stream)
+            result[res_id] = stream.getvalue()
+        return result
+
     def _create_document_to_be_signed(self, subscription, report_template):
         # Render the report as PDF
         # Check to make sure that the contract template has been specified
@@ -2251,28 +2616,7 @@ class SaleSubscription(models.Model):
         if not report_template:
             _logger.error("[DocuSign] No contract template specified for subscription ID=%s", subscription.id)
             raise ValueError("No contract template specified.")
-        # Fetch report action
-        _logger.info("[DocuSign] Fetching report action for template ID=%s", report_template.id)
-        report_action = report_template.sudo().read()[0]
-        # Generate the attachment
-        _logger.info("[DocuSign] Rendering PDF for subscription ID=%s using report ID=%s", 
-                    subscription.id, report_action['id'])
-        pdf_content, _ = self.env['ir.actions.report']._render_qweb_pdf(report_action['id'], [subscription.id])
-        pdf_size = len(pdf_content)
-        _logger.info("[DocuSign] PDF generated successfully, size=%d bytes", pdf_size)
-        # Create an attachment for the generated PDF
-        attachment_name = f'{subscription.cabal_sequence}_{subscription.name}_customer_contract.pdf'
-        _logger.info("[DocuSign] Creating attachment: %s", attachment_name)
-        attachment = self.env['ir.attachment'].sudo().create({
-            'name': attachment_name,
-            'type': 'binary',
-            'datas': base64.b64encode(pdf_content),
-            'res_model': 'sale.order',
-            'res_id': subscription.id,
-            'mimetype': 'application/pdf'
-        })
-        _logger.info("[DocuSign] Attachment created successfully: ID=%s", attachment.id)
-        return attachment
+        return self._create_documents_to_be_signed(subscription, report_template)[subscription.id]
 
     def _send_document_to_docusign(self, contract, document):
         # Retrieve DocuSign credentials from the custom model
@@ -2296,10 +2640,10 @@ class SaleSubscription(models.Model):
         
         _logger.info("[DocuSign] Retrieved DocuSign user ID=%s, name=%s, email=%s", user.id, user.name, user.email)
         
-        if not user.access_token or not user.account_id:
+        if not user.account_id:
             _logger.error("[DocuSign] DocuSign credentials not configured for user ID=%s (email=%s). "
-                         "access_token=%s, account_id=%s", 
-                         user.id, user.email, bool(user.access_token), user.account_id)
+                         "account_id=%s",
+                         user.id, user.email, user.account_id)
             raise UserError(f"DocuSign credentials are not configured for user {user.email}.")
         
         # Calculate custom fields for DocuSign envelope
@@ -2407,8 +2751,7 @@ class SaleSubscription(models.Model):
             magic_url = f"{base_url}{path}" if base_url else path
 
         # Prefer explicit WhatsApp number, then fall back to mobile/phone
-        normalized_phone = WhatsApp.normalize_phone(partner.whatsapp)
-        client_phone = f'+{normalized_phone}' if normalized_phone else None
+        client_phone = partner.whatsapp_e164 or None
         if not client_phone:
             raise ValidationError(_("Número de teléfono inválido"))
         
@@ -2437,42 +2780,30 @@ class SaleSubscription(models.Model):
             rich_template_data=rich_template_data,
         )
 
-        result = WhatsApp._send_fc_template_request(payload)
-        
-        if not result.get('success'):
-            error_msg = result.get('error') or _('Unknown error sending WhatsApp')
-            _logger.error("[DocuSign] WhatsApp magic link send failed: %s", error_msg)
-            raise ValidationError(_("No se pudo enviar el enlace por WhatsApp: %s") % error_msg)
-
-        response = result.get('response') or {}
-        log_record = False
-
-        if response.get('request_id'):
-            base_vals = {
+        message = _("Enlace de firma enviado por WhatsApp")
+        if test_mode:
+            message += " [TEST MODE]"
+        outbox = self.env['contract.message.outbox']._enqueue({
+            'name': _("Enlace de firma"),
+            'kind': 'fc_template',
+            'idempotency_key': f"magic:{self.id}:{token}",
+            'payload': payload,
+            'log_vals': {
                 "name": _("Enlace de firma"),
                 "partner_id": partner.id,
                 "sale_order": self.id,
                 "to_phone": recipient_phone,
                 "template_name": template_name,
-            }
-
-            log_record = WhatsApp._create_fc_whatsapp_log(
-                base_vals=base_vals,
-                response_dict=result,
-                verification_dict=None,
-                test_mode=test_mode,
-            )
-        request_id = response.get('request_id') or (log_record.request_id if log_record else '')
-        message = _("Enlace de firma enviado por WhatsApp")
-
-        if test_mode:
-            message += " [TEST MODE]"
-        if request_id:
-            message += _(" (Request ID: %s)") % request_id
-
-        self.message_post(body=message)
-
-        return log_record or True
+            },
+            'test_mode': test_mode,
+            'res_model': self._name,
+            'res_id': self.id,
+            'partner_id': partner.id,
+            'to_phone': recipient_phone,
+            'sent_message': message,
+        })
+        _logger.info("[DocuSign] WhatsApp magic link for %s queued in outbox message %s", self.name, outbox.id)
+        return outbox
 
     def action_send_contract_link_whatsapp(self):
         """Send the existing contract magic link via WhatsApp template."""
@@ -2562,86 +2893,217 @@ class SaleSubscription(models.Model):
                 'default_payment_day': default_day,
             },
         }
-    def send_quote_via_whatsapp(self, records):
+    def _get_quote_render_key(self):
+        """Hash of the quote PDF inputs.
 
-        auth_token = self.env['ir.config_parameter'].get_param('fc_auth_token', '')
-        fc_url_base = self.env['ir.config_parameter'].get_param('fc_url_base', '')
-        fc_url_send = self.env['ir.config_parameter'].get_param('fc_url_send', '')
-        namespace = self.env['ir.config_parameter'].get_param('wa_namespace', '')
-        message_template = self.env['ir.config_parameter'].get_param('wa_template_quote', 'confirmacion_de_orden')
+        Covers the printed values of the order and its lines, the partners,
+        company, report and paper format, the report views and the language.
+        Values rather than the order's write_date: sending the quote writes
+        the order itself.
+        """
+        self.ensure_one()
+        report = self.env.ref('sale.action_report_saleorder').sudo()
+        order = self.sudo()
+
+        def stamp(records):
+            return [(r._name, r.id, str(r.write_date)) for r in records if r]
+
+        partners = order.partner_id | order.partner_invoice_id | order.partner_shipping_id
+        inputs = {
+            'report': stamp(report | report.paperformat_id),
+            'views': self._get_report_views_stamp(report),
+            'lang': order.partner_id.lang or self.env.lang,
+            # the report prints "Quotation" for draft and sent orders alike
+            'order': [str(v) for v in (
+                order.id, order.name, order.state in ('draft', 'sent'),
+                order.date_order and order.date_order.date(), order.validity_date,
+                order.client_order_ref, order.user_id.id, order.payment_term_id.id,
+                order.fiscal_position_id.id, order.currency_id.id, order.note,
+                order.amount_untaxed, order.amount_tax, order.amount_total,
+            )],
+            'lines': sorted(
+                (l.id, l.sequence, l.display_type or '', l.product_id.id, l.name, l.price_unit,
+                 l.product_uom_qty, l.product_uom.id, l.discount, l.price_subtotal, l.price_total,
+                 tuple(l.tax_id.ids))
+                for l in order.order_line
+            ),
+            'partners': sorted(stamp(partners | partners.commercial_partner_id)),
+            'company': stamp(order.company_id),
+        }
+        return 'quote:' + hashlib.sha256(json.dumps(inputs, sort_keys=True).encode()).hexdigest()
 
-        WhatsApp = self.env['whatsapp.comm']
+    def _get_quote_pdf_attachment(self):
+        """Return the quote PDF attachment of the order, rendered once per set of inputs."""
+        self.ensure_one()
+        return self._get_quote_pdf_attachments()[self.id]
 
-        responses = []
-        for rec in records:
-            if not rec.partner_id.whatsapp:
-                raise ValidationError("Cliente no tiene numero de WhatsApp registrado")
+    def _get_quote_pdf_attachments(self):
+        """Return ``{order_id: attachment}`` with the quote PDFs of the orders.
 
-            normalized_phone = WhatsApp.normalize_phone(rec.partner_id.whatsapp)
-            if not normalized_phone:
-                raise ValidationError("Número de teléfono inválido")
+        Cached renders are reused; the others are rendered in one wkhtmltopdf
+        run and split per order by the report outlines, falling back to one
+        render per order when the PDF cannot be split.
+        """
+        Attachment = self.env['ir.attachment'].sudo()
+        keys = {order.id: order._get_quote_render_key() for order in self}
+        attachments = {}
+        missing = self.browse()
+        for order in self:
+            attachment = Attachment._find_contract_render(keys[order.id])
+            if attachment:
+                attachments[order.id] = attachment
+            else:
+                missing |= order
+        if not missing:
+            return attachments
+
+        Report = self.env['ir.actions.report']
+        pdfs = {}
+        if len(missing) > 1:
+            streams = Report._render_qweb_pdf_prepare_streams('sale.action_report_saleorder', {}, res_ids=missing.ids)
+            if False not in streams:
+                pdfs = {order_id: values['stream'].getvalue() for order_id, values in streams.items() if values.get('stream')}
+        for order in missing:
+            if not pdfs.get(order.id):
+                pdfs[order.id], _report_format = Report._render_qweb_pdf('sale.action_report_saleorder', res_ids=order.ids)
+            if not pdfs[order.id]:
+                raise UserError(_("Empty quote PDF for order %s.") % order.name)
+
+        created = Attachment._create_deduplicated([{
+            'name': f"{order.name}.pdf",
+            'type': 'binary',
+            'raw': pdfs[order.id],
+            'res_model': self._name,
+            'res_id': order.id,
+            'mimetype': 'application/pdf',
+            'contract_render_key': keys[order.id],
+        } for order in missing])
+        for order, attachment in zip(missing, created):
+            if attachment.contract_render_key != keys[order.id]:
+                attachment.contract_render_key = keys[order.id]
+            attachments[order.id] = attachment
+        return attachments
+
+    def _get_quote_pdf_url(self, attachment):
+        """Short download URL of ``attachment`` protected by its access token."""
+        self.ensure_one()
+        token = attachment.sudo().access_token or attachment.sudo().generate_access_token()[0]
+        filename = (attachment.name or 'quotation.pdf').replace(' ', '_')
+        return f"{self.get_base_url()}/web/content/{attachment.id}/{filename}?download=1&access_token={token}"
 
-            client_phone = f"+{normalized_phone}"
-            context_info = f"quote {rec.id} to {rec.partner_id.name} ({client_phone})"
-            recipient_phone, _ = WhatsApp._apply_test_mode_phone(client_phone, context_info)
+    def send_quote_via_whatsapp(self, records):
+        """Send the quote of each of ``records`` by WhatsApp.
+
+        Recipients are validated up front, the PDFs rendered in a batch and
+        the messages queued in ``contract.message.outbox``, whose cron posts
+        them through a pooled session with bounded concurrency. One failing
+        order never aborts the others: returns one ``{'order_id', 'phone',
+        'status', 'outbox_id', 'error'}`` per record, ``status`` being
+        ``queued``, ``sending``, ``sent``, ``failed`` or ``skipped``. A quote
+        already in the outbox reports the state of that message.
+        """
+        ICP = self.env['ir.config_parameter'].sudo()
+        namespace = ICP.get_param('wa_namespace', '')
+        message_template = ICP.get_param('wa_template_quote', 'confirmacion_de_orden')
 
-            # Render the quote PDF so we can attach it as a document header.
-            pdf_content, _ = self.env.ref('sale.action_report_saleorder')._render_qweb_pdf(rec.id)
-            pdf_base64 = base64.b64encode(pdf_content).decode('utf-8')
+        WhatsApp = self.env['whatsapp.comm']
 
-            headers = {
-                'Content-Type': 'application/json; charset=utf-8',
-                'Accept': 'application/json',
-                'Authorization': auth_token,
-            }
+        # 1. Validate every recipient before rendering or sending anything
+        results = {}
+        phones = {}
+        for rec in records:
+            results[rec.id] = {'order_id': rec.id, 'phone': None, 'status': 'skipped', 'outbox_id': None, 'error': None}
+            if not rec.partner_id.whatsapp:
+                results[rec.id]['error'] = "Cliente no tiene numero de WhatsApp registrado"
+                continue
+            client_phone = rec.partner_id.whatsapp_e164
+            if not client_phone:
+                results[rec.id]['error'] = "Número de teléfono inválido"
+                continue
+            context_info = f"quote {rec.id} to {rec.partner_id.name} ({client_phone})"
+            phones[rec.id], _test_mode = WhatsApp._apply_test_mode_phone(client_phone, context_info)
+            results[rec.id]['phone'] = client_phone
+        if len(records) == 1 and not phones:
+            # a single quote sent from the form keeps the blocking error
+            raise ValidationError(results[records.id]['error'])
+        valid = records.filtered(lambda r: r.id in phones)
+
+        # 2. Render the missing quote PDFs in batches
+        attachments = {}
+        batch_size = self._get_contract_batch_render_size()
+        for index in range(0, len(valid), batch_size):
+            batch = valid[index:index + batch_size]
+            try:
+                attachments.update(batch._get_quote_pdf_attachments())
+            except Exception as e:
+                _logger.warning("[WhatsApp Quote] Batch render of %s quotes failed, rendering one by one: %s", len(batch), e)
+                for rec in batch:
+                    try:
+                        attachments[rec.id] = rec._get_quote_pdf_attachment()
+                    except Exception as rec_error:
+                        results[rec.id].update(status='failed', error=str(rec_error))
 
-            payload = {
-                "from": {"phone_number": "+50379401214"},
-                "provider": "whatsapp",
-                "to": [{"phone_number": recipient_phone}],
-                "data": {
-                    "message_template": {
-                        "storage": "conversation",
-                        "template_name": message_template,
-                        "namespace": namespace,
-                        "language": {"policy": "deterministic", "code": "es"},
-                        "rich_template_data": {
-                            "header": {
-                                "type": "document",
-                                "document": {
-                                    "link": f"data:application/pdf;base64,{pdf_base64}",
-                                    "filename": f"{rec.name}.pdf",
-                                },
-                            },
-                            "body": {"params": [{"data": rec.partner_id.name}]},
-                            "button": {
-                                "sub_type": "url",
-                                "index": "0",
-                                "parameters": [
-                                    {"type": "text", "text": f"{rec.confirmation_url}&send_method=whatsapp"}
-                                ],
+        # 3. Queue the messages; the outbox cron delivers them
+        to_send = valid.filtered(lambda r: r.id in attachments)
+        today = fields.Date.context_today(self)
+        messages = self.env['contract.message.outbox']._enqueue([{
+            'name': "Notificacion por WhatsApp",
+            'kind': 'fc_quote',
+            # the same unchanged quote is sent at most once a day
+            'idempotency_key': f"quote:{rec.id}:{attachments[rec.id].contract_render_key or attachments[rec.id].id}:{today}",
+            'payload': rec._prepare_quote_whatsapp_payload(
+                phones[rec.id], rec._get_quote_pdf_url(attachments[rec.id]), message_template, namespace),
+            'res_model': rec._name,
+            'res_id': rec.id,
+            'partner_id': rec.partner_id.id,
+            'to_phone': results[rec.id]['phone'],
+            'sent_message': "Notificacion por WhatsApp enviada",
+        } for rec in to_send])
+        outbox_status = {'queued': 'queued', 'running': 'sending', 'done': 'sent', 'failed': 'failed'}
+        for rec, message in zip(to_send, messages):
+            results[rec.id].update(status=outbox_status[message.state], outbox_id=message.id,
+                                   error=message.last_error or None)
+
+        results = [results[rec.id] for rec in records]
+        _logger.info("[WhatsApp Quote] %s queued, %s already sent, %s failed, %s skipped",
+                     sum(r['status'] in ('queued', 'sending') for r in results),
+                     sum(r['status'] == 'sent' for r in results),
+                     sum(r['status'] == 'failed' for r in results),
+                     sum(r['status'] == 'skipped' for r in results))
+        return results
+
+    def _prepare_quote_whatsapp_payload(self, recipient_phone, pdf_link, message_template, namespace):
+        self.ensure_one()
+        return {
+            "from": {"phone_number": "+50379401214"},
+            "provider": "whatsapp",
+            "to": [{"phone_number": recipient_phone}],
+            "data": {
+                "message_template": {
+                    "storage": "conversation",
+                    "template_name": message_template,
+                    "namespace": namespace,
+                    "language": {"policy": "deterministic", "code": "es"},
+                    "rich_template_data": {
+                        "header": {
+                            "type": "document",
+                            "document": {
+                                "link": pdf_link,
+                                "filename": f"{self.name}.pdf",
                             },
                         },
-                    }
-                },
-            }
-
-            wa_sent = requests.post(f"{fc_url_base}/{fc_url_send}", headers=headers, json=payload, timeout=30)
-            response = wa_sent.json()
-            responses.append(response)
-
-            if 'request_id' in response:
-                rec.message_post(body="Notificacion por WhatsApp enviada con Request ID " + str(response['request_id']))
-            else:
-                rec.message_post(body="Notificacion por WhatsApp FALLIDA con codigo " + str(wa_sent.status_code))
-                self.env['helpdesk.ticket'].sudo().create({
-                    'name': "Unable to Send WhatsApp",
-                    'description': "WhatsApp Notification to " + str(client_phone) + " was " + str(response),
-                    'message_needaction': True,
-                    'ticket_type_id': 4,
-                })
-
-        return responses
+                        "body": {"params": [{"data": self.partner_id.name}]},
+                        "button": {
+                            "sub_type": "url",
+                            "index": "0",
+                            "parameters": [
+                                {"type": "text", "text": f"{self.confirmation_url}&send_method=whatsapp"}
+                            ],
+                        },
+                    },
+                }
+            },
+        }
 
     # Redefining methods from the sale_subscription.sale_order.py file to accommodate CPE 
 
@@ -2792,9 +3254,7 @@ class ContractSendMethodWizard(models.TransientModel):
 
         # Validation for WhatsApp send method
         if self.send_method == 'whatsapp':
-            phone_raw = contract.partner_id.whatsapp or ''
-            match = re.match(r'^\+(\d{1,3})(\d+)$', phone_raw)
-            if not match:
+            if not contract.partner_id.whatsapp_e164:
                 raise ValidationError("The customer does not have a valid WhatsApp number.")
         contract.contract_send_method = self.send_method
         _logger.info("[DocuSign] ContractSendMethodWizard: contract_id=%s, send_method=%s", 
@@ -3141,7 +3601,7 @@ class ContractUploadWizard(models.TransientModel):
             self.subscription_id.write({'installation_state': 'to_be_scheduled'})
 
         # Store the contract document in the documents tab of the relevant subscription
-        attachment = self.env['ir.attachment'].create({
+        attachment = self.env['ir.attachment']._create_deduplicated({
             'name': self.contract_filename,
             'type': 'binary',
             'datas': self.contract_file,
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""Pooled HTTP sender for the WhatsApp provider's send endpoint."""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence
+
+import requests
+from requests.adapters import HTTPAdapter
+
+_logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = (5.0, 30.0)
+DEFAULT_CONCURRENCY = 8
+POOL_MAXSIZE = 32
+
+_session: Optional[requests.Session] = None
+_session_pid: Optional[int] = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """Return the keep-alive session of the current worker process (rebuilt after a fork)."""
+    global _session, _session_pid
+    pid = os.getpid()
+    if _session is None or _session_pid != pid:
+        with _session_lock:
+            if _session is None or _session_pid != pid:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=2, pool_maxsize=POOL_MAXSIZE, max_retries=0)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _session = session
+                _session_pid = pid
+    return _session
+
+
+def post_message(url: str, headers: Dict[str, str], payload: Dict[str, Any], timeout=DEFAULT_TIMEOUT) -> Dict[str, Any]:
+    """POST one message; never raises.
+
+    Returns ``{'status_code', 'response', 'request_id', 'error'}`` where
+    ``request_id`` is set when the provider accepted the message.
+    """
+    result = {'status_code': None, 'response': None, 'request_id': None, 'error': None}
+    try:
+        reply = get_session().post(url, headers=headers, json=payload, timeout=timeout)
+        result['status_code'] = reply.status_code
+        try:
+            result['response'] = reply.json()
+        except ValueError:
+            result['response'] = reply.text[:500]
+    except requests.RequestException as e:
+        result['error'] = str(e)
+        return result
+    body = result['response']
+    if isinstance(body, dict) and body.get('request_id'):
+        result['request_id'] = body['request_id']
+    else:
+        result['error'] = "HTTP %s: %s" % (result['status_code'], body)
+    return result
+
+
+def post_messages(url: str, headers: Dict[str, str], payloads: Sequence[Dict[str, Any]],
+                  concurrency: int = DEFAULT_CONCURRENCY, timeout=DEFAULT_TIMEOUT) -> List[Dict[str, Any]]:
+    """POST ``payloads`` with at most ``concurrency`` requests in flight; results keep the input order."""
+    if not payloads:
+        return []
+    workers = max(1, min(concurrency, len(payloads)))
+    if workers == 1:
+        return [post_message(url, headers, payload, timeout) for payload in payloads]
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='whatsapp-send') as pool:
+        return list(pool.map(lambda payload: post_message(url, headers, payload, timeout), payloads))
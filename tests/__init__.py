@@ -1,3 +1,10 @@
 # -*- coding: utf-8 -*-
+from . import test_attachment_dedupe
+from . import test_clause_snapshot
 from . import test_contract_dashboard
 from . import test_contract_management
+from . import test_docusign_unavailable
+from . import test_docusign_webhook
+from . import test_message_outbox
+from . import test_partner_phone
+from . import test_render_cache
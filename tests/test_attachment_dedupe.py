@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+from odoo.tests.common import TransactionCase
+
+
+class TestAttachmentDedupe(TransactionCase):
+    """Identical bytes on the same record are stored once."""
+
+    def setUp(self):
+        super().setUp()
+        self.Attachment = self.env['ir.attachment'].sudo()
+        self.partner = self.env['res.partner'].create({'name': 'Dedupe Customer'})
+        self.env['ir.config_parameter'].sudo().set_param('contract_management.attachment_dedupe_models', 'res.partner')
+
+    def _vals(self, raw, name='contract.pdf'):
+        return {'name': name, 'raw': raw, 'res_model': 'res.partner', 'res_id': self.partner.id}
+
+    def test_create_reuses_same_record_and_bytes(self):
+        first = self.Attachment._create_deduplicated(self._vals(b'%PDF-1.4 same'))
+        again, other = self.Attachment._create_deduplicated([
+            self._vals(b'%PDF-1.4 same', name='resend.pdf'),
+            self._vals(b'%PDF-1.4 other'),
+        ])
+        self.assertEqual(again, first)
+        self.assertNotEqual(other, first)
+
+    def test_cron_collapses_and_repoints_messages(self):
+        keep = self.Attachment.create(self._vals(b'%PDF-1.4 dup'))
+        duplicate = self.Attachment.create(self._vals(b'%PDF-1.4 dup'))
+        message = self.partner.message_post(body='Signed', attachment_ids=[duplicate.id])
+        self.assertEqual(self.Attachment._cron_collapse_duplicates(), 1)
+        self.assertFalse(duplicate.exists())
+        self.assertEqual(message.attachment_ids, keep)
+
+    def test_cron_keeps_tokenized_attachments(self):
+        old = self.Attachment.create(self._vals(b'%PDF-1.4 quote'))
+        sent = self.Attachment.create(self._vals(b'%PDF-1.4 quote'))
+        token = sent.generate_access_token()[0]
+        also_sent = self.Attachment.create(self._vals(b'%PDF-1.4 quote'))
+        also_sent.generate_access_token()
+        duplicate = self.Attachment.create(self._vals(b'%PDF-1.4 quote'))
+        message = self.partner.message_post(body='Quote', attachment_ids=[old.id, duplicate.id])
+        self.assertEqual(self.Attachment._cron_collapse_duplicates(), 2)
+        self.assertFalse((old | duplicate).exists())
+        self.assertEqual(sent.access_token, token)
+        self.assertTrue(also_sent.exists())
+        self.assertEqual(message.attachment_ids, sent)
+        self.assertEqual(self.Attachment._cron_collapse_duplicates(), 0)
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+from odoo.exceptions import UserError
+from odoo.tests.common import TransactionCase
+
+
+class TestClauseSnapshot(TransactionCase):
+    """Signed clause texts are frozen and shared by identical text."""
+
+    def setUp(self):
+        super().setUp()
+        self.ClauseText = self.env['contract.clause.text']
+        self.clause = self.env['contract.clause'].create({
+            'name': 'Snapshot Clause',
+            'clause': 'Original wording.',
+        })
+
+    def _snapshot(self):
+        return self.ClauseText._get_or_create(self.ClauseText._prepare_values(self.clause, 'en_US'))
+
+    def test_identical_text_is_shared(self):
+        first = self._snapshot()
+        self.assertEqual(self._snapshot(), first)
+        self.clause.clause = 'Amended wording.'
+        amended = self._snapshot()
+        self.assertNotEqual(amended, first)
+        self.assertEqual(first.clause, 'Original wording.')
+
+    def test_snapshot_is_immutable(self):
+        with self.assertRaises(UserError):
+            self._snapshot().write({'clause': 'Tampered.'})
+
+    def test_repeated_text_in_one_call(self):
+        values = self.ClauseText._prepare_values(self.clause, 'en_US')
+        first, again = self.ClauseText._get_or_create(values + values)
+        self.assertEqual(first, again)
+        self.assertEqual(first.clause, 'Original wording.')
+        self.assertEqual(first.create_uid, self.env.user)
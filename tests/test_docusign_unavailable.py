@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+from unittest.mock import patch
+
+from odoo.tests import tagged
+from odoo.tests.common import HttpCase
+
+from odoo.addons.contract_management.models.docusign_api import DocuSignClient, DocuSignError, DocuSignUnavailable
+from odoo.addons.contract_management.models.docusign_service_account import _BREAKER_CACHE, CircuitBreaker
+
+
+@tagged('post_install', '-at_install')
+class TestDocuSignUnavailable(HttpCase):
+    """DocuSign outages degrade to a 503 page and the breaker recovers through one probe."""
+
+    def setUp(self):
+        super().setUp()
+        _BREAKER_CACHE.clear()
+        self.user = self.env.ref('base.user_admin')
+        with self.registry.cursor() as cr:
+            self.env['docusign.service.account']._insert_account_row(cr, self.user.id)
+
+    def _breaker(self):
+        return CircuitBreaker(self.registry, self.env.cr.dbname, self.user.id, threshold=2, cooldown=60)
+
+    def _breaker_state(self):
+        self.env.cr.execute("SELECT breaker_state FROM docusign_service_account WHERE user_id = %s", [self.user.id])
+        return self.env.cr.fetchone()[0]
+
+    def test_breaker_open_half_open_closed(self):
+        breaker = self._breaker()
+        outage = DocuSignError('Service Unavailable', status_code=503)
+        breaker.record(outage)
+        breaker.record(outage)
+        self.assertEqual(self._breaker_state(), 'open')
+        with self.assertRaises(DocuSignUnavailable):
+            breaker.before_call()
+
+        # cooldown over: one caller claims the probe, and its own request goes through
+        self.env.cr.execute("""
+            UPDATE docusign_service_account SET breaker_opened_at = breaker_opened_at - INTERVAL '2 minutes'
+             WHERE user_id = %s
+        """, [self.user.id])
+        _BREAKER_CACHE.clear()
+        breaker.before_call()  # DocuSignClient.from_env
+        self.assertEqual(self._breaker_state(), 'half_open')
+        breaker.before_call()  # DocuSignClient.request
+        with self.assertRaises(DocuSignUnavailable):
+            self._breaker().before_call()
+
+        breaker.record(None)
+        self.assertEqual(self._breaker_state(), 'closed')
+        self._breaker().before_call()
+
+    def test_signing_route_renders_unavailable_page(self):
+        partner = self.env['res.partner'].create({'name': 'Unavailable Customer', 'email': 'unavailable@example.com'})
+        order = self.env['sale.order'].create({'partner_id': partner.id})
+        connector = self.env['docusign.connector'].sudo().create({
+            'name': 'CT-UNAVAILABLE',
+            'responsible_id': self.user.id,
+            'state': 'sent',
+            'docs_policy': 'in',
+        })
+        line = self.env['docusign.connector.lines'].sudo().create({
+            'partner_id': partner.id,
+            'email': partner.email,
+            'record_id': connector.id,
+            'envelope_id': 'env-unavailable',
+            'client_user_id': '1',
+        })
+        self.env['contract.management'].sudo().create({'subscription_id': order.id, 'docusign_id': connector.id})
+        token, _url = line.generate_magic_link()
+
+        unavailable = DocuSignUnavailable('DocuSign is temporarily unavailable')
+        unavailable.retry_after = 120
+        with patch.object(DocuSignClient, 'from_env', side_effect=unavailable):
+            response = self.url_open('/contracts/sign/%s' % token)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers.get('Retry-After'), '120')
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+import base64
+import hashlib
+import hmac
+import json
+
+from odoo.tests.common import TransactionCase
+
+
+class TestDocuSignWebhookInbox(TransactionCase):
+    """Connect events are authenticated, stored and processed once per envelope."""
+
+    def setUp(self):
+        super().setUp()
+        self.key = 'connect-secret'
+        self.env['ir.config_parameter'].sudo().set_param('contract_management.docusign_connect_hmac_key', self.key)
+        self.Inbox = self.env['docusign.webhook.event']
+
+    def _payload(self, event, envelope_id='env-unknown'):
+        return json.dumps({
+            'event': event,
+            'generatedDateTime': '2026-01-01T00:00:00Z',
+            'data': {'envelopeId': envelope_id},
+        }).encode()
+
+    def _sign(self, body, key=None):
+        digest = hmac.new((key or self.key).encode(), body, hashlib.sha256).digest()
+        return base64.b64encode(digest).decode()
+
+    def test_signature_validation(self):
+        body = self._payload('envelope-sent')
+        self.assertTrue(self.Inbox._verify_signature(body, [self._sign(body)]))
+        self.assertFalse(self.Inbox._verify_signature(body, [self._sign(body, 'other')]))
+        self.assertFalse(self.Inbox._verify_signature(body, []))
+
+    def test_latest_event_per_envelope_wins(self):
+        first = self.Inbox._enqueue(self._payload('envelope-delivered'))
+        last = self.Inbox._enqueue(self._payload('envelope-completed'))
+        self.Inbox.cron_process_inbox()
+        self.assertEqual(last.state, 'done')
+        self.assertEqual(first.state, 'superseded')
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+from odoo.tests.common import TransactionCase
+
+from odoo.addons.contract_management.models.contract_message_outbox import is_permanent_error
+
+
+class TestMessageOutbox(TransactionCase):
+    """Outbound messages are queued once and retried before escalating."""
+
+    def setUp(self):
+        super().setUp()
+        self.Outbox = self.env['contract.message.outbox']
+        self.partner = self.env['res.partner'].create({'name': 'Outbox Customer'})
+
+    def _vals(self, key='test:1'):
+        return {
+            'name': 'Test message',
+            'kind': 'fc_quote',
+            'idempotency_key': key,
+            'payload': {'to': [{'phone_number': '+50370000000'}]},
+            'res_model': 'res.partner',
+            'res_id': self.partner.id,
+        }
+
+    def test_enqueue_is_idempotent(self):
+        first = self.Outbox._enqueue(self._vals())
+        again, other = self.Outbox._enqueue([self._vals(), self._vals('test:2')])
+        self.assertEqual(again, first)
+        self.assertNotEqual(other, first)
+        self.assertEqual(first.state, 'queued')
+
+    def test_enqueue_keeps_sent_and_requeues_failed(self):
+        message = self.Outbox._enqueue(self._vals())
+        message._mark_sent('req-1')
+        self.assertEqual(self.Outbox._enqueue(self._vals()), message)
+        self.assertEqual(message.state, 'done')
+        message.write({'state': 'failed', 'attempts': 5, 'last_error': 'HTTP 503'})
+        self.assertEqual(self.Outbox._enqueue(self._vals()), message)
+        self.assertEqual(message.state, 'queued')
+        self.assertEqual(message.attempts, 0)
+        self.assertFalse(message.last_error)
+
+    def test_failure_backs_off_then_fails(self):
+        message = self.Outbox._enqueue(self._vals())
+        message.attempts = 1
+        message._register_failure('HTTP 503')
+        self.assertEqual(message.state, 'queued')
+        self.assertTrue(message.next_attempt_at)
+        message.attempts = 5
+        message._register_failure('HTTP 503')
+        self.assertEqual(message.state, 'failed')
+
+    def test_permanent_error_fails_at_once(self):
+        self.assertTrue(is_permanent_error(400))
+        self.assertFalse(is_permanent_error(429))
+        self.assertFalse(is_permanent_error(503))
+        self.assertFalse(is_permanent_error(None))
+        message = self.Outbox._enqueue(self._vals())
+        message.attempts = 1
+        message._register_failure('HTTP 400: invalid number', permanent=True)
+        self.assertEqual(message.state, 'failed')
+
+    def test_envelope_notification_is_queued(self):
+        order = self.env['sale.order'].create({'partner_id': self.partner.id})
+        contract = self.env['contract.management'].create({'subscription_id': order.id})
+        message = contract._resend_envelope_notification('envelope-1', '1')
+        self.assertEqual(message.kind, 'docusign_notification')
+        self.assertEqual(message.state, 'queued')
+        self.assertEqual(message._get_payload(), {
+            'envelope_id': 'envelope-1', 'recipient_id': '1', 'resend': True, 'body': None})
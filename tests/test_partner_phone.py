@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+from odoo.tests.common import TransactionCase
+
+from odoo.addons.contract_management.models.phone_utils import normalize_e164, split_e164
+
+
+class TestPartnerPhone(TransactionCase):
+    """WhatsApp numbers are normalized once and stored in E.164."""
+
+    def test_normalize_and_split(self):
+        self.assertEqual(normalize_e164('7012-3456'), '+50370123456')
+        self.assertEqual(normalize_e164('+1 (305) 555-0100'), '+13055550100')
+        self.assertEqual(normalize_e164('0056 9 1234 5678'), '+56912345678')
+        self.assertIsNone(normalize_e164('123'))
+        self.assertEqual(split_e164('+50370123456'), ('503', '70123456'))
+        self.assertEqual(split_e164('+13055550100'), ('1', '3055550100'))
+        self.assertEqual(split_e164('+56912345678'), ('56', '912345678'))
+
+    def test_normalize_other_countries(self):
+        # national numbers keep the partner's country instead of reading a calling code
+        self.assertEqual(normalize_e164('305-555-0100', '1'), '+13055550100')
+        self.assertEqual(normalize_e164('2125551234', '1'), '+12125551234')
+        self.assertEqual(normalize_e164('1 212 555 1234', '1'), '+12125551234')
+        self.assertEqual(normalize_e164('55 1234 5678', '52'), '+525512345678')
+        self.assertEqual(normalize_e164('50370123456'), '+50370123456')
+        self.assertIsNone(normalize_e164('2125551234'))
+
+    def test_stored_on_write_and_searchable(self):
+        partner = self.env['res.partner'].create({'name': 'Phone Customer', 'whatsapp': '+503 7012 3456'})
+        self.assertEqual(partner.whatsapp_e164, '+50370123456')
+        self.assertEqual(partner.whatsapp_country_code, '503')
+        self.assertEqual(self.env['res.partner'].search([('whatsapp_e164', '=', '+50370123456')]), partner)
+        partner.write({'country_id': self.env.ref('base.us').id, 'whatsapp': '(212) 555-1234'})
+        self.assertEqual(partner.whatsapp_e164, '+12125551234')
+        self.assertEqual(partner.whatsapp_country_code, '1')
+        partner.whatsapp = 'not a phone'
+        self.assertFalse(partner.whatsapp_e164)
+
+    def test_backfill_in_batches(self):
+        partners = self.env['res.partner'].create([
+            {'name': 'Backfill SV', 'whatsapp': '7012 3456'},
+            {'name': 'Backfill US', 'whatsapp': '212 555 1234', 'country_id': self.env.ref('base.us').id},
+        ])
+        self.env.flush_all()
+        self.env.cr.execute(
+            "UPDATE res_partner SET whatsapp_e164 = NULL, whatsapp_country_code = NULL WHERE id IN %s",
+            [tuple(partners.ids)])
+        self.assertGreaterEqual(self.env['res.partner']._backfill_whatsapp_e164(batch_size=1), 2)
+        self.assertEqual(partners.mapped('whatsapp_e164'), ['+50370123456', '+12125551234'])
+        self.assertEqual(partners.mapped('whatsapp_country_code'), ['503', '1'])
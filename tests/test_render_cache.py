@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+from odoo import fields
+from odoo.tests.common import TransactionCase
+
+
+class TestQuoteRenderKey(TransactionCase):
+    """Rendered quote PDFs are reused until a printed value changes."""
+
+    def setUp(self):
+        super().setUp()
+        self.partner = self.env['res.partner'].create({'name': 'Render Cache Customer'})
+        self.product = self.env['product.product'].create({'name': 'Render Cache Plan', 'list_price': 25.0})
+        self.order = self.env['sale.order'].create({
+            'partner_id': self.partner.id,
+            'order_line': [(0, 0, {'product_id': self.product.id, 'product_uom_qty': 1})],
+        })
+
+    def test_quote_key_ignores_unprinted_writes(self):
+        key = self.order._get_quote_render_key()
+        self.order.write({'state': 'sent'})
+        self.order.message_post(body='Quote sent')
+        self.assertEqual(self.order._get_quote_render_key(), key)
+        self.order.order_line.product_uom_qty = 2
+        self.assertNotEqual(self.order._get_quote_render_key(), key)
+
+
+class TestContractPrerender(TransactionCase):
+    """Quotes waiting for confirmation get their contract PDF before the first send."""
+
+    def setUp(self):
+        super().setUp()
+        if 'sale.subscription.plan' not in self.env:
+            self.skipTest("Subscriptions are not installed")
+        category = self.env['product.category'].create({
+            'name': 'Prerender Plans',
+            'contract_template': self.env.ref('sale.action_report_saleorder').id,
+        })
+        product = self.env['product.product'].create({
+            'name': 'Prerender Plan', 'categ_id': category.id, 'recurring_invoice': True, 'list_price': 30.0,
+        })
+        plan = self.env['sale.subscription.plan'].create({
+            'name': 'Prerender Monthly', 'billing_period_value': 1, 'billing_period_unit': 'month',
+        })
+        self.order = self.env['sale.order'].create({
+            'partner_id': self.env['res.partner'].create({'name': 'Prerender Customer'}).id,
+            'plan_id': plan.id,
+            'order_line': [(0, 0, {'product_id': product.id, 'product_uom_qty': 1})],
+        })
+        self.order.write({'state': 'sent'})
+
+    def test_fresh_quote_render_is_reused_by_first_send(self):
+        order = self.order
+        self.assertFalse(order.cabal_sequence)
+        self.assertIn(order, self.env['sale.order'].search(order._get_prerender_domain()))
+        order._prerender_contract_documents(as_confirmed=True)
+        self.assertFalse(order.cabal_sequence)
+        reserved = order.cabal_sequence_reserved
+        self.assertTrue(reserved)
+        prerendered = self.env['ir.attachment'].search([
+            ('res_model', '=', 'sale.order'), ('res_id', '=', order.id), ('contract_render_key', '!=', False),
+        ])
+        self.assertEqual(len(prerendered), 1)
+
+        # first send: the order is confirmed and numbered, then its contract PDF is looked up
+        order.write({'date_order': fields.Datetime.now()})
+        order._prepare_contract_template()
+        self.assertEqual(order.cabal_sequence, reserved)
+        self.assertFalse(order.cabal_sequence_reserved)
+        cached, rendered = order._render_contract_pdfs(order, order.contract_template)
+        self.assertEqual(cached, {order.id: prerendered})
+        self.assertFalse(rendered)
+
+    def test_cancelled_quote_releases_its_number(self):
+        number = self.order._reserve_cabal_sequence()
+        self.order.write({'state': 'cancel'})
+        other = self.order.copy()
+        self.assertFalse(other.cabal_sequence_reserved)
+        self.assertEqual(other._reserve_cabal_sequence(), number)
+        self.assertFalse(self.order.cabal_sequence_reserved)
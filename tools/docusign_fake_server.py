@@ -0,0 +1,535 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Local stand-in for the DocuSign eSignature REST API.
+
+Implements the subset of endpoints used by contract_management and
+odoo_docusign (OAuth JWT grant, envelope create/get/list/void, recipients,
+notification, resend, documents, recipient views) with in-memory state, so
+the signature flow can be load-tested without touching DocuSign.
+
+Latency, error rate and the hourly API quota are configurable. Point Odoo at
+it through the usual configuration::
+
+    DocuSign base URI / account ID      -> http://127.0.0.1:8765 / fake-account
+    contract_management.docusign_oauth_host (system parameter)
+                                        -> http://127.0.0.1:8765
+
+Run::
+
+    python3 tools/docusign_fake_server.py --port 8765 --latency-ms 150 \\
+        --jitter-ms 100 --error-rate 0.01 --rate-limit 3000
+
+Test helpers (not part of the DocuSign API):
+
+    GET  /_fake/signing/<envelope_id>?recipientId=1&returnUrl=...
+         what the customer does in the DocuSign UI: signs and redirects
+    POST /_fake/envelopes/<envelope_id>/complete   sign for every recipient
+    GET  /_fake/stats                              counters per endpoint
+    POST /_fake/reset                              drop envelopes and counters
+"""
+
+import argparse
+import base64
+import json
+import logging
+import random
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+_logger = logging.getLogger('docusign_fake_server')
+
+# Smallest well-formed PDF, returned when an envelope carries no document.
+BLANK_PDF = (
+    b'%PDF-1.4\n1 0 obj<</Type/Catalog/Pages 2 0 R>>endobj\n'
+    b'2 0 obj<</Type/Pages/Kids[3 0 R]/Count 1>>endobj\n'
+    b'3 0 obj<</Type/Page/Parent 2 0 R/MediaBox[0 0 612 792]>>endobj\n'
+    b'trailer<</Root 1 0 R>>\n%%EOF\n'
+)
+
+API_PREFIX = r'/restapi/v2\.1/accounts/(?P<account>[^/]+)'
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def _iso(dt):
+    return dt.strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+
+
+def _parse_date(value):
+    value = (value or '').replace('Z', '')
+    for fmt in ('%Y-%m-%dT%H:%M:%S.%f', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d'):
+        try:
+            return datetime.strptime(value, fmt).replace(tzinfo=timezone.utc)
+        except ValueError:
+            continue
+    return datetime.min.replace(tzinfo=timezone.utc)
+
+
+class FakeDocuSign:
+    """In-memory envelopes plus the fault injection settings."""
+
+    def __init__(self, latency_ms=0, jitter_ms=0, error_rate=0.0, rate_limit=0, rate_window=3600,
+                 auto_complete_after=None, token_lifetime=3600):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self.auto_complete_after = auto_complete_after
+        self.token_lifetime = token_lifetime
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.envelopes = {}
+            self.stats = Counter()
+            self.window_start = time.time()
+            self.window_used = 0
+
+    # ------------------------------------------------------------------
+    # Fault injection
+    # ------------------------------------------------------------------
+    def delay(self):
+        latency = self.latency_ms + random.uniform(0, self.jitter_ms)
+        if latency > 0:
+            time.sleep(latency / 1000.0)
+
+    def consume_quota(self):
+        """Return ``(allowed, headers)`` following DocuSign's hourly quota headers."""
+        if not self.rate_limit:
+            return True, {}
+        with self.lock:
+            now = time.time()
+            if now - self.window_start >= self.rate_window:
+                self.window_start = now
+                self.window_used = 0
+            reset_at = int(self.window_start + self.rate_window)
+            allowed = self.window_used < self.rate_limit
+            if allowed:
+                self.window_used += 1
+            headers = {
+                'X-RateLimit-Limit': str(self.rate_limit),
+                'X-RateLimit-Remaining': str(max(self.rate_limit - self.window_used, 0)),
+                'X-RateLimit-Reset': str(reset_at),
+            }
+            if not allowed:
+                headers['Retry-After'] = str(max(reset_at - int(now), 1))
+            return allowed, headers
+
+    def should_fail(self):
+        return self.error_rate and random.random() < self.error_rate
+
+    # ------------------------------------------------------------------
+    # Envelopes
+    # ------------------------------------------------------------------
+    def create_envelope(self, definition, files=None):
+        envelope_id = str(uuid.uuid4())
+        now = _now()
+        signers = []
+        for signer in (definition.get('recipients') or {}).get('signers') or []:
+            signers.append({
+                'recipientId': str(signer.get('recipientId') or len(signers) + 1),
+                'recipientIdGuid': str(uuid.uuid4()),
+                'routingOrder': str(signer.get('routingOrder') or signer.get('recipientId') or 1),
+                'name': signer.get('name'),
+                'email': signer.get('email'),
+                'clientUserId': signer.get('clientUserId'),
+                'deliveryMethod': signer.get('deliveryMethod', 'email'),
+                'phoneNumber': signer.get('phoneNumber'),
+                'status': 'sent',
+            })
+        documents = []
+        for document in definition.get('documents') or []:
+            document_id = str(document.get('documentId') or len(documents) + 1)
+            content = document.get('documentBase64')
+            documents.append({
+                'documentId': document_id,
+                'name': document.get('name') or 'Document',
+                'content': base64.b64decode(content) if content else (files or {}).get(document_id) or BLANK_PDF,
+            })
+        envelope = {
+            'envelopeId': envelope_id,
+            'status': definition.get('status') or 'created',
+            'emailSubject': definition.get('emailSubject'),
+            'createdDateTime': _iso(now),
+            'sentDateTime': _iso(now),
+            'statusChangedDateTime': _iso(now),
+            'signers': signers,
+            'documents': documents,
+            'sent_at': time.time(),
+        }
+        with self.lock:
+            self.envelopes[envelope_id] = envelope
+        return envelope
+
+    def get(self, envelope_id):
+        envelope = self.envelopes.get(envelope_id)
+        if envelope and self.auto_complete_after is not None and envelope['status'] in ('sent', 'delivered'):
+            if time.time() - envelope['sent_at'] >= self.auto_complete_after:
+                self.sign(envelope_id)
+        return envelope
+
+    def sign(self, envelope_id, recipient_id=None):
+        with self.lock:
+            envelope = self.envelopes[envelope_id]
+            now = _iso(_now())
+            for signer in envelope['signers']:
+                if recipient_id is None or signer['recipientId'] == str(recipient_id):
+                    signer['status'] = 'completed'
+                    signer['signedDateTime'] = now
+            if all(s['status'] == 'completed' for s in envelope['signers']):
+                envelope['status'] = 'completed'
+                envelope['completedDateTime'] = now
+            else:
+                envelope['status'] = 'delivered'
+            envelope['statusChangedDateTime'] = now
+        return envelope
+
+    @staticmethod
+    def recipients(envelope):
+        return {
+            'signers': [dict(s) for s in envelope['signers']],
+            'recipientCount': str(len(envelope['signers'])),
+        }
+
+    @classmethod
+    def summary(cls, envelope, include_recipients=False):
+        data = {key: value for key, value in envelope.items()
+                if key not in ('signers', 'documents', 'sent_at')}
+        if include_recipients:
+            data['recipients'] = cls.recipients(envelope)
+        return data
+
+
+def make_handler(fake):
+
+    routes = []
+
+    def route(method, pattern):
+        def decorator(func):
+            routes.append((method, re.compile('^' + pattern + '$'), func))
+            return func
+        return decorator
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        server_version = 'FakeDocuSign/1.0'
+
+        def log_message(self, fmt, *args):
+            _logger.debug(fmt, *args)
+
+        # -- plumbing ---------------------------------------------------
+        def _body(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            return self.rfile.read(length) if length else b''
+
+        def _json_body(self):
+            body = self._body()
+            return json.loads(body) if body else {}
+
+        def _envelope_body(self):
+            """Return ``(definition, files)`` of a JSON or multipart envelope request."""
+            content_type = self.headers.get('Content-Type') or ''
+            if not content_type.startswith('multipart/'):
+                return self._json_body(), {}
+            boundary = re.search(r'boundary="?([^";]+)"?', content_type).group(1).encode()
+            definition, files = {}, {}
+            for part in self._body().split(b'--' + boundary)[1:]:
+                if part.startswith(b'--'):
+                    break
+                head, _sep, content = part.partition(b'\r\n\r\n')
+                content = content[:-2] if content.endswith(b'\r\n') else content
+                document_id = re.search(rb'documentid="?(\w+)', head, re.I)
+                if document_id:
+                    files[document_id.group(1).decode()] = content
+                elif content.strip():
+                    definition = json.loads(content)
+            return definition, files
+
+        def _send(self, status, payload=None, content_type='application/json', headers=None):
+            if isinstance(payload, (dict, list)):
+                body = json.dumps(payload).encode()
+            else:
+                body = payload or b''
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _error(self, status, code, message, headers=None):
+            self._send(status, {'errorCode': code, 'message': message}, headers=headers)
+
+        def _dispatch(self, method):
+            parsed = urlparse(self.path)
+            self.query = {k: v[-1] for k, v in parse_qs(parsed.query).items()}
+            for route_method, pattern, func in routes:
+                match = pattern.match(parsed.path)
+                if route_method == method and match:
+                    break
+            else:
+                self._body()
+                return self._error(404, 'RESOURCE_NOT_FOUND', 'No route for %s %s' % (method, parsed.path))
+
+            endpoint = '%s %s' % (method, func.__name__)
+            fake.stats[endpoint] += 1
+            is_api = not parsed.path.startswith('/_fake/')
+            self.quota_headers = {}
+            if is_api:
+                fake.delay()
+                if parsed.path.startswith('/restapi/'):
+                    allowed, self.quota_headers = fake.consume_quota()
+                else:
+                    allowed = True
+                if not allowed:
+                    self._body()
+                    fake.stats['429'] += 1
+                    return self._error(429, 'HOURLY_APIINVOCATION_LIMIT_EXCEEDED',
+                                       'The maximum number of hourly API invocations has been exceeded.',
+                                       headers=self.quota_headers)
+                if fake.should_fail():
+                    self._body()
+                    fake.stats['5xx'] += 1
+                    return self._error(503, 'SERVICE_UNAVAILABLE', 'Injected failure', headers=self.quota_headers)
+            try:
+                func(self, **match.groupdict())
+            except KeyError as exc:
+                self._error(404, 'ENVELOPE_DOES_NOT_EXIST', 'Unknown envelope %s' % exc)
+
+        def do_GET(self):
+            self._dispatch('GET')
+
+        def do_POST(self):
+            self._dispatch('POST')
+
+        def do_PUT(self):
+            self._dispatch('PUT')
+
+        def ok(self, payload, status=200, **kwargs):
+            headers = dict(self.quota_headers)
+            headers.update(kwargs.pop('headers', {}))
+            self._send(status, payload, headers=headers, **kwargs)
+
+        def envelope(self, envelope_id):
+            envelope = fake.get(envelope_id)
+            if not envelope:
+                raise KeyError(envelope_id)
+            return envelope
+
+    # -- OAuth ----------------------------------------------------------
+    @route('POST', '/oauth/token')
+    def token(handler):
+        form = parse_qs(handler._body().decode())
+        if not form.get('assertion'):
+            return handler._error(400, 'invalid_grant', 'Missing assertion')
+        handler.ok({
+            'access_token': 'fake-%s' % uuid.uuid4().hex,
+            'token_type': 'Bearer',
+            'expires_in': fake.token_lifetime,
+        })
+
+    # -- Envelopes ------------------------------------------------------
+    @route('POST', API_PREFIX + '/envelopes')
+    def create_envelope(handler, account):
+        envelope = fake.create_envelope(*handler._envelope_body())
+        handler.ok({
+            'envelopeId': envelope['envelopeId'],
+            'status': envelope['status'],
+            'statusDateTime': envelope['statusChangedDateTime'],
+            'uri': '/envelopes/%s' % envelope['envelopeId'],
+        }, status=201)
+
+    @route('GET', API_PREFIX + '/envelopes')
+    def list_envelopes(handler, account):
+        from_date = _parse_date(handler.query.get('from_date'))
+        start = int(handler.query.get('start_position') or 0)
+        count = int(handler.query.get('count') or 100)
+        include_recipients = 'recipients' in (handler.query.get('include') or '')
+        with fake.lock:
+            changed = sorted(
+                (e for e in fake.envelopes.values() if _parse_date(e['statusChangedDateTime']) >= from_date),
+                key=lambda e: e['statusChangedDateTime'])
+        page = changed[start:start + count]
+        handler.ok({
+            'envelopes': [fake.summary(e, include_recipients) for e in page],
+            'resultSetSize': str(len(page)),
+            'totalSetSize': str(len(changed)),
+            'startPosition': str(start),
+            'endPosition': str(start + len(page) - 1),
+        })
+
+    @route('GET', API_PREFIX + '/envelopes/(?P<envelope_id>[^/]+)')
+    def get_envelope(handler, account, envelope_id):
+        handler.ok(fake.summary(handler.envelope(envelope_id), include_recipients=True))
+
+    @route('PUT', API_PREFIX + '/envelopes/(?P<envelope_id>[^/]+)')
+    def update_envelope(handler, account, envelope_id):
+        envelope = handler.envelope(envelope_id)
+        payload = handler._json_body()
+        if payload.get('status') == 'voided':
+            if envelope['status'] == 'completed':
+                return handler._error(400, 'ENVELOPE_CANNOT_VOID_INVALID_STATE', 'Only envelopes in progress can be voided')
+            with fake.lock:
+                envelope['status'] = 'voided'
+                envelope['voidedReason'] = payload.get('voidedReason')
+                envelope['statusChangedDateTime'] = envelope['voidedDateTime'] = _iso(_now())
+        handler.ok({'envelopeId': envelope_id})
+
+    @route('GET', API_PREFIX + '/envelopes/(?P<envelope_id>[^/]+)/recipients')
+    def list_recipients(handler, account, envelope_id):
+        handler.ok(fake.recipients(handler.envelope(envelope_id)))
+
+    @route('PUT', API_PREFIX + '/envelopes/(?P<envelope_id>[^/]+)/recipients')
+    def update_recipients(handler, account, envelope_id):
+        envelope = handler.envelope(envelope_id)
+        updates = handler._json_body().get('signers') or []
+        results = []
+        with fake.lock:
+            for update in updates:
+                for signer in envelope['signers']:
+                    if signer['recipientId'] == str(update.get('recipientId')):
+                        for key in ('email', 'name', 'phoneNumber', 'deliveryMethod', 'clientUserId'):
+                            if key in update:
+                                signer[key] = update[key]
+                results.append({'recipientId': str(update.get('recipientId')),
+                                'errorDetails': {'errorCode': 'SUCCESS', 'message': ''}})
+        handler.ok({'recipientUpdateResults': results})
+
+    @route('PUT', API_PREFIX + '/envelopes/(?P<envelope_id>[^/]+)/recipients/(?P<recipient_id>[^/]+)/resend_envelope')
+    def resend_recipient(handler, account, envelope_id, recipient_id):
+        handler._body()
+        handler.envelope(envelope_id)
+        handler.ok({'envelopeId': envelope_id})
+
+    @route('PUT', API_PREFIX + '/envelopes/(?P<envelope_id>[^/]+)/notification')
+    def notification(handler, account, envelope_id):
+        payload = handler._json_body()
+        handler.envelope(envelope_id)
+        handler.ok(payload)
+
+    @route('GET', API_PREFIX + '/envelopes/(?P<envelope_id>[^/]+)/documents')
+    def list_documents(handler, account, envelope_id):
+        envelope = handler.envelope(envelope_id)
+        documents = [{'documentId': d['documentId'], 'name': d['name'], 'type': 'content'}
+                     for d in envelope['documents']]
+        documents.append({'documentId': 'certificate', 'name': 'Summary', 'type': 'summary'})
+        handler.ok({'envelopeId': envelope_id, 'envelopeDocuments': documents})
+
+    @route('PUT', API_PREFIX + '/envelopes/(?P<envelope_id>[^/]+)/documents')
+    def replace_documents(handler, account, envelope_id):
+        envelope = handler.envelope(envelope_id)
+        for document in handler._json_body().get('documents') or []:
+            content = document.get('documentBase64')
+            envelope['documents'] = [{
+                'documentId': str(document.get('documentId') or 1),
+                'name': document.get('name') or 'Document',
+                'content': base64.b64decode(content) if content else BLANK_PDF,
+            }]
+        handler.ok({'envelopeId': envelope_id, 'envelopeDocuments': []})
+
+    @route('GET', API_PREFIX + '/envelopes/(?P<envelope_id>[^/]+)/documents/(?P<document_id>[^/]+)')
+    def get_document(handler, account, envelope_id, document_id):
+        envelope = handler.envelope(envelope_id)
+        documents = envelope['documents']
+        if document_id not in ('combined', 'archive', 'certificate'):
+            documents = [d for d in documents if d['documentId'] == document_id]
+            if not documents:
+                return handler._error(404, 'DOCUMENT_DOES_NOT_EXIST', 'Unknown document %s' % document_id)
+        content = documents[0]['content'] if documents else BLANK_PDF
+        handler.ok(content, content_type='application/pdf')
+
+    @route('POST', API_PREFIX + '/envelopes/(?P<envelope_id>[^/]+)/views/recipient')
+    def recipient_view(handler, account, envelope_id):
+        payload = handler._json_body()
+        envelope = handler.envelope(envelope_id)
+        signer = next((s for s in envelope['signers']
+                       if (s.get('email') or '').lower() == (payload.get('email') or '').lower()),
+                      envelope['signers'][0] if envelope['signers'] else {})
+        host = 'http://%s:%s' % handler.server.server_address[:2]
+        query = urlencode({'recipientId': signer.get('recipientId', '1'), 'returnUrl': payload.get('returnUrl') or ''})
+        handler.ok({'url': '%s/_fake/signing/%s?%s' % (host, envelope_id, query)}, status=201)
+
+    # -- Test helpers ---------------------------------------------------
+    @route('GET', '/_fake/signing/(?P<envelope_id>[^/]+)')
+    def fake_signing(handler, envelope_id):
+        handler.envelope(envelope_id)
+        fake.sign(envelope_id, handler.query.get('recipientId'))
+        return_url = handler.query.get('returnUrl')
+        if not return_url:
+            return handler._send(200, {'event': 'signing_complete'})
+        separator = '&' if '?' in return_url else '?'
+        handler._send(302, headers={'Location': return_url + separator + 'event=signing_complete'})
+
+    @route('POST', '/_fake/envelopes/(?P<envelope_id>[^/]+)/complete')
+    def fake_complete(handler, envelope_id):
+        handler._body()
+        handler.envelope(envelope_id)
+        handler._send(200, fake.summary(fake.sign(envelope_id), include_recipients=True))
+
+    @route('GET', '/_fake/stats')
+    def fake_stats(handler):
+        handler._send(200, {
+            'envelopes': len(fake.envelopes),
+            'requests': dict(fake.stats),
+            'quota_used': fake.window_used,
+        })
+
+    @route('POST', '/_fake/reset')
+    def fake_reset(handler):
+        handler._body()
+        fake.reset()
+        handler._send(200, {'reset': True})
+
+    return Handler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency-ms', type=float, default=0, help='fixed latency added to every API call')
+    parser.add_argument('--jitter-ms', type=float, default=0, help='random extra latency, uniform in [0, jitter]')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='share of API calls answered with 503')
+    parser.add_argument('--rate-limit', type=int, default=0, help='API calls allowed per window (0 = unlimited)')
+    parser.add_argument('--rate-window', type=int, default=3600, help='quota window in seconds')
+    parser.add_argument('--auto-complete-after', type=float, default=None,
+                        help='seconds after which sent envelopes report every signer as completed')
+    parser.add_argument('--token-lifetime', type=int, default=3600)
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO,
+                        format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    fake = FakeDocuSign(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        rate_limit=args.rate_limit,
+        rate_window=args.rate_window,
+        auto_complete_after=args.auto_complete_after,
+        token_lifetime=args.token_lifetime,
+    )
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(fake))
+    server.daemon_threads = True
+    _logger.info("Fake DocuSign listening on http://%s:%s", args.host, args.port)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
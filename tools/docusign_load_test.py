@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""Load-test harness for the DocuSign signature flow.
+
+Drives N concurrent ``action_send_for_signature``, ``status_docs`` and
+embedded (portal) signing flows, one database cursor per operation, and
+reports throughput and latency percentiles per flow. Meant to run against
+``tools/docusign_fake_server.py`` on a disposable copy of the database:
+the flows commit what they do.
+
+Setup on the copied database::
+
+    DocuSign base URI          http://127.0.0.1:8765
+    DocuSign account ID        fake-account
+    docusign_private_key       any RSA private key (the fake never checks it)
+    contract_management.docusign_oauth_host   http://127.0.0.1:8765
+
+Run inside an Odoo shell::
+
+    LOAD_FLOWS=send,status,sign LOAD_ORDERS=200 LOAD_CONCURRENCY=16 \\
+        odoo-bin shell -d loadtest_db < tools/docusign_load_test.py
+
+Piping the file runs once with the ``LOAD_*`` settings; afterwards, in an
+interactive shell, ``run(env, flows=('send',), limit=50, concurrency=8)``
+can be called again.
+"""
+
+import logging
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from odoo import api
+
+_logger = logging.getLogger('docusign_load_test')
+
+FLOWS = ('send', 'status', 'sign')
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    # nearest-rank method
+    index = max(0, math.ceil(pct / 100.0 * len(values)) - 1)
+    return values[index]
+
+
+def _flow_send(env, order_id):
+    order = env['sale.order'].browse(order_id)
+    order.with_context(docusign_send_sync=True).action_send_for_signature()
+
+
+def _flow_status(env, order_id):
+    order = env['sale.order'].browse(order_id)
+    for connector in order.docusign_ids.filtered(lambda c: c.state not in ('new', 'completed')):
+        connector.status_docs()
+
+
+def _flow_sign(env, order_id):
+    """Embedded signing as the portal does it, with the fake signing page in between."""
+    from odoo.addons.contract_management.models.docusign_api import DocuSignClient
+
+    order = env['sale.order'].browse(order_id)
+    client = DocuSignClient.from_env(env, max_retries=0)
+    for connector in order.docusign_ids.filtered(lambda c: c.state == 'sent'):
+        for line in connector.connector_line_ids.filtered(lambda l: l.envelope_id and not l.sign_status):
+            client_user_id = line.client_user_id or str(order.id)
+            signing_url = client.create_recipient_view(
+                line.envelope_id, line.partner_id.name, line._get_recipient_email(),
+                client_user_id, 'http://localhost/docusign/return?contract_id=%s' % order.id)
+            requests.get(signing_url, allow_redirects=False, timeout=30).raise_for_status()
+        connector.status_docs()
+
+
+FLOW_FUNCTIONS = {
+    'send': _flow_send,
+    'status': _flow_status,
+    'sign': _flow_sign,
+}
+
+
+def _default_orders(env, flow, limit):
+    Order = env['sale.order']
+    if flow == 'send':
+        domain = [('state', '=', 'sale'), ('docusign_ids', '=', False)]
+    elif flow == 'status':
+        domain = [('docusign_ids.state', 'in', ('sent', 'customer'))]
+    else:
+        domain = [('docusign_ids.state', '=', 'sent')]
+    return Order.search(domain, limit=limit, order='id').ids
+
+
+def _run_one(registry, uid, flow, order_id):
+    started = time.monotonic()
+    error = None
+    try:
+        with registry.cursor() as cr:
+            flow_env = api.Environment(cr, uid, {'docusign_send_sync': True})
+            FLOW_FUNCTIONS[flow](flow_env, order_id)
+    except Exception as e:
+        error = '%s: %s' % (type(e).__name__, e)
+        _logger.warning("[LoadTest] %s failed for order %s: %s", flow, order_id, error)
+    return time.monotonic() - started, error
+
+
+def run_flow(env, flow, order_ids, concurrency):
+    """Run ``flow`` once per order with ``concurrency`` workers and return its stats."""
+    registry = env.registry
+    uid = env.uid
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='docusign-load') as pool:
+        results = list(pool.map(lambda order_id: _run_one(registry, uid, flow, order_id), order_ids))
+    wall = time.monotonic() - started
+    latencies = [latency * 1000 for latency, error in results if not error]
+    errors = [error for latency, error in results if error]
+    return {
+        'flow': flow,
+        'operations': len(results),
+        'errors': len(errors),
+        'wall_s': wall,
+        'throughput': len(results) / wall if wall else 0.0,
+        'p50_ms': _percentile(latencies, 50),
+        'p95_ms': _percentile(latencies, 95),
+        'max_ms': max(latencies) if latencies else 0.0,
+        'sample_errors': errors[:5],
+    }
+
+
+def report(results):
+    lines = ['%-8s %6s %6s %9s %9s %9s %9s %9s' % (
+        'flow', 'ops', 'errors', 'wall s', 'ops/s', 'p50 ms', 'p95 ms', 'max ms')]
+    for r in results:
+        lines.append('%-8s %6d %6d %9.2f %9.2f %9.0f %9.0f %9.0f' % (
+            r['flow'], r['operations'], r['errors'], r['wall_s'], r['throughput'],
+            r['p50_ms'], r['p95_ms'], r['max_ms']))
+        for error in r['sample_errors']:
+            lines.append('         ! %s' % error)
+    return '\n'.join(lines)
+
+
+def run(env, flows=FLOWS, order_ids=None, limit=20, concurrency=8):
+    """Run the requested flows in order and print a summary table.
+
+    Without ``order_ids`` every flow picks up to ``limit`` orders in the
+    state it needs, so ``send`` feeds ``status`` and ``sign`` of the same run.
+    """
+    results = []
+    for flow in flows:
+        if flow not in FLOW_FUNCTIONS:
+            raise ValueError('Unknown flow %r, expected one of %s' % (flow, ', '.join(FLOWS)))
+        env.cr.commit()
+        ids = order_ids or _default_orders(env, flow, limit)
+        if not ids:
+            _logger.warning("[LoadTest] No orders available for flow %s", flow)
+            continue
+        _logger.info("[LoadTest] %s: %s orders, concurrency %s", flow, len(ids), concurrency)
+        results.append(run_flow(env, flow, ids, concurrency))
+    print(report(results))
+    return results
+
+
+if 'env' in globals() and __name__ != 'docusign_load_test':
+    run(
+        env,  # noqa: F821 (provided by odoo-bin shell)
+        flows=tuple(f.strip() for f in os.environ.get('LOAD_FLOWS', ','.join(FLOWS)).split(',') if f.strip()),
+        limit=int(os.environ.get('LOAD_ORDERS', 20)),
+        concurrency=int(os.environ.get('LOAD_CONCURRENCY', 8)),
+    )